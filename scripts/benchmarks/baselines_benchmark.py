@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Baseline Database Benchmarks
+Measures what a single lookup costs a fresh interpreter, as paid by every
+`python3 -c` / heredoc helper in the benchmark and validation scripts.
+
+Usage:
+    python3 baselines_benchmark.py startup [runs]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+UTILS_DIR = os.path.join(BENCHMARK_DIR, "..", "utils")
+sys.path.insert(0, UTILS_DIR)
+
+import baseline_store  # noqa: E402
+
+LOOKUPS = [
+    ("interpreter only", "pass"),
+    ("get_gpu_baseline", "from performance_baselines import get_gpu_baseline; "
+                         "get_gpu_baseline('NVIDIAA100-SXM4-80GB')"),
+    ("get_gpu_cuda_info", "from cuda_compatibility import get_gpu_cuda_info; get_gpu_cuda_info('A100')"),
+    ("get_image_url", "from ngc_images import get_image_url; get_image_url('pytorch')"),
+]
+
+
+def _run_ms(code: str, cwd: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+
+def _drop_cache():
+    try:
+        os.remove(baseline_store._cache_path())
+    except FileNotFoundError:
+        pass
+
+
+def benchmark_startup(runs: int = 30):
+    """Median wall time of one lookup in a new process, with and without the marshal cache"""
+    tables = baseline_store.load()
+    with tempfile.TemporaryDirectory() as tmp:
+        # What importing used to cost: every table built from dict literals
+        with open(os.path.join(tmp, "literal_tables.py"), "w") as f:
+            f.write("from typing import Any, Dict\n")
+            for name, table in tables.items():
+                f.write(f"{name.upper()} = {table!r}\n")
+        literal_code = "import literal_tables; literal_tables.GPU_BASELINES['A100-SXM4-80GB']"
+        _run_ms(literal_code, tmp)
+
+        # Variants take turns so drift on the host hits them all alike
+        results = {name: ([], []) for name, _ in LOOKUPS}
+        literal = []
+        for _ in range(runs):
+            literal.append(_run_ms(literal_code, tmp))
+            for name, code in LOOKUPS:
+                cached, cold = results[name]
+                cached.append(_run_ms(code, UTILS_DIR))
+                _drop_cache()
+                cold.append(_run_ms(code, UTILS_DIR))
+    # Leave a warm cache behind
+    _run_ms(LOOKUPS[1][1], UTILS_DIR)
+
+    def median(values):
+        return sorted(values)[len(values) // 2]
+
+    print(f"{'Lookup':<20} {'Cached ms':>10} {'No cache ms':>12}")
+    print("-" * 44)
+    for name, (cached, cold) in results.items():
+        print(f"{name:<20} {median(cached):>10.1f} {median(cold):>12.1f}")
+    print(f"{'literal tables':<20} {median(literal):>10.1f}  (all tables as in-code dicts, with typing)")
+    print(f"\nData file: {os.path.getsize(baseline_store.DATA_FILE)} bytes")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "startup":
+        runs = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+        benchmark_startup(runs)
+    else:
+        print("Usage:")
+        print("  python3 baselines_benchmark.py startup [runs]")
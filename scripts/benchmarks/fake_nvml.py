@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Fake pynvml Backend
+Stand-in for the pynvml module so gpu_health.py can be exercised and
+benchmarked on hosts without NVIDIA GPUs. Every NVML entry point is counted.
+
+Usage:
+    import fake_nvml
+    fake_nvml.install(device_count=8)
+    import gpu_health   # now binds to the fake module
+"""
+
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+# NVML constants used by the scripts in this repository
+NVML_TEMPERATURE_GPU = 0
+NVML_MEMORY_ERROR_TYPE_CORRECTED = 0
+NVML_MEMORY_ERROR_TYPE_UNCORRECTED = 1
+NVML_VOLATILE_ECC = 0
+NVML_AGGREGATE_ECC = 1
+NVML_ERROR_TIMEOUT = 10
+NVML_PAGE_RETIREMENT_CAUSE_MULTIPLE_SINGLE_BIT_ECC_ERRORS = 0
+NVML_PAGE_RETIREMENT_CAUSE_DOUBLE_BIT_ECC_ERROR = 1
+NVML_CLOCK_SM = 1
+NVML_CLOCK_MEM = 2
+NVML_PCIE_UTIL_TX_BYTES = 0
+NVML_PCIE_UTIL_RX_BYTES = 1
+NVML_FEATURE_DISABLED = 0
+NVML_FEATURE_ENABLED = 1
+NVML_NVLINK_MAX_LINKS = 18
+NVML_SUCCESS = 0
+NVML_VALUE_TYPE_UNSIGNED_INT = 1
+NVML_VALUE_TYPE_UNSIGNED_LONG_LONG = 3
+NVML_FI_DEV_ECC_SBE_VOL_TOTAL = 3
+NVML_FI_DEV_ECC_DBE_VOL_TOTAL = 4
+NVML_FI_DEV_RETIRED_SBE = 29
+NVML_FI_DEV_RETIRED_DBE = 30
+NVML_FI_DEV_PCIE_REPLAY_COUNTER = 94
+NVML_FI_DEV_POWER_AVERAGE = 185
+NVML_FI_DEV_POWER_REQUESTED_LIMIT = 192
+nvmlEventTypeSingleBitEccError = 0x0001
+nvmlEventTypeDoubleBitEccError = 0x0002
+nvmlEventTypeXidCriticalError = 0x0008
+
+# Number of calls per NVML function since the last reset_counts()
+CALL_COUNTS = Counter()
+
+
+class FakeDevice(SimpleNamespace):
+    """Handle of one fake GPU; attributes are the DEFAULT_DEVICE keys"""
+
+
+class NVMLError(Exception):
+    """Mirror of pynvml.NVMLError"""
+
+    def __init__(self, value: int = 999):
+        super().__init__(value)
+        self.value = value
+
+    def __str__(self):
+        return f"Fake NVML error {self.value}"
+
+
+# Default attributes of a fake GPU; override per device through configure()
+DEFAULT_DEVICE = {
+    "name": "NVIDIA A100-SXM4-80GB",
+    "memory_total": 85899345920,
+    "memory_used": 1073741824,
+    "temperature": 45,
+    "util_gpu": 0,
+    "util_memory": 0,
+    "power_draw_mw": 65000,
+    "power_limit_mw": 400000,
+    "pcie_gen": 4,
+    "pcie_width": 16,
+    "pcie_max_gen": 4,
+    "pcie_max_width": 16,
+    "ecc_corrected": 0,
+    "ecc_uncorrected": 0,
+    # Dicts with pid and usedGpuMemory
+    "processes": [],
+    # Dicts with pid, timeStamp, smUtil and memUtil
+    "process_utilization": [],
+    "retired_pages_sbe": 0,
+    "retired_pages_dbe": 0,
+    "remapped_rows": (0, 0, 0, 0),   # correctable, uncorrectable, pending, failure
+    "pcie_replays": 0,
+    "throttle_reasons": 0x0001,      # GpuIdle
+    "sm_clock": 210,
+    "sm_clock_max": 1410,
+    "mem_clock": 1593,
+    "mem_clock_max": 1593,
+    "pcie_tx_kbs": 0,
+    "pcie_rx_kbs": 0,
+    "nvlink_count": 12,
+    # Links reported inactive
+    "nvlink_down": (),
+    # link -> (replay, recovery, crc_flit, crc_data) error counters
+    "nvlink_errors": {},
+    # Names of NVML functions that raise NVMLError for this device; NVML_FI_*
+    # names fail only that entry of nvmlDeviceGetFieldValues
+    "unsupported": (),
+    # Seconds every per-device call sleeps before answering
+    "latency": 0.0,
+    # Seconds every per-device call spins on the CPU, like the driver ioctl
+    # a real NVML query runs on the calling thread
+    "cpu_latency": 0.0,
+    # Names of NVML functions that block until release_hangs() (True: all)
+    "hang": (),
+    # Event type bits reported by nvmlDeviceGetSupportedEventTypes
+    "supported_events": 0x000B,
+}
+
+# Set by release_hangs() to unblock calls stuck on a hung device
+_hang_release = threading.Event()
+
+_state = {
+    "driver_version": "535.154.05",
+    "cuda_driver_version": 12020,
+    "devices": [],
+    # Event sets created through nvmlEventSetCreate
+    "event_sets": [],
+}
+
+
+def configure(device_count: int = 8, devices: List[Dict[str, Any]] = None, **overrides):
+    """Reset the fake node to device_count GPUs (or explicit device dicts)"""
+    if devices is None:
+        devices = [{} for _ in range(device_count)]
+
+    _hang_release.clear()
+    _state["event_sets"] = []
+    _state["devices"] = []
+    for index, spec in enumerate(devices):
+        device = dict(DEFAULT_DEVICE)
+        device.update(overrides)
+        device.update(spec)
+        device["index"] = index
+        device.setdefault("uuid", f"GPU-{index:08x}-fake-0000-0000-000000000000")
+        _state["devices"].append(FakeDevice(**device))
+    reset_counts()
+
+
+def reset_counts():
+    """Zero the per-function call counters"""
+    CALL_COUNTS.clear()
+
+
+def release_hangs():
+    """Let every call blocked on a hung fake device return"""
+    _hang_release.set()
+
+
+def inject_event(index: int, event_type: int, event_data: int = 0):
+    """Deliver an event from GPU `index` to every set it is registered with"""
+    device = _state["devices"][index]
+    for event_set in _state["event_sets"]:
+        mask = event_set.registered.get(index, 0)
+        if mask & event_type:
+            event_set.queue.put(SimpleNamespace(device=device, eventType=event_type, eventData=event_data))
+
+
+def install(device_count: int = 8, **kwargs):
+    """Register this module as pynvml and configure the fake node"""
+    configure(device_count, **kwargs)
+    sys.modules["pynvml"] = sys.modules[__name__]
+
+
+def _counted(func):
+    """Count invocations and apply per-device latency, hangs and errors"""
+    name = func.__name__
+
+    def wrapper(*args):
+        CALL_COUNTS[name] += 1
+        if args and isinstance(args[0], FakeDevice):
+            device = args[0]
+            if device.latency:
+                time.sleep(device.latency)
+            if device.cpu_latency:
+                spin_until = time.perf_counter() + device.cpu_latency
+                while time.perf_counter() < spin_until:
+                    pass
+            if device.hang is True or name in device.hang:
+                _hang_release.wait()
+            if name in device.unsupported:
+                raise NVMLError(3)  # NVML_ERROR_NOT_SUPPORTED
+        return func(*args)
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+@_counted
+def nvmlInit():
+    pass
+
+
+@_counted
+def nvmlShutdown():
+    pass
+
+
+@_counted
+def nvmlSystemGetDriverVersion():
+    return _state["driver_version"]
+
+
+@_counted
+def nvmlSystemGetCudaDriverVersion():
+    return _state["cuda_driver_version"]
+
+
+@_counted
+def nvmlDeviceGetCount():
+    return len(_state["devices"])
+
+
+@_counted
+def nvmlDeviceGetHandleByIndex(index):
+    try:
+        return _state["devices"][index]
+    except IndexError:
+        raise NVMLError(2)  # NVML_ERROR_INVALID_ARGUMENT
+
+
+@_counted
+def nvmlDeviceGetName(handle):
+    return handle.name
+
+
+@_counted
+def nvmlDeviceGetUUID(handle):
+    return handle.uuid
+
+
+@_counted
+def nvmlDeviceGetMemoryInfo(handle):
+    return SimpleNamespace(
+        total=handle.memory_total,
+        used=handle.memory_used,
+        free=handle.memory_total - handle.memory_used,
+    )
+
+
+@_counted
+def nvmlDeviceGetTemperature(handle, sensor):
+    return handle.temperature
+
+
+@_counted
+def nvmlDeviceGetUtilizationRates(handle):
+    return SimpleNamespace(gpu=handle.util_gpu, memory=handle.util_memory)
+
+
+@_counted
+def nvmlDeviceGetPowerUsage(handle):
+    return handle.power_draw_mw
+
+
+@_counted
+def nvmlDeviceGetPowerManagementLimit(handle):
+    return handle.power_limit_mw
+
+
+@_counted
+def nvmlDeviceGetCurrPcieLinkGeneration(handle):
+    return handle.pcie_gen
+
+
+@_counted
+def nvmlDeviceGetCurrPcieLinkWidth(handle):
+    return handle.pcie_width
+
+
+@_counted
+def nvmlDeviceGetMaxPcieLinkGeneration(handle):
+    return handle.pcie_max_gen
+
+
+@_counted
+def nvmlDeviceGetMaxPcieLinkWidth(handle):
+    return handle.pcie_max_width
+
+
+@_counted
+def nvmlDeviceGetTotalEccErrors(handle, error_type, counter_type):
+    if error_type == NVML_MEMORY_ERROR_TYPE_CORRECTED:
+        return handle.ecc_corrected
+    return handle.ecc_uncorrected
+
+
+@_counted
+def nvmlDeviceGetComputeRunningProcesses(handle):
+    return [SimpleNamespace(**proc) for proc in handle.processes]
+
+
+
+@_counted
+def nvmlDeviceGetProcessUtilization(handle, last_seen_timestamp):
+    samples = [SimpleNamespace(**sample) for sample in handle.process_utilization
+               if sample["timeStamp"] > last_seen_timestamp]
+    if not samples:
+        raise NVMLError(6)  # NVML_ERROR_NOT_FOUND
+    return samples
+
+
+@_counted
+def nvmlDeviceGetIndex(handle):
+    return handle.index
+
+
+@_counted
+def nvmlEventSetCreate():
+    event_set = SimpleNamespace(queue=queue.Queue(), registered={})
+    _state["event_sets"].append(event_set)
+    return event_set
+
+
+@_counted
+def nvmlDeviceGetSupportedEventTypes(handle):
+    return handle.supported_events
+
+
+@_counted
+def nvmlDeviceRegisterEvents(handle, event_types, event_set):
+    event_set.registered[handle.index] = event_set.registered.get(handle.index, 0) | event_types
+
+
+@_counted
+def nvmlEventSetWait_v2(event_set, timeout_ms):
+    try:
+        return event_set.queue.get(timeout=timeout_ms / 1000.0)
+    except queue.Empty:
+        raise NVMLError(NVML_ERROR_TIMEOUT)
+
+
+@_counted
+def nvmlEventSetFree(event_set):
+    if event_set in _state["event_sets"]:
+        _state["event_sets"].remove(event_set)
+
+
+@_counted
+def nvmlDeviceGetRetiredPages(handle, source_filter):
+    if source_filter == NVML_PAGE_RETIREMENT_CAUSE_DOUBLE_BIT_ECC_ERROR:
+        return [0x1000 * i for i in range(handle.retired_pages_dbe)]
+    return [0x1000 * i for i in range(handle.retired_pages_sbe)]
+
+
+@_counted
+def nvmlDeviceGetRemappedRows(handle):
+    return handle.remapped_rows
+
+
+@_counted
+def nvmlDeviceGetPcieReplayCounter(handle):
+    return handle.pcie_replays
+
+
+@_counted
+def nvmlDeviceGetCurrentClocksThrottleReasons(handle):
+    return handle.throttle_reasons
+
+
+@_counted
+def nvmlDeviceGetClockInfo(handle, clock_type):
+    return handle.sm_clock if clock_type == NVML_CLOCK_SM else handle.mem_clock
+
+
+@_counted
+def nvmlDeviceGetMaxClockInfo(handle, clock_type):
+    return handle.sm_clock_max if clock_type == NVML_CLOCK_SM else handle.mem_clock_max
+
+
+@_counted
+def nvmlDeviceGetPcieThroughput(handle, counter):
+    return handle.pcie_tx_kbs if counter == NVML_PCIE_UTIL_TX_BYTES else handle.pcie_rx_kbs
+
+
+# Field id -> (device attribute, nvmlValueType_t, c_nvmlValue_t member)
+_FIELD_VALUES = {
+    NVML_FI_DEV_ECC_SBE_VOL_TOTAL: ("ecc_corrected", NVML_VALUE_TYPE_UNSIGNED_LONG_LONG, "ullVal"),
+    NVML_FI_DEV_ECC_DBE_VOL_TOTAL: ("ecc_uncorrected", NVML_VALUE_TYPE_UNSIGNED_LONG_LONG, "ullVal"),
+    NVML_FI_DEV_RETIRED_SBE: ("retired_pages_sbe", NVML_VALUE_TYPE_UNSIGNED_LONG_LONG, "ullVal"),
+    NVML_FI_DEV_RETIRED_DBE: ("retired_pages_dbe", NVML_VALUE_TYPE_UNSIGNED_LONG_LONG, "ullVal"),
+    NVML_FI_DEV_PCIE_REPLAY_COUNTER: ("pcie_replays", NVML_VALUE_TYPE_UNSIGNED_LONG_LONG, "ullVal"),
+    NVML_FI_DEV_POWER_AVERAGE: ("power_draw_mw", NVML_VALUE_TYPE_UNSIGNED_INT, "uiVal"),
+    NVML_FI_DEV_POWER_REQUESTED_LIMIT: ("power_limit_mw", NVML_VALUE_TYPE_UNSIGNED_INT, "uiVal"),
+}
+_FIELD_NAMES = {value: name for name, value in globals().items() if name.startswith("NVML_FI_")}
+
+
+@_counted
+def nvmlDeviceGetFieldValues(handle, field_ids):
+    results = []
+    for field_id in field_ids:
+        attr, value_type, member = _FIELD_VALUES[field_id]
+        if _FIELD_NAMES[field_id] in handle.unsupported:
+            results.append(SimpleNamespace(fieldId=field_id, valueType=value_type, nvmlReturn=3,
+                                           value=SimpleNamespace(**{member: 0})))
+        else:
+            results.append(SimpleNamespace(fieldId=field_id, valueType=value_type, nvmlReturn=NVML_SUCCESS,
+                                           value=SimpleNamespace(**{member: getattr(handle, attr)})))
+    return results
+
+
+@_counted
+def nvmlDeviceGetNvLinkState(handle, link):
+    if link >= handle.nvlink_count:
+        raise NVMLError(2)  # NVML_ERROR_INVALID_ARGUMENT
+    return NVML_FEATURE_DISABLED if link in handle.nvlink_down else NVML_FEATURE_ENABLED
+
+
+@_counted
+def nvmlDeviceGetNvLinkErrorCounter(handle, link, counter):
+    return handle.nvlink_errors.get(link, (0, 0, 0, 0))[counter]
+
+
+@_counted
+def nvmlDeviceGetNvLinkUtilizationCounter(handle, link, counter):
+    return (0, 0)
+
+
+configure()
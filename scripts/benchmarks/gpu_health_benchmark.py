@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+"""
+gpu_health.py Benchmarks
+Runs GPUHealthChecker against the fake pynvml backend and reports
+NVML call counts and timings, so collection changes can be measured
+on hosts without GPUs.
+
+Usage:
+    python3 gpu_health_benchmark.py calls [gpu_count]
+    python3 gpu_health_benchmark.py deadline [gpu_count] [deadline_s]
+    python3 gpu_health_benchmark.py watch [gpu_count] [samples]
+    python3 gpu_health_benchmark.py exporter [clients] [scrapes_per_client]
+    python3 gpu_health_benchmark.py agent [queries]
+    python3 gpu_health_benchmark.py events [events]
+    python3 gpu_health_benchmark.py state [probes]
+    python3 gpu_health_benchmark.py rules [gpu_count]
+    python3 gpu_health_benchmark.py fields [gpu_count]
+    python3 gpu_health_benchmark.py formats [nodes]
+    python3 gpu_health_benchmark.py fleet [hosts]
+"""
+
+import asyncio
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR)
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, "..", "validation"))
+
+import fake_nvml  # noqa: E402
+
+fake_nvml.install()
+
+import gpu_counter_state  # noqa: E402
+import gpu_exporter  # noqa: E402
+import gpu_fleet  # noqa: E402
+import gpu_health  # noqa: E402
+import gpu_health_agent  # noqa: E402
+import gpu_report_io  # noqa: E402
+import gpu_rules  # noqa: E402
+import gpu_telemetry  # noqa: E402
+
+
+# gpu_health.py before DeviceSnapshot: check_gpu_info per GPU, then
+# perform_health_checks re-reading every device
+BASELINE_REVISION = "0eef220"
+
+# Field groups covering the per-GPU reads of BASELINE_REVISION
+BASELINE_FIELDS = ["memory", "temperature", "utilization", "power", "pcie", "ecc_errors", "processes"]
+
+
+def _load_revision(revision: str, path: str, name: str):
+    """Import `path` as of git `revision` under module name `name`, or None"""
+    try:
+        source = subprocess.run(["git", "show", f"{revision}:{path}"], cwd=BENCHMARK_DIR,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Warning: cannot read {path} at {revision}: {e}", file=sys.stderr)
+        return None
+    module = types.ModuleType(name)
+    module.__file__ = f"{revision}:{path}"
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return module
+
+
+def _report_calls(checker) -> dict:
+    fake_nvml.reset_counts()
+    checker.generate_report()
+    calls = dict(fake_nvml.CALL_COUNTS)
+    # Driver/CUDA version lookups are per node, not per device
+    for name in ("nvmlSystemGetDriverVersion", "nvmlSystemGetCudaDriverVersion"):
+        calls.pop(name, None)
+    return calls
+
+
+def benchmark_calls(gpu_count: int = 8):
+    """Compare NVML calls of generate_report before DeviceSnapshot and now"""
+    fake_nvml.configure(gpu_count)
+    old = _load_revision(BASELINE_REVISION, "scripts/validation/gpu_health.py", "gpu_health_baseline")
+    if old is None:
+        return None
+    before_calls = _report_calls(old.GPUHealthChecker())
+    checker = gpu_health.GPUHealthChecker()
+    after_calls = _report_calls(checker)
+    repeat_calls = _report_calls(checker)
+    same_fields = gpu_health.GPUHealthChecker()
+    same_fields.select(BASELINE_FIELDS)
+    same_calls = _report_calls(same_fields)
+
+    print(f"\nNVML calls of generate_report for {gpu_count} GPUs")
+    print("=" * 72)
+    print(f"{'function':45s} {BASELINE_REVISION:>12s} {'current':>12s}")
+    for name in sorted(set(before_calls) | set(after_calls)):
+        print(f"{name:45s} {before_calls.get(name, 0):12d} {after_calls.get(name, 0):12d}")
+
+    # Later checks read more fields; compare collecting the fields both versions read
+    before = sum(before_calls.values())
+    after = sum(same_calls.values())
+    added = sum(after_calls.values()) - after
+    print("-" * 72)
+    print(f"{'total':45s} {before:12d} {sum(after_calls.values()):12d}")
+    print(f"Fields read by {BASELINE_REVISION}: {before / gpu_count:.1f} -> {after / gpu_count:.1f} calls per GPU "
+          f"({(before - after) / before * 100:.0f}% fewer)")
+    print(f"Fields added since: {added / gpu_count:.1f} calls per GPU")
+    print(f"Repeat report on the same checker: {sum(repeat_calls.values()) / gpu_count:.1f} calls per GPU "
+          f"(cached handles and maximum clocks)")
+    return before, after
+
+
+# Field groups of a cheap probe; the deadline is sized for these, not for --fields nvlink
+DEADLINE_FIELDS = ["memory", "temperature", "utilization", "power", "pcie", "ecc_errors"]
+
+
+def benchmark_deadline(gpu_count: int = 8, deadline: float = 1.0, slow_share: float = 0.5,
+                       epsilon: float = 0.05):
+    """
+    Time serial vs concurrent collection with a slow GPU and a hung GPU
+
+    Per-call latency is scaled so a healthy GPU answers in 5% of the
+    deadline and the slow one in `slow_share` of it: the slow GPU must
+    report ok, the hung one timeout, and the node must finish within
+    max(slow GPU, deadline) + epsilon.
+    """
+    fake_nvml.configure(gpu_count)
+    checker = gpu_health.GPUHealthChecker()
+    checker.select(DEADLINE_FIELDS)
+    fake_nvml.reset_counts()
+    checker.collect_snapshot(0)
+    calls = sum(fake_nvml.CALL_COUNTS.values())
+    slow_s = deadline * slow_share
+    latency = deadline * 0.05 / calls
+
+    devices = [{"latency": latency} for _ in range(gpu_count)]
+    devices[1]["latency"] = slow_s / calls    # sick but answering
+    devices[-1]["hang"] = ("nvmlDeviceGetTemperature",)
+    fake_nvml.configure(devices=devices)
+
+    def timed(checker):
+        checker.select(DEADLINE_FIELDS)
+        start = time.perf_counter()
+        snapshots = checker.collect_snapshots()
+        return snapshots, time.perf_counter() - start
+
+    snapshots, concurrent_s = timed(gpu_health.GPUHealthChecker(deadline=deadline))
+    serial = gpu_health.GPUHealthChecker()
+    serial.device_count = gpu_count - 1
+    _, serial_s = timed(serial)
+    fake_nvml.release_hangs()
+
+    print(f"\nCollection of {gpu_count} GPUs, {calls} NVML calls each, GPU 1 slow ({slow_s * 1000:.0f} ms), "
+          f"GPU {gpu_count - 1} hung, deadline {deadline:.2f}s")
+    print("=" * 72)
+    for snapshot in snapshots:
+        print(f"  GPU {snapshot.index}: {snapshot.status}")
+    expected = ["ok"] * (gpu_count - 1) + ["timeout"]
+    statuses = [snapshot.status for snapshot in snapshots]
+    print(f"{'Statuses (slow ok, hung timeout)':40s} {'OK' if statuses == expected else 'WRONG'}")
+    print(f"{'Serial, without the hung GPU':40s} {serial_s * 1000:8.1f} ms (hung GPU would block forever)")
+    print(f"{'Concurrent, with hung GPU':40s} {concurrent_s * 1000:8.1f} ms")
+    bound = max(slow_s, deadline) + epsilon
+    print(f"{f'Bound max(slow GPU, deadline) + {epsilon * 1000:.0f} ms':40s} {bound * 1000:8.1f} ms -> "
+          f"{'OK' if concurrent_s <= bound else 'EXCEEDED'}")
+    return concurrent_s, bound
+
+
+def benchmark_watch(gpu_count: int = 8, samples: int = 200, history: int = 600, cpu_latency: float = 50e-6):
+    """Per-sample NVML calls and CPU cost of the --watch loop, and ring buffer memory"""
+    fake_nvml.configure(devices=[{"cpu_latency": cpu_latency} for _ in range(gpu_count)])
+    print(f"\nWatch sampling of {gpu_count} GPUs, {samples} samples, history {history}, "
+          f"{cpu_latency * 1e6:.0f} us CPU per NVML call")
+    print("=" * 72)
+
+    for fields in (None, list(gpu_telemetry.TELEMETRY_FIELDS)):
+        for label, deadline in (("serial", None), ("concurrent", 10.0)):
+            checker = gpu_health.GPUHealthChecker(deadline=deadline)
+            if fields:
+                checker.select(fields)
+            store = gpu_telemetry.TelemetryStore(history)
+            sampler = gpu_telemetry.TelemetrySampler(checker.collect_snapshots, store, interval=1.0)
+            sampler.sample_once()
+            bytes_after_first = store.nbytes
+            fake_nvml.reset_counts()
+            for _ in range(samples - 1):
+                sampler.sample_once()
+            calls = sum(fake_nvml.CALL_COUNTS.values()) / (samples - 1) / gpu_count
+            cost = sampler.cost()
+            print(f"{'telemetry' if fields else 'all fields':10s} {label:10s} {calls:5.1f} calls/GPU  "
+                  f"{cost['cpu_ms_per_sample']:8.3f} ms CPU/sample  "
+                  f"{cost['core_percent_at_rate']:6.2f}% of a core at 1 Hz  "
+                  f"buffers {bytes_after_first} -> {store.nbytes} bytes")
+
+    start = time.perf_counter()
+    store.summary()
+    print(f"Window summary over {history} samples: {(time.perf_counter() - start) * 1000:.1f} ms")
+    print("--watch collects the telemetry fields unless --fields or --checks ask for more")
+
+
+def benchmark_exporter(clients: int = 32, scrapes: int = 200, gpu_count: int = 8):
+    """Scrape latency under concurrent clients; NVML calls stay per refresh"""
+    fake_nvml.configure(gpu_count, latency=0.001)
+    checker = gpu_health.GPUHealthChecker(deadline=5.0)
+    server, cache = gpu_exporter.serve(checker, "127.0.0.1", 0, interval=0.5)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    cache.page(wait=5.0)
+    fake_nvml.reset_counts()
+    refreshes_before = cache.refreshes
+
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        local = []
+        for _ in range(scrapes):
+            start = time.perf_counter()
+            conn.request("GET", "/metrics")
+            conn.getresponse().read()
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    # An XID storm: every event triggers a refresh, and the burst coalesces
+    burst_before = cache.refreshes
+    for _ in range(1000):
+        cache.trigger()
+    time.sleep(cache.interval / 2)
+    burst_refreshes = cache.refreshes - burst_before
+    server.shutdown()
+    cache.stop()
+
+    latencies.sort()
+    refreshes = cache.refreshes - refreshes_before
+    nvml_calls = sum(fake_nvml.CALL_COUNTS.values())
+    print(f"\nExporter: {clients} clients x {scrapes} scrapes, {gpu_count} GPUs (1 ms per NVML call)")
+    print("=" * 72)
+    print(f"Scrapes:        {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s)")
+    for q in (50, 95, 99):
+        print(f"Latency p{q}:    {gpu_telemetry.percentile(latencies, q) * 1000:8.2f} ms")
+    print(f"Latency max:    {latencies[-1] * 1000:8.2f} ms")
+    print(f"Event burst:    1000 triggers -> {burst_refreshes} refresh(es)")
+    print(f"NVML calls:     {nvml_calls} from {refreshes} background refreshes (0 from scrapes)")
+
+
+def benchmark_agent(queries: int = 500, gpu_count: int = 8):
+    """Query latency through the resident agent vs in-process collection"""
+    fake_nvml.configure(gpu_count)
+    socket_path = os.path.join(tempfile.mkdtemp(), "gpu-health.sock")
+    agent = gpu_health_agent.HealthAgent(gpu_health.GPUHealthChecker(deadline=10.0), max_age=0)
+    server = gpu_health_agent.AgentServer(socket_path, agent)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"\nHealth agent: {queries} queries, {gpu_count} GPUs")
+    print("=" * 72)
+    for query in ("ping", "health", "report"):
+        latencies = []
+        for _ in range(queries):
+            start = time.perf_counter()
+            gpu_health_agent.query_agent(query, socket_path)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(f"agent {query:8s}  p50 {gpu_telemetry.percentile(latencies, 50) * 1000:7.3f} ms"
+              f"  p99 {gpu_telemetry.percentile(latencies, 99) * 1000:7.3f} ms")
+
+    start = time.perf_counter()
+    for _ in range(20):
+        gpu_health_agent.collect_in_process("health")
+    print(f"in-process health    {(time.perf_counter() - start) / 20 * 1000:7.3f} ms"
+          " (excludes interpreter start and pynvml import)")
+
+    client = os.path.join(BENCHMARK_DIR, "..", "validation", "gpu_health_agent.py")
+    start = time.perf_counter()
+    for _ in range(10):
+        subprocess.run([sys.executable, client, "query", "-q", "health", "-s", socket_path],
+                       stdout=subprocess.DEVNULL, check=False)
+    print(f"thin client process  {(time.perf_counter() - start) / 10 * 1000:7.3f} ms"
+          " (full CLI invocation against the agent)")
+    server.shutdown()
+    server.server_close()
+
+
+def benchmark_events(events: int = 200, gpu_count: int = 8):
+    """XID detection latency through the event watcher and its idle CPU cost"""
+    fake_nvml.configure(gpu_count)
+    checker = gpu_health.GPUHealthChecker()
+    received = []
+    arrived = threading.Semaphore(0)
+
+    def on_event(event):
+        received.append(time.perf_counter())
+        arrived.release()
+
+    watcher = checker.start_event_watcher()
+    watcher.on_event = on_event
+
+    # Idle: the watcher blocks inside the event wait, no NVML polling
+    fake_nvml.reset_counts()
+    cpu_start = time.process_time()
+    time.sleep(2.0)
+    idle_cpu = time.process_time() - cpu_start
+    idle_calls = sum(fake_nvml.CALL_COUNTS.values())
+
+    latencies = []
+    for i in range(events):
+        sent = time.perf_counter()
+        fake_nvml.inject_event(i % gpu_count, fake_nvml.nvmlEventTypeXidCriticalError, 79)
+        arrived.acquire()
+        latencies.append(received[-1] - sent)
+    latencies.sort()
+
+    report = checker.build_report()
+    watcher.stop()
+
+    print(f"\nEvent watcher: {events} injected XID 79 events across {gpu_count} GPUs")
+    print("=" * 72)
+    print(f"Idle 2s:            {idle_cpu * 1000:.2f} ms CPU, {idle_calls} NVML calls (blocking waits only)")
+    print(f"Detection p50:      {gpu_telemetry.percentile(latencies, 50) * 1000:.3f} ms")
+    print(f"Detection p99:      {gpu_telemetry.percentile(latencies, 99) * 1000:.3f} ms")
+    print(f"Report status:      {report['overall_status']} with {len(report['events'])} events")
+
+
+def benchmark_state(probes: int = 500, gpu_count: int = 8):
+    """Cost of the persisted counter state per probe, and its verdicts"""
+    fake_nvml.configure(gpu_count, ecc_uncorrected=2)   # historical errors only
+    checker = gpu_health.GPUHealthChecker()
+    path = os.path.join(tempfile.mkdtemp(), "counters.json")
+    checker.counter_state = gpu_counter_state.CounterState(path)
+    snapshots = checker.collect_snapshots()
+
+    def ecc_status(results):
+        return {c["status"] for r in results for c in r["checks"] if c["check"] == "ecc_errors"}
+
+    first = ecc_status(checker.perform_health_checks(snapshots))
+    start = time.perf_counter()
+    for _ in range(probes):
+        checker.counter_state.update(snapshots)
+    per_update = (time.perf_counter() - start) / probes
+    steady = ecc_status(checker.perform_health_checks(snapshots))
+
+    fake_nvml._state["devices"][3].ecc_uncorrected += 1
+    fresh = checker.perform_health_checks()
+
+    print(f"\nCounter state: {probes} probes, {gpu_count} GPUs, state file {os.path.getsize(path)} bytes")
+    print("=" * 72)
+    print(f"Update (lock, load, delta, fsync, replace): {per_update * 1000:.3f} ms per probe")
+    print(f"Historical ECC errors, first run: {sorted(first)}")
+    print(f"Historical ECC errors, later runs: {sorted(steady)}")
+    print(f"New uncorrected error on GPU 3: "
+          f"{[c['status'] for c in fresh[3]['checks'] if c['check'] == 'ecc_errors']}")
+
+
+def benchmark_rules(gpu_count: int = 10000):
+    """Threshold rules over a fleet of mixed-model GPUs, from snapshots and from saved reports"""
+    models = ["NVIDIA A100-SXM4-80GB", "NVIDIA H100-SXM5-80GB", "NVIDIA H100-PCIE-80GB", "NVIDIA V100-SXM2-32GB"]
+    snapshots = [
+        gpu_health.DeviceSnapshot(
+            index=i % 8, name=models[(i // 8) % len(models)], uuid=f"GPU-{i:08x}",
+            memory_total=85899345920, memory_used=1073741824 * (i % 80), temperature=40 + i % 60,
+            power_draw_mw=60000 + (i % 340) * 1000, power_limit_mw=400000,
+            ecc_uncorrected=1 if i % 997 == 0 else 0,
+            throttle_reasons=0x4 if i % 13 == 0 else 0x1, sm_clock=1200 if i % 13 == 0 else 210, sm_clock_max=1410,
+        )
+        for i in range(gpu_count)
+    ]
+    rules = gpu_rules.RuleSet()
+
+    def best_of(func, runs=5):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    per_gpu, _ = best_of(lambda: [gpu_health.evaluate_health(s) for s in snapshots])
+    batch, checks = best_of(lambda: rules.evaluate_batch(snapshots))
+    reports = [{"gpus": [gpu_health.snapshot_to_info(s) for s in snapshots[n:n + 8]]}
+               for n in range(0, gpu_count, 8)]
+    fleet, _ = best_of(lambda: gpu_rules.evaluate_reports(reports, rules))
+
+    statuses = {}
+    for gpu_checks in checks:
+        for check in gpu_checks:
+            statuses[check["status"]] = statuses.get(check["status"], 0) + 1
+    print(f"{gpu_count} GPUs, {len(models)} models, {len(rules.compiled(models[0]))} threshold rules")
+    print(f"  evaluate_health per GPU (all checks)  {per_gpu * 1000:8.1f} ms")
+    print(f"  RuleSet.evaluate_batch (thresholds)   {batch * 1000:8.1f} ms")
+    print(f"  evaluate_reports ({len(reports)} node reports) {fleet * 1000:8.1f} ms")
+    print(f"  verdicts: {statuses}")
+
+
+def benchmark_fields(gpu_count: int = 8, latency: float = 0.0001, rounds: int = 20):
+    """NVML calls and wall time of collecting each --fields group on its own"""
+    pids = [{"pid": os.getpid(), "usedGpuMemory": 1 << 30}] * 4
+    fake_nvml.configure(gpu_count, latency=latency, processes=pids)
+    checker = gpu_health.GPUHealthChecker()
+
+    def measure(fields):
+        checker.select(fields)
+        checker.collect_snapshots()
+        fake_nvml.reset_counts()
+        start = time.perf_counter()
+        for _ in range(rounds):
+            checker.collect_snapshots()
+        elapsed = (time.perf_counter() - start) / rounds
+        calls = sum(fake_nvml.CALL_COUNTS.values()) / rounds / gpu_count
+        return calls, elapsed
+
+    base_calls, base_time = measure([])
+    print(f"{gpu_count} GPUs, {latency * 1e6:.0f} us per NVML call; identity (name, UUID) "
+          f"costs {base_calls:.0f} calls/GPU, {base_time * 1000:.2f} ms")
+    print(f"{'Field group':<16} {'Calls/GPU':>10} {'ms/snapshot':>12}")
+    print("-" * 40)
+    for group in gpu_health.FIELD_GROUPS:
+        calls, elapsed = measure([group])
+        print(f"{group:<16} {calls - base_calls:>10.0f} {(elapsed - base_time) * 1000:>12.2f}")
+    print("-" * 40)
+    calls, elapsed = measure(None)
+    print(f"{'default':<16} {calls - base_calls:>10.0f} {(elapsed - base_time) * 1000:>12.2f}")
+    calls, elapsed = measure(list(gpu_health.FIELD_GROUPS))
+    print(f"{'all':<16} {calls - base_calls:>10.0f} {(elapsed - base_time) * 1000:>12.2f}")
+    checker.select(None, ["temperature", "ecc_errors"])
+    fields = sorted(checker.fields)
+    calls, elapsed = measure(fields)
+    print(f"--checks temperature,ecc_errors: {calls:.0f} calls/GPU, {elapsed * 1000:.2f} ms")
+
+
+def benchmark_formats(nodes: int = 2000, gpu_count: int = 8):
+    """Size, write time and streaming fleet-read cost of each report format"""
+    fake_nvml.configure(gpu_count, devices=[{}, {"temperature": 99}] + [{}] * (gpu_count - 2))
+    report = gpu_health.GPUHealthChecker().build_report()
+    writers = {
+        "json": ("w", lambda r, f, host: json.dump(r, f, indent=2)),
+        "ndjson": ("w", gpu_report_io.write_ndjson),
+        "binary": ("wb", gpu_report_io.write_binary),
+    }
+    print(f"{nodes} nodes x {gpu_count} GPUs")
+    print(f"{'Format':<8} {'Bytes/node':>11} {'Write ms/node':>14} {'Fleet read s':>13} {'Peak read MB':>13}")
+    print("-" * 63)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (mode, writer) in writers.items():
+            paths = [os.path.join(tmp, f"node{n:05d}.{name}") for n in range(nodes)]
+            start = time.perf_counter()
+            for n, path in enumerate(paths):
+                with open(path, mode) as f:
+                    writer(report, f, f"node{n:05d}")
+            write_ms = (time.perf_counter() - start) / nodes * 1000
+            size = os.path.getsize(paths[0])
+
+            start = time.perf_counter()
+            summary = gpu_report_io.summarize(gpu_report_io.iter_fleet(paths))
+            read_s = time.perf_counter() - start
+            # Second pass for memory; tracing slows the read down
+            tracemalloc.start()
+            gpu_report_io.summarize(gpu_report_io.iter_fleet(paths))
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            assert summary["gpus"] == nodes * gpu_count
+            print(f"{name:<8} {size:>11} {write_ms:>14.2f} {read_s:>13.2f} {peak:>13.1f}")
+
+
+def benchmark_fleet(hosts: int = 1000, timeout: float = 5.0):
+    """Wall time of a fake fleet collection at several concurrency caps"""
+    names = [f"gpu-node-{i:04d}" for i in range(hosts)]
+    print(f"{hosts} fake hosts, latency 0.05-2.0s, 3% refused, 1% hang, timeout {timeout:g}s, 2 retries")
+    print(f"{'Concurrency':>11} {'Wall s':>8} {'Host s total':>13} {'Speedup':>8} {'OK':>6} {'Lost':>5} {'Retried':>8}")
+    print("-" * 65)
+    for concurrency in (16, 64, 256, hosts):
+        transport = gpu_fleet.FakeTransport()
+        run = transport.run
+        busy = []
+
+        async def timed_run(host):
+            # Time every attempt, including ones cut off by the timeout
+            start = time.monotonic()
+            try:
+                return await run(host)
+            finally:
+                busy.append(time.monotonic() - start)
+
+        transport.run = timed_run
+        fleet = asyncio.run(gpu_fleet.run_fleet(names, transport, concurrency, timeout,
+                                                retries=2, backoff=0.2))
+        wall = fleet["collection"]["wall_seconds"]
+        # A serial collector would wait out every attempt back to back
+        serial = sum(busy)
+        print(f"{concurrency:>11} {wall:>8.2f} {serial:>13.1f} {serial / wall:>7.0f}x {fleet['nodes']:>6} "
+              f"{len(fleet['unreachable']):>5} {fleet['collection']['retried_hosts']:>8}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "calls":
+        gpus = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+        benchmark_calls(gpus)
+    elif len(sys.argv) > 1 and sys.argv[1] == "deadline":
+        gpus = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+        deadline = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+        benchmark_deadline(gpus, deadline)
+    elif len(sys.argv) > 1 and sys.argv[1] == "watch":
+        gpus = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+        samples = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+        benchmark_watch(gpus, samples)
+    elif len(sys.argv) > 1 and sys.argv[1] == "exporter":
+        clients = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+        scrapes = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+        benchmark_exporter(clients, scrapes)
+    elif len(sys.argv) > 1 and sys.argv[1] == "agent":
+        queries = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+        benchmark_agent(queries)
+    elif len(sys.argv) > 1 and sys.argv[1] == "events":
+        events = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+        benchmark_events(events)
+    elif len(sys.argv) > 1 and sys.argv[1] == "state":
+        probes = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+        benchmark_state(probes)
+    elif len(sys.argv) > 1 and sys.argv[1] == "rules":
+        gpus = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+        benchmark_rules(gpus)
+    elif len(sys.argv) > 1 and sys.argv[1] == "fields":
+        gpus = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+        benchmark_fields(gpus)
+    elif len(sys.argv) > 1 and sys.argv[1] == "formats":
+        nodes = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+        benchmark_formats(nodes)
+    elif len(sys.argv) > 1 and sys.argv[1] == "fleet":
+        hosts = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+        benchmark_fleet(hosts)
+    else:
+        print("Usage:")
+        print("  python3 gpu_health_benchmark.py calls [gpu_count]")
+        print("  python3 gpu_health_benchmark.py deadline [gpu_count] [deadline_s]")
+        print("  python3 gpu_health_benchmark.py watch [gpu_count] [samples]")
+        print("  python3 gpu_health_benchmark.py exporter [clients] [scrapes_per_client]")
+        print("  python3 gpu_health_benchmark.py agent [queries]")
+        print("  python3 gpu_health_benchmark.py events [events]")
+        print("  python3 gpu_health_benchmark.py state [probes]")
+        print("  python3 gpu_health_benchmark.py rules [gpu_count]")
+        print("  python3 gpu_health_benchmark.py fields [gpu_count]")
+        print("  python3 gpu_health_benchmark.py formats [nodes]")
+        print("  python3 gpu_health_benchmark.py fleet [hosts]")
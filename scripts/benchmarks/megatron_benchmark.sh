@@ -25,6 +25,8 @@ MODEL_SIZE="${MODEL_SIZE:-GPT-1.2B}"  # GPT-1.2B, GPT-8.3B, or custom
 BATCH_SIZE="${BATCH_SIZE:-8}"
 SEQ_LENGTH="${SEQ_LENGTH:-2048}"
 NUM_STEPS="${NUM_STEPS:-100}"  # Number of training steps for benchmark
+# Let megatron_planner.py pick TP/PP instead of the fixed split by GPU count
+USE_PLANNER="${USE_PLANNER:-false}"
 
 mkdir -p "$OUTPUT_DIR"
 
@@ -119,6 +121,39 @@ echo "  Hidden Size: $HIDDEN_SIZE"
 echo "  Attention Heads: $NUM_ATTENTION_HEADS"
 echo ""
 
+# Tensor and pipeline parallelism: a fixed split by GPU count, or with
+# USE_PLANNER=true the fastest split the planner predicts to fit in GPU
+# memory (its predictions are not yet accurate enough to be the default)
+GLOBAL_BATCH_SIZE=$((BATCH_SIZE * GPU_COUNT))
+PLANNER="$(dirname $0)/../utils/megatron_planner.py"
+[ -f "$PLANNER" ] || PLANNER="$(dirname $0)/megatron_planner.py"
+PLAN=""
+if [ "$USE_PLANNER" = "true" ] && [ -f "$PLANNER" ]; then
+    PLAN=$(python3 "$PLANNER" best --gpu "$GPU_MODEL" --gpus "$GPU_COUNT" \
+        --layers $NUM_LAYERS --hidden $HIDDEN_SIZE --heads $NUM_ATTENTION_HEADS \
+        --seq-length $SEQ_LENGTH -b $GLOBAL_BATCH_SIZE --micro-batches $BATCH_SIZE \
+        --precision fp16 --recompute off --no-flash-attention --format shell 2>/dev/null) || PLAN=""
+fi
+if [ -n "$PLAN" ]; then
+    eval "$PLAN"
+elif [ $GPU_COUNT -ge 8 ]; then
+    TP=4; PP=2
+elif [ $GPU_COUNT -ge 4 ]; then
+    TP=2; PP=2
+elif [ $GPU_COUNT -ge 2 ]; then
+    TP=2; PP=1
+else
+    TP=1; PP=1
+fi
+
+echo "Parallelism Configuration:"
+echo "  Tensor Parallel: $TP"
+echo "  Pipeline Parallel: $PP"
+if [ -n "${PREDICTED_TFLOPS:-}" ]; then
+    echo "  Predicted: ${PREDICTED_TFLOPS} TFLOPS/GPU, MFU ${PREDICTED_MFU}"
+fi
+echo ""
+
 #==========================================
 # Prepare synthetic data for benchmarking
 #==========================================
@@ -147,26 +182,15 @@ DISTRIBUTED_ARGS="
 "
 
 # Tensor and pipeline parallelism
-if [ $GPUS_PER_NODE -ge 8 ]; then
-    TP=4
-    PP=2
-elif [ $GPUS_PER_NODE -ge 4 ]; then
-    TP=2
-    PP=2
-elif [ $GPUS_PER_NODE -ge 2 ]; then
-    TP=2
-    PP=1
-else
-    TP=1
-    PP=1
-fi
+TP=__TP__
+PP=__PP__
 
 echo "Parallelism Configuration:"
 echo "  Tensor Parallel: $TP"
 echo "  Pipeline Parallel: $PP"
 EOF
 
-sed -i "s/__GPU_COUNT__/$GPU_COUNT/g" "$OUTPUT_DIR/benchmark_config.sh"
+sed -i -e "s/__GPU_COUNT__/$GPU_COUNT/g" -e "s/__TP__/$TP/g" -e "s/__PP__/$PP/g" "$OUTPUT_DIR/benchmark_config.sh"
 chmod +x "$OUTPUT_DIR/benchmark_config.sh"
 
 #==========================================
@@ -184,17 +208,6 @@ if [ -d "$MEGATRON_DIR" ]; then
 #!/bin/bash
 source $OUTPUT_DIR/benchmark_config.sh
 
-# Set GPU count based parallelism
-if [ \$GPUS_PER_NODE -ge 8 ]; then
-    TP=4; PP=2
-elif [ \$GPUS_PER_NODE -ge 4 ]; then
-    TP=2; PP=2
-elif [ \$GPUS_PER_NODE -ge 2 ]; then
-    TP=2; PP=1
-else
-    TP=1; PP=1
-fi
-
 cd $MEGATRON_DIR
 
 python -m torch.distributed.launch \
@@ -204,7 +217,7 @@ python -m torch.distributed.launch \
     --hidden-size $HIDDEN_SIZE \
     --num-attention-heads $NUM_ATTENTION_HEADS \
     --micro-batch-size $BATCH_SIZE \
-    --global-batch-size \$(($BATCH_SIZE * $GPU_COUNT)) \
+    --global-batch-size $GLOBAL_BATCH_SIZE \
     --seq-length $SEQ_LENGTH \
     --max-position-embeddings $SEQ_LENGTH \
     --train-iters $NUM_STEPS \
@@ -377,6 +390,9 @@ cat > "$OUTPUT_DIR/benchmark_summary_${TIMESTAMP}.json" << EOF
     "hidden_size": $HIDDEN_SIZE,
     "num_attention_heads": $NUM_ATTENTION_HEADS,
     "batch_size": $BATCH_SIZE,
+    "global_batch_size": $GLOBAL_BATCH_SIZE,
+    "tensor_parallel": $TP,
+    "pipeline_parallel": $PP,
     "seq_length": $SEQ_LENGTH
   },
   "results": {
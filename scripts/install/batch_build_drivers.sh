@@ -15,6 +15,9 @@ NC='\033[0m'
 OUTPUT_DIR="${OUTPUT_DIR:-/opt/precompiled-drivers}"
 BUILD_LOG="${OUTPUT_DIR}/build.log"
 USE_CONTAINER="${USE_CONTAINER:-true}"
+# Optional file of "driver kernel" lines (see scripts/utils/driver_planner.py --build-plan);
+# when set, only these pairs are built instead of every driver x kernel combination
+BUILD_PLAN="${BUILD_PLAN:-}"
 
 # Driver versions to build
 DRIVER_VERSIONS=(
@@ -101,7 +104,33 @@ build_driver() {
 }
 
 # Main build loop
+# Build pairs: either the planner output or the full cross product
+BUILD_PAIRS=()
+if [ -n "$BUILD_PLAN" ]; then
+    if [ ! -f "$BUILD_PLAN" ]; then
+        log_error "Build plan not found: $BUILD_PLAN"
+        exit 1
+    fi
+    while read -r driver kernel _; do
+        [[ -z "$driver" || "$driver" == \#* || -z "${kernel:-}" ]] && continue
+        BUILD_PAIRS+=("$driver|$kernel")
+    done < "$BUILD_PLAN"
+    if [ ${#BUILD_PAIRS[@]} -eq 0 ]; then
+        log_error "Build plan is empty: $BUILD_PLAN"
+        exit 1
+    fi
+    DRIVER_VERSIONS=($(printf '%s\n' "${BUILD_PAIRS[@]}" | cut -d'|' -f1 | sort -uV))
+    KERNEL_VERSIONS=($(printf '%s\n' "${BUILD_PAIRS[@]}" | cut -d'|' -f2 | sort -uV))
+else
+    for driver in "${DRIVER_VERSIONS[@]}"; do
+        for kernel in "${KERNEL_VERSIONS[@]}"; do
+            BUILD_PAIRS+=("$driver|$kernel")
+        done
+    done
+fi
+
 log_info "Starting batch build..."
+[ -n "$BUILD_PLAN" ] && log_info "Build plan: $BUILD_PLAN (${#BUILD_PAIRS[@]} builds)"
 log_info "Driver versions: ${DRIVER_VERSIONS[*]}"
 log_info "Kernel versions: ${KERNEL_VERSIONS[*]}"
 log_info "Output directory: $OUTPUT_DIR"
@@ -110,11 +139,10 @@ echo ""
 
 START_TIME=$(date +%s)
 
-# Build all combinations
-for driver in "${DRIVER_VERSIONS[@]}"; do
-    for kernel in "${KERNEL_VERSIONS[@]}"; do
-        build_driver "$driver" "$kernel"
-    done
+# Build all planned pairs
+for pair in "${BUILD_PAIRS[@]}"; do
+    IFS='|' read -r driver kernel <<< "$pair"
+    build_driver "$driver" "$kernel"
 done
 
 END_TIME=$(date +%s)
@@ -178,6 +206,7 @@ Configuration:
 --------------
 Driver Versions: ${DRIVER_VERSIONS[*]}
 Kernel Versions: ${KERNEL_VERSIONS[*]}
+Build Plan: ${BUILD_PLAN:-all combinations}
 Container Build: $USE_CONTAINER
 Output Directory: $OUTPUT_DIR
 
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Baseline and Compatibility Data Store
+Loads baselines_data.json (GPU, network and Megatron baselines, the
+GPU/CUDA/driver compatibility matrix and the NGC image catalog) on first
+use rather than at import, and merges site overlays over it.
+
+The merged tables are cached with marshal under __pycache__, so later
+processes skip JSON parsing (and importing json); the cache is rebuilt
+when the data file or any overlay changes. Overlays are JSON files with
+the same top-level tables, merged key by key, where null removes a key.
+They are read from $GPU_BASELINE_OVERLAYS (os.pathsep separated) and then
+/etc/gpu-validation/baselines.d/*.json in name order.
+"""
+
+import marshal
+import os
+import sys
+
+DATA_VERSION = 1
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines_data.json")
+OVERLAY_DIR = "/etc/gpu-validation/baselines.d"
+
+_tables = None
+
+
+def overlay_paths() -> list:
+    """Overlay files in merge order"""
+    paths = [path for path in os.environ.get("GPU_BASELINE_OVERLAYS", "").split(os.pathsep) if path]
+    try:
+        paths += sorted(os.path.join(OVERLAY_DIR, name) for name in os.listdir(OVERLAY_DIR)
+                        if name.endswith(".json"))
+    except OSError:
+        pass
+    return paths
+
+
+def merge(base: dict, overlay: dict) -> dict:
+    """Merge overlay into base in place; nested dicts merge, None deletes"""
+    for key, value in overlay.items():
+        if value is None:
+            base.pop(key, None)
+        elif isinstance(value, dict) and isinstance(base.get(key), dict):
+            merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def _cache_path() -> str:
+    directory, name = os.path.split(DATA_FILE)
+    return os.path.join(directory, "__pycache__", f"{name}.marshal")
+
+
+def _read_json(path: str, json) -> dict:
+    with open(path) as f:
+        data = json.load(f)
+    version = data.pop("version", DATA_VERSION)
+    if version != DATA_VERSION:
+        raise ValueError(f"{path}: data version {version}, expected {DATA_VERSION}")
+    return data
+
+
+def load(refresh: bool = False) -> dict:
+    """All tables, merged with overlays; parsed at most once per process"""
+    global _tables
+    if _tables is not None and not refresh:
+        return _tables
+
+    sources = [DATA_FILE] + overlay_paths()
+    stamps = []
+    for path in sources:
+        stat = os.stat(path)
+        stamps.append((path, stat.st_size, stat.st_mtime_ns))
+    key = (sys.hexversion, DATA_VERSION, tuple(stamps))
+
+    cache = _cache_path()
+    try:
+        with open(cache, "rb") as f:
+            cached_key, tables = marshal.load(f)
+        if cached_key == key:
+            _tables = tables
+            return _tables
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    import json
+    tables = _read_json(DATA_FILE, json)
+    for path in sources[1:]:
+        merge(tables, _read_json(path, json))
+    _tables = tables
+
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        tmp_path = f"{cache}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            marshal.dump((key, tables), f)
+        os.replace(tmp_path, cache)
+    except OSError:
+        # Read-only install: every process parses the JSON instead
+        pass
+    return _tables
+
+
+def table(name: str) -> dict:
+    """One table by name, e.g. "gpu_baselines" or "ngc_images" """
+    tables = load()
+    if name not in tables:
+        raise KeyError(f"no table '{name}' in {DATA_FILE}")
+    return tables[name]
+
+
+if __name__ == "__main__":
+    import json
+
+    if len(sys.argv) > 1 and sys.argv[1] == "sources":
+        print(f"Data file: {DATA_FILE} (version {DATA_VERSION})")
+        for path in overlay_paths():
+            print(f"Overlay:   {path}")
+        print(f"Cache:     {_cache_path()}")
+    elif len(sys.argv) > 1 and sys.argv[1] == "tables":
+        for name, entries in load().items():
+            print(f"{name:28s} {len(entries)} entries")
+    elif len(sys.argv) > 2 and sys.argv[1] == "get":
+        try:
+            value = table(sys.argv[2])
+            for key in sys.argv[3:]:
+                value = value[key]
+        except KeyError as e:
+            print(f"Not found: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(value, indent=2))
+    else:
+        print("Usage:")
+        print("  python baseline_store.py sources")
+        print("  python baseline_store.py tables")
+        print("  python baseline_store.py get <table> [key ...]")
@@ -2,226 +2,117 @@
 """
 CUDA Compatibility Matrix for Different GPU Models
 Provides mapping between GPU models and supported CUDA versions
+The matrix itself lives in baselines_data.json (see baseline_store.py)
 """
 
-# GPU Model to CUDA Version Compatibility Matrix
-GPU_CUDA_COMPATIBILITY = {
-    # NVIDIA V100 (Volta, Compute Capability 7.0)
-    "Tesla V100": {
-        "compute_capability": "7.0",
-        "architecture": "Volta",
-        "min_cuda_version": "9.0",
-        "recommended_cuda_version": "12.2",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "396.26",
-        "recommended_driver_version": "535.154.05",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-    "V100-SXM2": {
-        "compute_capability": "7.0",
-        "architecture": "Volta",
-        "min_cuda_version": "9.0",
-        "recommended_cuda_version": "12.2",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "396.26",
-        "recommended_driver_version": "535.154.05",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-    "V100-PCIE": {
-        "compute_capability": "7.0",
-        "architecture": "Volta",
-        "min_cuda_version": "9.0",
-        "recommended_cuda_version": "12.2",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "396.26",
-        "recommended_driver_version": "535.154.05",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-
-    # NVIDIA A100 (Ampere, Compute Capability 8.0)
-    "A100-SXM4": {
-        "compute_capability": "8.0",
-        "architecture": "Ampere",
-        "min_cuda_version": "11.0",
-        "recommended_cuda_version": "12.2",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "450.51.06",
-        "recommended_driver_version": "535.154.05",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-    "A100-PCIE": {
-        "compute_capability": "8.0",
-        "architecture": "Ampere",
-        "min_cuda_version": "11.0",
-        "recommended_cuda_version": "12.2",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "450.51.06",
-        "recommended_driver_version": "535.154.05",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-    "Tesla A100": {
-        "compute_capability": "8.0",
-        "architecture": "Ampere",
-        "min_cuda_version": "11.0",
-        "recommended_cuda_version": "12.2",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "450.51.06",
-        "recommended_driver_version": "535.154.05",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-
-    # NVIDIA H100 (Hopper, Compute Capability 9.0)
-    "H100": {
-        "compute_capability": "9.0",
-        "architecture": "Hopper",
-        "min_cuda_version": "11.8",
-        "recommended_cuda_version": "12.3",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "520.61.05",
-        "recommended_driver_version": "545.23.08",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"],
-        "notes": "H100 requires CUDA 11.8+ for full feature support including FP8"
-    },
-    "H100-SXM5": {
-        "compute_capability": "9.0",
-        "architecture": "Hopper",
-        "min_cuda_version": "11.8",
-        "recommended_cuda_version": "12.3",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "520.61.05",
-        "recommended_driver_version": "545.23.08",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-    "H100-PCIE": {
-        "compute_capability": "9.0",
-        "architecture": "Hopper",
-        "min_cuda_version": "11.8",
-        "recommended_cuda_version": "12.3",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "520.61.05",
-        "recommended_driver_version": "545.23.08",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-
-    # NVIDIA RTX 4090 (Ada Lovelace, Compute Capability 8.9)
-    "RTX 4090": {
-        "compute_capability": "8.9",
-        "architecture": "Ada Lovelace",
-        "min_cuda_version": "11.8",
-        "recommended_cuda_version": "12.2",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "520.61.05",
-        "recommended_driver_version": "535.154.05",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-    "GeForce RTX 4090": {
-        "compute_capability": "8.9",
-        "architecture": "Ada Lovelace",
-        "min_cuda_version": "11.8",
-        "recommended_cuda_version": "12.2",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "520.61.05",
-        "recommended_driver_version": "535.154.05",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-
-    # NVIDIA RTX 3090 (Ampere, Compute Capability 8.6)
-    "RTX 3090": {
-        "compute_capability": "8.6",
-        "architecture": "Ampere",
-        "min_cuda_version": "11.1",
-        "recommended_cuda_version": "12.2",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "455.32.00",
-        "recommended_driver_version": "535.154.05",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-    "GeForce RTX 3090": {
-        "compute_capability": "8.6",
-        "architecture": "Ampere",
-        "min_cuda_version": "11.1",
-        "recommended_cuda_version": "12.2",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "455.32.00",
-        "recommended_driver_version": "535.154.05",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-
-    # NVIDIA A800 (Ampere, Compute Capability 8.0)
-    "A800": {
-        "compute_capability": "8.0",
-        "architecture": "Ampere",
-        "min_cuda_version": "11.0",
-        "recommended_cuda_version": "12.2",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "450.51.06",
-        "recommended_driver_version": "535.154.05",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-
-    # NVIDIA H800 (Hopper, Compute Capability 9.0)
-    "H800": {
-        "compute_capability": "9.0",
-        "architecture": "Hopper",
-        "min_cuda_version": "11.8",
-        "recommended_cuda_version": "12.3",
-        "max_cuda_version": "12.4",
-        "min_driver_version": "520.61.05",
-        "recommended_driver_version": "545.23.08",
-        "supported_cuda_versions": ["11.8", "12.0", "12.1", "12.2", "12.3", "12.4"]
-    },
-}
+import functools
+
+import baseline_store
+from performance_baselines import GPUModelMatch, gpu_model_tokens
 
-# CUDA Version to Driver Version Compatibility
-CUDA_DRIVER_COMPATIBILITY = {
-    "12.4": {
-        "min_driver_linux": "550.54.15",
-        "recommended_driver_linux": "550.90.07"
-    },
-    "12.3": {
-        "min_driver_linux": "545.23.06",
-        "recommended_driver_linux": "545.23.08"
-    },
-    "12.2": {
-        "min_driver_linux": "535.54.03",
-        "recommended_driver_linux": "535.154.05"
-    },
-    "12.1": {
-        "min_driver_linux": "530.30.02",
-        "recommended_driver_linux": "530.30.02"
-    },
-    "12.0": {
-        "min_driver_linux": "525.60.13",
-        "recommended_driver_linux": "525.125.06"
-    },
-    "11.8": {
-        "min_driver_linux": "520.61.05",
-        "recommended_driver_linux": "520.61.05"
-    },
+# Tables live in baselines_data.json and are loaded on first access
+_TABLES = {
+    "GPU_CUDA_COMPATIBILITY": "gpu_cuda_compatibility",
+    "CUDA_DRIVER_COMPATIBILITY": "cuda_driver_compatibility",
 }
 
 
+def __getattr__(name):
+    if name in _TABLES:
+        return baseline_store.table(_TABLES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class AmbiguousGPUModelError(ValueError):
+    """A GPU name matches several matrix entries that disagree"""
+
+    def __init__(self, match: GPUModelMatch):
+        super().__init__(f"GPU name '{match.name}' matches {', '.join(match.candidates)}; "
+                         f"use a more specific name")
+        self.match = match
+
+
+# Matrix keys are reduced to (family, form factor, memory GB) like device
+# names (performance_baselines.gpu_model_tokens) and indexed by family
+_model_index = None
+
+
+def rebuild_cuda_model_index():
+    """Re-index GPU_CUDA_COMPATIBILITY keys by family; call after changing the matrix"""
+    global _model_index
+    index = {}
+    for key in baseline_store.table("gpu_cuda_compatibility"):
+        family, form, memory = gpu_model_tokens(key)
+        index.setdefault(family, []).append((key, (form, memory)))
+    _model_index = index
+    match_cuda_model.cache_clear()
+
+
+@functools.lru_cache(maxsize=4096)
+def match_cuda_model(gpu_name: str) -> GPUModelMatch:
+    """
+    Resolve a device name to a GPU_CUDA_COMPATIBILITY key
+
+    Keys of the name's family whose known parts (form factor, memory)
+    agree with the name are candidates. The most specific one wins: most
+    parts matching the name, then fewest parts the name does not state
+    ("H100 PCIe" picks H100-PCIE, "H100" picks H100 over H100-SXM5).
+    Entries tied for best only resolve when they hold the same data;
+    otherwise `key` is None and `candidates` lists them. Exact keys
+    always win.
+    """
+    compatibility = baseline_store.table("gpu_cuda_compatibility")
+    if gpu_name in compatibility:
+        return GPUModelMatch(gpu_name, gpu_name, (gpu_name,))
+    if _model_index is None:
+        rebuild_cuda_model_index()
+    family, *parts = gpu_model_tokens(gpu_name)
+
+    ranked = {}
+    for key, key_parts in _model_index.get(family, ()):
+        if any(None not in pair and pair[0] != pair[1] for pair in zip(parts, key_parts)):
+            continue
+        matched = sum(part is not None and part == key_part for part, key_part in zip(parts, key_parts))
+        unstated = sum(part is None and key_part is not None for part, key_part in zip(parts, key_parts))
+        ranked.setdefault((matched, -unstated), []).append(key)
+    if not ranked:
+        return GPUModelMatch(gpu_name, None, ())
+
+    best = tuple(sorted(ranked[max(ranked)]))
+    if all(compatibility[key] == compatibility[best[0]] for key in best[1:]):
+        return GPUModelMatch(gpu_name, best[0], best)
+    return GPUModelMatch(gpu_name, None, best)
+
+
+def resolve_cuda_models(gpu_names) -> dict:
+    """
+    Resolve many device names (e.g. a fleet's nvidia-smi inventory) at once
+
+    Repeated names are resolved once. Returns {name: GPUModelMatch};
+    entries with `ambiguous` set, or with no candidates, need a more
+    specific name.
+    """
+    return {name: match_cuda_model(name) for name in dict.fromkeys(gpu_names)}
+
+
 def get_gpu_cuda_info(gpu_name: str) -> dict:
     """
     Get CUDA compatibility information for a GPU model
 
     Args:
-        gpu_name: GPU model name (e.g., "A100-SXM4", "H100", "RTX 4090")
+        gpu_name: GPU model or device name (e.g., "A100-SXM4", "H100",
+            "RTX 4090", "NVIDIA H100 80GB HBM3")
 
     Returns:
-        Dictionary containing CUDA compatibility info
-    """
-    # Try exact match first
-    if gpu_name in GPU_CUDA_COMPATIBILITY:
-        return GPU_CUDA_COMPATIBILITY[gpu_name]
-
-    # Try partial match (case insensitive)
-    gpu_name_lower = gpu_name.lower()
-    for key, value in GPU_CUDA_COMPATIBILITY.items():
-        if key.lower() in gpu_name_lower or gpu_name_lower in key.lower():
-            return value
+        Dictionary containing CUDA compatibility info, None if unknown
 
-    return None
+    Raises:
+        AmbiguousGPUModelError: the name matches entries that disagree
+    """
+    match = match_cuda_model(gpu_name)
+    if match.key is None and match.candidates:
+        raise AmbiguousGPUModelError(match)
+    return baseline_store.table("gpu_cuda_compatibility")[match.key] if match.key else None
 
 
 def get_recommended_cuda_version(gpu_name: str) -> str:
@@ -257,7 +148,7 @@ def get_recommended_driver_version(gpu_name: str = None, cuda_version: str = Non
             return info.get("recommended_driver_version")
 
     if cuda_version:
-        driver_info = CUDA_DRIVER_COMPATIBILITY.get(cuda_version)
+        driver_info = baseline_store.table("cuda_driver_compatibility").get(cuda_version)
         if driver_info:
             return driver_info.get("recommended_driver_linux")
 
@@ -288,7 +179,7 @@ def print_compatibility_matrix():
     print("\n=== GPU to CUDA Version Compatibility Matrix ===\n")
 
     architectures = {}
-    for gpu, info in GPU_CUDA_COMPATIBILITY.items():
+    for gpu, info in baseline_store.table("gpu_cuda_compatibility").items():
         arch = info["architecture"]
         if arch not in architectures:
             architectures[arch] = []
@@ -320,9 +211,24 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         if sys.argv[1] == "--matrix":
             print_compatibility_matrix()
+        elif sys.argv[1] == "--resolve":
+            # Names as arguments, or one per line on stdin (nvidia-smi --query-gpu=name)
+            names = sys.argv[2:] or [line.strip() for line in sys.stdin if line.strip()]
+            unresolved = 0
+            for name, match in resolve_cuda_models(names).items():
+                if match.key:
+                    print(f"{name}\t{match.key}")
+                else:
+                    unresolved += 1
+                    print(f"{name}\t-\t{'ambiguous: ' + ', '.join(match.candidates) if match.candidates else 'unknown'}")
+            sys.exit(1 if unresolved else 0)
         else:
             gpu_name = sys.argv[1]
-            info = get_gpu_cuda_info(gpu_name)
+            try:
+                info = get_gpu_cuda_info(gpu_name)
+            except AmbiguousGPUModelError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
             if info:
                 print(f"\nGPU: {gpu_name}")
                 print(f"Architecture: {info['architecture']}")
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Fleet Driver Planner
+Chooses the smallest set of NVIDIA driver versions that serves a whole
+fleet, from the GPU/CUDA/driver compatibility matrix and the NGC image
+catalog, and lists the NGC image tags every group of nodes can run.
+
+Nodes are read from an inventory (CSV or JSON) giving each node's GPU,
+kernel, the NGC frameworks it must run ("pytorch", "nemo:24.01") and,
+optionally, a site pin on its driver ("<550", "535"). Nodes with the same
+requirements form one group, so thousands of nodes reduce to a handful of
+groups. A driver can serve a group when the GPU supports it and every
+required framework has an image whose CUDA version both the GPU and the
+driver support. The plan uses as few driver versions as possible, then as
+few (driver, kernel) precompiled builds as possible (batch_build_drivers.sh
+BUILD_PLAN), then the newest drivers.
+"""
+
+import argparse
+import csv
+import functools
+import itertools
+import json
+import re
+import sys
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import baseline_store
+from cuda_compatibility import get_gpu_cuda_info, match_cuda_model
+from ngc_images import get_best_image_for_node, get_image_url
+
+# Above this many driver combinations of one size, sets are chosen greedily
+MAX_EXACT_COMBINATIONS = 500000
+
+
+class NodeGroup(NamedTuple):
+    gpu: str                      # GPU_CUDA_COMPATIBILITY key
+    kernel: str
+    frameworks: Tuple[str, ...]   # "pytorch" or "pytorch:24.01", sorted
+    pin: str                      # driver constraint, "" for none
+
+
+def version_key(version: str) -> tuple:
+    """Sortable form of a driver or CUDA version ("535.154.05" -> (535, 154, 5))"""
+    return tuple(int(part) for part in re.findall(r"\d+", str(version)))
+
+
+def satisfies_pin(driver: str, pin: str) -> bool:
+    """
+    Whether a driver meets a site pin: comma-separated clauses such as
+    ">=535", "<550", "==535.154.05" or a bare "535" (that branch)
+    """
+    key = version_key(driver)
+    for clause in filter(None, (c.strip() for c in pin.split(","))):
+        op, version = re.match(r"(>=|<=|==|!=|>|<)?\s*(.+)", clause).groups()
+        bound = version_key(version)
+        # Compare on the bound's precision, so "<550" covers all of 549.x
+        value = key[:len(bound)]
+        if op is None:
+            ok = value == bound
+        else:
+            ok = {">=": value >= bound, "<=": value <= bound, "==": value == bound,
+                  "!=": value != bound, ">": value > bound, "<": value < bound}[op]
+        if not ok:
+            return False
+    return True
+
+
+def candidate_drivers(extra: Iterable[str] = ()) -> List[str]:
+    """Driver versions named by the compatibility matrix plus `extra`, newest first"""
+    drivers = set(extra)
+    for info in baseline_store.table("cuda_driver_compatibility").values():
+        drivers.update((info["min_driver_linux"], info["recommended_driver_linux"]))
+    for info in baseline_store.table("gpu_cuda_compatibility").values():
+        drivers.add(info["recommended_driver_version"])
+    return sorted(drivers, key=version_key, reverse=True)
+
+
+@functools.lru_cache(maxsize=None)
+def gpu_supports_driver(gpu: str, driver: str) -> bool:
+    """Driver at or above the GPU's minimum and not past its last supported branch"""
+    info = get_gpu_cuda_info(gpu)
+    key = version_key(driver)
+    last_branch = info.get("last_driver_branch")
+    return key >= version_key(info["min_driver_version"]) and (last_branch is None or key[0] <= last_branch)
+
+
+@functools.lru_cache(maxsize=None)
+def best_image(gpu: str, driver: str, framework: str) -> Optional[str]:
+    """
+    URL of the newest NGC image of a framework a GPU can run on a driver, None if none
+
+    `framework` is an NGC_IMAGES name, optionally pinned to one version
+    ("nemo:24.01"); see ngc_images.get_best_image_for_node.
+    """
+    name, _, pinned = framework.partition(":")
+    info = get_best_image_for_node(name, gpu, driver, pinned or None)
+    return get_image_url(name, info["selected_version"]) if info else None
+
+
+@functools.lru_cache(maxsize=None)
+def group_drivers(group: NodeGroup, candidates: Tuple[str, ...]) -> int:
+    """Bitmask over `candidates` of the drivers that can serve a node group"""
+    mask = 0
+    for i, driver in enumerate(candidates):
+        if (gpu_supports_driver(group.gpu, driver) and satisfies_pin(driver, group.pin)
+                and all(best_image(group.gpu, driver, f) for f in group.frameworks)):
+            mask |= 1 << i
+    return mask
+
+
+def _min_hitting_subset(masks: Iterable[int], chosen: Tuple[int, ...]) -> Tuple[int, ...]:
+    """Fewest of the `chosen` driver indexes hitting every mask, preferring newer (lower) indexes"""
+    masks = set(masks)
+    for size in range(1, len(chosen) + 1):
+        for subset in itertools.combinations(chosen, size):
+            bits = sum(1 << i for i in subset)
+            if all(mask & bits for mask in masks):
+                return subset
+    return ()
+
+
+def _plan_cost(chosen: Tuple[int, ...], kernel_masks: Dict[str, frozenset]) -> tuple:
+    """(builds, driver indexes) for a driver set; lower is better"""
+    builds = sum(len(_min_hitting_subset(masks, chosen)) for masks in kernel_masks.values())
+    return builds, chosen
+
+
+@functools.lru_cache(maxsize=256)
+def solve_masks(masks: Tuple[Tuple[str, int], ...], candidate_count: int) -> Tuple[Tuple[int, ...], bool]:
+    """
+    Smallest set of driver indexes hitting every (kernel, mask) pair
+
+    Sets are tried by size, smallest first; within the first size that
+    works the set needing fewest builds wins, then the newest. Returns
+    (indexes, exact); exact is False when the search fell back to greedy.
+    """
+    all_masks = {mask for _, mask in masks}
+    # A mask containing another is hit whenever the smaller one is
+    required = [m for m in all_masks if not any(o != m and o & m == o for o in all_masks)]
+    kernel_masks = {}
+    for kernel, mask in masks:
+        kernel_masks.setdefault(kernel, set()).add(mask)
+    kernel_masks = {kernel: frozenset(m) for kernel, m in kernel_masks.items()}
+    useful = [i for i in range(candidate_count) if any(m >> i & 1 for m in required)]
+
+    for size in range(1, len(useful) + 1):
+        combinations = 1
+        for k in range(size):
+            combinations = combinations * (len(useful) - k) // (k + 1)
+        if combinations > MAX_EXACT_COMBINATIONS:
+            break
+        best = None
+        for chosen in itertools.combinations(useful, size):
+            bits = sum(1 << i for i in chosen)
+            if all(m & bits for m in required):
+                cost = _plan_cost(chosen, kernel_masks)
+                if best is None or cost < best:
+                    best = cost
+        if best is not None:
+            return best[1], True
+
+    # Greedy: repeatedly take the driver serving most remaining masks (newest on ties)
+    chosen, remaining = [], set(required)
+    while remaining:
+        i = max(useful, key=lambda i: (sum(m >> i & 1 for m in remaining), -i))
+        chosen.append(i)
+        remaining = {m for m in remaining if not m >> i & 1}
+    return tuple(sorted(chosen)), False
+
+
+def group_nodes(nodes: Iterable[Dict[str, Any]]) -> Tuple[Dict[NodeGroup, List[str]], Dict[str, List[str]]]:
+    """
+    Group inventory nodes by requirements
+
+    Returns ({group: [host, ...]}, {problem: [host, ...]}) where problems
+    are GPU names the compatibility matrix does not know or cannot tell apart.
+    """
+    groups, problems = {}, {}
+    for node in nodes:
+        host = node.get("host") or node.get("hostname") or "?"
+        gpu = node.get("gpu", "")
+        match = match_cuda_model(gpu)
+        if match.key is None:
+            reason = f"ambiguous GPU '{gpu}' ({', '.join(match.candidates)})" if match.candidates \
+                else f"unknown GPU '{gpu}'"
+            problems.setdefault(reason, []).append(host)
+            continue
+        frameworks = node.get("frameworks") or ()
+        if isinstance(frameworks, str):
+            frameworks = frameworks.replace(";", " ").replace(",", " ").split()
+        group = NodeGroup(match.key, node.get("kernel") or "", tuple(sorted(set(frameworks))),
+                          node.get("driver") or "")
+        groups.setdefault(group, []).append(host)
+    return groups, problems
+
+
+def plan(nodes: Iterable[Dict[str, Any]], drivers: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Driver plan for an inventory
+
+    `drivers` adds candidate versions to those the matrix names. Returns
+    {"drivers", "builds": {driver: [kernel, ...]}, "groups": [...],
+    "unsatisfiable": [...], "problems": {...}, "exact"}; every group entry
+    holds its hosts, assigned driver and the newest runnable tag of each
+    required framework.
+    """
+    groups, problems = group_nodes(nodes)
+    candidates = tuple(candidate_drivers(drivers))
+    masks = {group: group_drivers(group, candidates) for group in groups}
+
+    solvable = {group: mask for group, mask in masks.items() if mask}
+    chosen, exact = solve_masks(tuple(sorted({(g.kernel, m) for g, m in solvable.items()})), len(candidates))
+
+    # Per kernel, build only the drivers that kernel's groups need
+    per_kernel = {}
+    for group, mask in solvable.items():
+        per_kernel.setdefault(group.kernel, set()).add(mask)
+    kernel_drivers = {kernel: _min_hitting_subset(kernel_masks, chosen) for kernel, kernel_masks in per_kernel.items()}
+
+    builds, entries = {}, []
+    for group, hosts in sorted(groups.items(), key=lambda item: (item[0].gpu, item[0].kernel, item[0].frameworks)):
+        entry = {"gpu": group.gpu, "kernel": group.kernel, "frameworks": list(group.frameworks),
+                 "pin": group.pin, "hosts": hosts}
+        mask = masks[group]
+        if not mask:
+            entries.append(dict(entry, driver=None))
+            continue
+        driver = candidates[next(i for i in kernel_drivers[group.kernel] if mask >> i & 1)]
+        builds.setdefault(driver, set()).add(group.kernel)
+        entry["driver"] = driver
+        entry["images"] = {f: best_image(group.gpu, driver, f) for f in group.frameworks}
+        entries.append(entry)
+
+    return {
+        "drivers": sorted(builds, key=version_key, reverse=True),
+        "builds": {driver: sorted(k for k in kernels if k) for driver, kernels in builds.items()},
+        "groups": [e for e in entries if e["driver"]],
+        "unsatisfiable": [e for e in entries if not e["driver"]],
+        "problems": problems,
+        "candidates": list(candidates),
+        "exact": exact,
+    }
+
+
+def load_inventory(path: str) -> List[Dict[str, Any]]:
+    """
+    Nodes from a CSV file (columns host, gpu, kernel, frameworks, driver),
+    a JSON list / {"nodes": [...]}, or NDJSON; "-" reads stdin
+    """
+    f = sys.stdin if path == "-" else open(path)
+    try:
+        text = f.read()
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        return json.loads(text)
+    if stripped.startswith("{"):
+        try:
+            doc = json.loads(text)
+            return doc["nodes"] if "nodes" in doc else [doc]
+        except ValueError:
+            return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return list(csv.DictReader(line for line in text.splitlines() if line.strip() and not line.startswith("#")))
+
+
+def print_plan(result: Dict[str, Any]):
+    """Print a driver plan"""
+    node_count = sum(len(g["hosts"]) for g in result["groups"] + result["unsatisfiable"])
+    print(f"\n=== Driver Plan: {node_count} nodes, {len(result['groups']) + len(result['unsatisfiable'])} groups, "
+          f"{len(result['candidates'])} candidate drivers ===\n")
+    print(f"Drivers ({len(result['drivers'])}): {', '.join(result['drivers']) or 'none'}"
+          + ("" if result["exact"] else "  (greedy; may not be minimal)"))
+    build_count = sum(len(k) for k in result["builds"].values())
+    print(f"Precompiled builds ({build_count}):")
+    for driver in result["drivers"]:
+        print(f"  {driver}: {', '.join(result['builds'][driver]) or '(no kernel given)'}")
+
+    print("\nNode groups:")
+    for group in result["groups"]:
+        print(f"  {group['gpu']:<18} {group['kernel'] or '-':<22} {len(group['hosts']):>5} nodes -> {group['driver']}"
+              + (f"  (pin {group['pin']})" if group["pin"] else ""))
+        for framework, tag in group["images"].items():
+            print(f"      {framework:<16} {tag}")
+
+    if result["unsatisfiable"]:
+        print("\nNo candidate driver serves:")
+        for group in result["unsatisfiable"]:
+            needs = ", ".join(group["frameworks"]) or "no frameworks"
+            pin = f", pin {group['pin']}" if group["pin"] else ""
+            print(f"  {group['gpu']} ({needs}{pin}): {', '.join(group['hosts'][:5])}"
+                  + (f" and {len(group['hosts']) - 5} more" if len(group["hosts"]) > 5 else ""))
+    for reason, hosts in result["problems"].items():
+        print(f"\nSkipped, {reason}: {len(hosts)} nodes")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="Fleet Driver Planner - minimal driver versions and NGC images for a GPU fleet"
+    )
+    parser.add_argument("inventory", help="Inventory CSV/JSON/NDJSON (host, gpu, kernel, frameworks, driver), - for stdin")
+    parser.add_argument("-d", "--drivers", nargs="+", default=[], help="Additional candidate driver versions")
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    parser.add_argument("--build-plan", metavar="FILE",
+                        help="Write 'driver kernel' lines for batch_build_drivers.sh (BUILD_PLAN=FILE)")
+    args = parser.parse_args()
+
+    try:
+        result = plan(load_inventory(args.inventory), args.drivers)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error reading inventory {args.inventory}: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    if args.build_plan:
+        with open(args.build_plan, "w") as f:
+            for driver in result["drivers"]:
+                for kernel in result["builds"][driver]:
+                    f.write(f"{driver} {kernel}\n")
+
+    if args.format == "json":
+        print(json.dumps(result, indent=2))
+    else:
+        print_plan(result)
+    sys.exit(1 if result["unsatisfiable"] or result["problems"] else 0)
+
+
+if __name__ == "__main__":
+    main()
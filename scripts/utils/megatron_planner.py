@@ -0,0 +1,657 @@
+#!/usr/bin/env python3
+"""
+Megatron Parallelism Planner
+Predicts step time, MFU and communication share of GPT training for every
+tensor/pipeline/data parallel split, micro-batch size, activation
+recompute setting and node count, from the GPU baselines (peak FLOPs,
+memory bandwidth, NVLink / NCCL bandwidth, memory size) and the network
+baselines, and ranks the configurations that fit in GPU memory.
+
+The cost model is analytic (Narayanan et al., "Efficient Large-Scale
+Language Model Training on GPU Clusters"): per-layer GEMM time on a
+roofline of peak FLOPs and memory bandwidth, tensor-parallel all-reduces
+on the critical path, a 1F1B pipeline bubble, pipeline p2p transfers and
+an unoverlapped data-parallel gradient all-reduce. The same expressions
+are evaluated over NumPy arrays when NumPy is installed, which ranks tens
+of thousands of configurations in milliseconds, and config by config
+otherwise. `validate` compares predictions with recorded runs.
+"""
+
+import argparse
+import glob
+import heapq
+import itertools
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    # Configurations are then evaluated one at a time
+    np = None
+
+from performance_baselines import (GPU_BASELINES, NETWORK_BASELINES, get_gpu_baseline,
+                                   get_megatron_baseline, get_network_baseline, resolve_gpu_model)
+
+DEFAULT_SEQ_LENGTH = 2048
+DEFAULT_VOCAB = 51200
+DEFAULT_GLOBAL_BATCH = 1536
+DEFAULT_MICRO_BATCHES = (1, 2, 4, 8, 16)
+
+# Fraction of GPU memory usable by the model (CUDA context, NCCL buffers, fragmentation)
+MEMORY_HEADROOM = 0.9
+# Fraction of peak tensor-core FLOPs large GEMMs reach; smaller ones fall off
+# and run at half of it when either dimension is down to GEMM_HALF_*
+GEMM_EFFICIENCY = 0.8
+GEMM_HALF_ROWS = 256
+GEMM_HALF_COLS = 256
+# Fraction of memory bandwidth the unfused element-wise kernels reach, launch
+# overhead included. Fitted with GEMM_EFFICIENCY to the same MEGATRON_BASELINES
+# runs `validate --baselines` checks, so that check is in-sample: the
+# single-GPU GPT-1.2B runs, GPT-175B and GPT-1T on A100 come within
+# VALIDATION_TOLERANCE; GPT-8.3B on 512 GPUs (+33%, +57%) and GPT-175B on
+# H100 (-41%) do not
+ELEMENTWISE_EFFICIENCY = 0.18
+# Largest relative error `validate` accepts for one run
+VALIDATION_TOLERANCE = 0.25
+# Bytes per parameter held by mixed-precision Adam: fp16 weight and grad, fp32 master, m and v
+STATE_BYTES_PER_PARAM = 16
+# Optimizer step traffic per parameter (fp32 master, m, v read and written, fp16 weight written)
+OPTIMIZER_BYTES_PER_PARAM = 26
+GRAD_BYTES = 2
+ACTIVATION_BYTES = 2
+
+PRECISION_FIELDS = {"fp16": "fp16_tflops", "bf16": "fp16_tflops", "fp8": "fp8_tflops", "tf32": "tf32_tflops"}
+SORT_KEYS = {"mfu": True, "throughput": True, "step_time": False}
+
+
+class _ScalarOps:
+    """The numpy functions the cost model uses, for plain numbers"""
+    maximum = staticmethod(max)
+    minimum = staticmethod(min)
+
+    @staticmethod
+    def where(condition, a, b):
+        return a if condition else b
+
+
+def model_shape(model: str = None, layers: int = None, hidden: int = None, heads: int = None) -> Dict[str, int]:
+    """Transformer shape of a MEGATRON_BASELINES model, overridden by explicit sizes"""
+    spec = get_megatron_baseline(model, learned=False) if model else {}
+    if model and not spec:
+        raise ValueError(f"unknown model '{model}'")
+    shape = {
+        "layers": layers or spec.get("num_layers"),
+        "hidden": hidden or spec.get("hidden_size"),
+        "heads": heads or spec.get("num_attention_heads"),
+    }
+    missing = [name for name, value in shape.items() if not value]
+    if missing:
+        raise ValueError(f"model shape needs {', '.join(missing)} (use --model or --layers/--hidden/--heads)")
+    return shape
+
+
+def _default_network(gpu: dict) -> Optional[str]:
+    """Network type named by the GPU's inter-node NCCL baseline, e.g. inter_node_ib_ndr -> IB-NDR"""
+    for key in gpu.get("nccl_allreduce_busbw_gbs", {}):
+        match = re.match(r"inter_node_(ib_[a-z]+)$", key)
+        if match and match.group(1).replace("_", "-").upper() in NETWORK_BASELINES:
+            return match.group(1).replace("_", "-").upper()
+    return None
+
+
+def hardware(gpu_model: str, gpus_per_node: int = 8, network: str = None, nics_per_node: int = None,
+             precision: str = "bf16", efficiency: float = None) -> Dict[str, Any]:
+    """
+    Rates the cost model needs, from the GPU and network baselines
+
+    Site-learned medians (site_baselines.py) replace spec values where
+    they exist, so the plan follows what this cluster actually measures.
+    """
+    name = resolve_gpu_model(gpu_model)
+    gpu = get_gpu_baseline(name) if name else {}
+    if not gpu:
+        raise ValueError(f"no baseline for GPU '{gpu_model}'")
+    peak = gpu.get(PRECISION_FIELDS[precision])
+    if not peak:
+        raise ValueError(f"{name} has no {precision} peak in its baseline")
+
+    nccl = gpu.get("nccl_allreduce_busbw_gbs", {})
+    intra = [value for key, value in nccl.items() if key.startswith("intra_node")]
+    link_gbs = gpu.get("nvlink_bandwidth_gbs") or gpu.get("pcie_bandwidth_gbs", 0)
+    # NVLink and PCIe figures are both directions; a transfer uses one
+    p2p_gbs = link_gbs / 2
+
+    network = network or _default_network(gpu) or "IB-HDR"
+    net = get_network_baseline(network)
+    if not net:
+        raise ValueError(f"unknown network '{network}'")
+    nics = nics_per_node or gpus_per_node
+    nic_gbs = net.get("expected_ib_write_bw_gbs") or net["bandwidth_gbs"]
+
+    return {
+        "gpu": name,
+        "network": network,
+        "precision": precision,
+        "gpus_per_node": gpus_per_node,
+        "peak_flops": peak * 1e12,
+        "efficiency": efficiency or GEMM_EFFICIENCY,
+        "memory_bytes": gpu["memory_gb"] * 1e9 * MEMORY_HEADROOM,
+        "memory_bw": gpu["memory_bandwidth_gbs"] * 1e9,
+        "intra_busbw": (max(intra) if intra else p2p_gbs * 0.8) * 1e9,
+        "p2p_bw": p2p_gbs * 1e9,
+        "node_net_bw": nics * nic_gbs * 1e9,
+    }
+
+
+def _valid(nodes, tp, pp, mb, shape: Dict[str, int], hw: Dict[str, Any], global_batch: int):
+    """Splits Megatron accepts: TP inside a node dividing the heads, PP dividing the layers"""
+    gpus = nodes * hw["gpus_per_node"]
+    dp = gpus // (tp * pp)
+    return ((gpus % (tp * pp) == 0) & (tp <= hw["gpus_per_node"]) & (shape["heads"] % tp == 0)
+            & (shape["layers"] % pp == 0) & (dp >= 1) & (global_batch % (dp * mb + (dp < 1)) == 0))
+
+
+def _evaluate(nodes, tp, pp, mb, recompute, shape: Dict[str, int], hw: Dict[str, Any],
+              seq_length: int, vocab: int, global_batch: int, flash_attention: bool, xp) -> Dict[str, Any]:
+    """
+    Cost model for one configuration, or element-wise for arrays of them
+
+    Only operators and xp.maximum/minimum/where are used, so xp is either
+    numpy or _ScalarOps. Times are in seconds for one global batch.
+    """
+    L, h, a, s, V = shape["layers"], shape["hidden"], shape["heads"], seq_length, vocab
+    gpn = hw["gpus_per_node"]
+    gpus = nodes * gpn
+    dp = gpus // (tp * pp)
+    microbatches = global_batch / (dp * mb)
+    stage_layers = L / pp
+    multi_node = nodes > 1
+
+    # Per layer and micro-batch on one GPU: forward is 24msh^2(1 + s/6h)/tp,
+    # backward twice that, and a full recompute one more forward
+    passes = 3 + recompute
+    layer_flops = passes * 24 * mb * s * h * h * (1 + s / (6 * h)) / tp
+    rows = mb * s
+    cols = h / tp
+    gemm_eff = hw["efficiency"] / (1 + GEMM_HALF_ROWS / rows + GEMM_HALF_COLS / cols)
+    # Activation bytes per layer (Korthikanti et al.); flash attention never stores the s x s scores
+    layer_act = s * mb * h * (10 + 24 / tp + (0 if flash_attention else 5 * a * s / (h * tp)))
+    # GEMMs are bound by FLOPs or by streaming the weights; the element-wise kernels
+    # between them (layernorm, softmax, GeLU, dropout) by activation traffic:
+    # written forward, read backward and rewritten by a recompute
+    weight_bytes = 12 * h * h / tp * (3 * ACTIVATION_BYTES + 2 * GRAD_BYTES)
+    t_layer = (xp.maximum(layer_flops / (hw["peak_flops"] * gemm_eff), weight_bytes / hw["memory_bw"])
+               + (2 + recompute) * layer_act / (hw["memory_bw"] * ELEMENTWISE_EFFICIENCY))
+    # Logits on the last stage
+    t_logits = passes * 2 * mb * s * h * V / tp / (hw["peak_flops"] * gemm_eff)
+
+    # Two all-reduces of the layer output forward, two backward, two more to recompute
+    tp_bytes = ACTIVATION_BYTES * mb * s * h
+    t_tp_layer = (4 + 2 * recompute) * tp_bytes * 2 * (tp - 1) / tp / hw["intra_busbw"]
+
+    # Pipeline neighbours are tp*dp ranks apart, so on another node once tp*dp fills one;
+    # scatter-gather sends 1/tp of the activation, forward and backward
+    p2p_bw = xp.where(multi_node & (tp * dp >= gpn), hw["node_net_bw"] / gpn, hw["p2p_bw"])
+    t_p2p = xp.where(pp > 1, 2 * tp_bytes / tp / p2p_bw, 0.0)
+
+    t_microbatch = stage_layers * (t_layer + t_tp_layer) + t_logits + t_p2p
+    t_pipeline = (microbatches + pp - 1) * t_microbatch
+
+    # One rank of every tp group shares the node's NICs: a DP group gets 1/tp of them
+    stage_params = (12 * L * h * h + 13 * L * h) / (tp * pp) + V * h / tp
+    dp_busbw = xp.where(tp * dp > gpn, xp.minimum(hw["node_net_bw"] / tp, hw["intra_busbw"]), hw["intra_busbw"])
+    t_dp = GRAD_BYTES * stage_params * 2 * (dp - 1) / dp / dp_busbw
+    t_optimizer = OPTIMIZER_BYTES_PER_PARAM * stage_params / hw["memory_bw"]
+    step_time = t_pipeline + t_dp + t_optimizer
+
+    t_comm = (microbatches + pp - 1) * (stage_layers * t_tp_layer + t_p2p) + t_dp
+
+    # 1F1B keeps up to pp micro-batches of activations on the first stage;
+    # a full recompute keeps only each layer's input, plus one layer in flight
+    inflight = xp.minimum(pp, microbatches)
+    activations = xp.where(recompute > 0,
+                           stage_layers * inflight * ACTIVATION_BYTES * s * mb * h + layer_act,
+                           stage_layers * inflight * layer_act)
+    memory = STATE_BYTES_PER_PARAM * stage_params + activations + 4 * s * mb * V / tp
+
+    model_flops = 72 * global_batch * s * L * h * h * (1 + s / (6 * h) + V / (16 * L * h))
+    return {
+        "gpus": gpus,
+        "dp": dp,
+        "step_time": step_time,
+        "comm_share": t_comm / step_time,
+        "bubble_share": (pp - 1) * t_microbatch / step_time,
+        "mfu": model_flops / (step_time * gpus * hw["peak_flops"]),
+        "tflops": model_flops * (3 + recompute) / 3 / (step_time * gpus) / 1e12,
+        "throughput": global_batch / step_time,
+        "memory_gb": memory / 1e9,
+        "fits": memory <= hw["memory_bytes"],
+    }
+
+
+def _powers_of_two(limit: int) -> List[int]:
+    return [1 << i for i in range(limit.bit_length()) if 1 << i <= limit]
+
+
+def _divisors(n: int) -> List[int]:
+    return [d for d in range(1, n + 1) if n % d == 0]
+
+
+def search_space(shape: Dict[str, int], hw: Dict[str, Any], nodes: Iterable[int],
+                 micro_batches: Iterable[int] = DEFAULT_MICRO_BATCHES, tp: Iterable[int] = None,
+                 pp: Iterable[int] = None, recompute: Iterable[int] = (0, 1)) -> Dict[str, List[int]]:
+    """Candidate values of each dimension; invalid combinations are dropped by the sweep"""
+    return {
+        "nodes": sorted(set(nodes)),
+        "tp": sorted(set(tp or _powers_of_two(hw["gpus_per_node"]))),
+        "pp": sorted(set(pp or _divisors(shape["layers"]))),
+        "mb": sorted(set(micro_batches)),
+        "recompute": sorted(set(recompute)),
+    }
+
+
+def _row(columns: Dict[str, Any], values: Dict[str, Any], i=None) -> Dict[str, Any]:
+    row = {}
+    for source in (columns, values):
+        for key, value in source.items():
+            value = value if i is None else value[i]
+            row[key] = value.item() if hasattr(value, "item") else value
+    row["recompute"] = bool(row["recompute"])
+    return row
+
+
+def sweep(shape: Dict[str, int], hw: Dict[str, Any], space: Dict[str, List[int]],
+          seq_length: int = DEFAULT_SEQ_LENGTH, vocab: int = DEFAULT_VOCAB,
+          global_batch: int = DEFAULT_GLOBAL_BATCH, flash_attention: bool = True, top: int = 10,
+          sort: str = "throughput", use_numpy: bool = True) -> Dict[str, Any]:
+    """
+    Evaluate every valid configuration and return the best `top` that fit
+
+    Returns {"candidates", "evaluated", "oom", "seconds", "engine",
+    "configs": [row, ...]}, rows holding the configuration and its predicted
+    metrics. Candidates are all combinations, evaluated the valid ones.
+    """
+    start = time.perf_counter()
+    descending = SORT_KEYS[sort]
+    args = (shape, hw, seq_length, vocab, global_batch, flash_attention)
+    dims = ("nodes", "tp", "pp", "mb", "recompute")
+    candidates = 1
+    for d in dims:
+        candidates *= len(space[d])
+
+    if use_numpy and np is not None:
+        grids = np.meshgrid(*(np.asarray(space[d], dtype=np.int64) for d in dims), indexing="ij")
+        columns = dict(zip(dims, (g.ravel() for g in grids)))
+        keep = _valid(columns["nodes"], columns["tp"], columns["pp"], columns["mb"], shape, hw, global_batch)
+        columns = {d: c[keep] for d, c in columns.items()}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            metrics = _evaluate(*(columns[d] for d in dims), *args, np)
+        fits = metrics["fits"]
+        order = np.flatnonzero(fits)
+        key = metrics[sort][order]
+        order = order[np.argsort(-key if descending else key, kind="stable")[:top]]
+        configs = [_row(columns, metrics, i) for i in order]
+        evaluated, oom = len(fits), int(len(fits) - fits.sum())
+        engine = "numpy"
+    else:
+        rows, evaluated, oom = [], 0, 0
+        for values in itertools.product(*(space[d] for d in dims)):
+            config = dict(zip(dims, values))
+            if not _valid(*values[:4], shape, hw, global_batch):
+                continue
+            evaluated += 1
+            metrics = _evaluate(*values, *args, _ScalarOps)
+            if not metrics["fits"]:
+                oom += 1
+                continue
+            rows.append(_row(config, metrics))
+        pick = heapq.nlargest if descending else heapq.nsmallest
+        configs = pick(top, rows, key=lambda r: r[sort])
+        engine = "python"
+
+    return {"candidates": candidates, "evaluated": evaluated, "oom": oom, "seconds": time.perf_counter() - start,
+            "engine": engine, "configs": configs}
+
+
+def predict(shape: Dict[str, int], hw: Dict[str, Any], nodes: int, tp: int, pp: int, mb: int,
+            recompute: bool = False, seq_length: int = DEFAULT_SEQ_LENGTH, vocab: int = DEFAULT_VOCAB,
+            global_batch: int = DEFAULT_GLOBAL_BATCH, flash_attention: bool = True) -> Dict[str, Any]:
+    """Predicted metrics of one configuration, whether or not it is valid or fits"""
+    config = {"nodes": nodes, "tp": tp, "pp": pp, "mb": mb, "recompute": int(recompute)}
+    metrics = _evaluate(nodes, tp, pp, mb, int(recompute), shape, hw, seq_length, vocab, global_batch,
+                        flash_attention, _ScalarOps)
+    return _row(config, metrics)
+
+
+# ---------------------------------------------------------------------------
+# Validation against recorded runs
+# ---------------------------------------------------------------------------
+
+MEGATRON_ARG = re.compile(r"^\s*(\w+) \.{3,} (\S+)\s*$", re.MULTILINE)
+ITERATION_MS = re.compile(r"elapsed time per iteration \(ms\):\s*([0-9.]+)")
+LOGGED_TFLOPS = re.compile(r"(?:TFLOPs:|TFLOP/s/GPU\):)\s*([0-9.]+)")
+PADDED_VOCAB = re.compile(r"new size:\s*(\d+)")
+
+
+def legacy_parallelism(gpu_count: int) -> tuple:
+    """TP/PP chosen by megatron_benchmark.sh before it asked the planner"""
+    if gpu_count >= 8:
+        return 4, 2
+    if gpu_count >= 4:
+        return 2, 2
+    if gpu_count >= 2:
+        return 2, 1
+    return 1, 1
+
+
+def _measured(values: List[float]) -> Optional[float]:
+    # The first logged interval includes warm-up
+    values = values[1:] if len(values) > 1 else values
+    return statistics.median(values) if values else None
+
+
+def parse_megatron_log(text: str) -> Optional[Dict[str, Any]]:
+    """Configuration and steady-state step time / TFLOPs of a Megatron-LM training log"""
+    args = dict(MEGATRON_ARG.findall(text))
+    if "num_layers" not in args or "world_size" not in args:
+        return None
+    vocab = PADDED_VOCAB.search(text)
+    step_ms = _measured([float(v) for v in ITERATION_MS.findall(text)])
+    return {
+        "layers": int(args["num_layers"]),
+        "hidden": int(args["hidden_size"]),
+        "heads": int(args["num_attention_heads"]),
+        "seq_length": int(args.get("seq_length", DEFAULT_SEQ_LENGTH)),
+        "vocab": int(vocab.group(1)) if vocab else DEFAULT_VOCAB,
+        "gpu_count": int(args["world_size"]),
+        "tp": int(args.get("tensor_model_parallel_size", 1)),
+        "pp": int(args.get("pipeline_model_parallel_size", 1)),
+        "mb": int(args.get("micro_batch_size", 1)),
+        "global_batch": int(args.get("global_batch_size", args.get("micro_batch_size", 1))),
+        "recompute": args.get("recompute_granularity") == "full" or args.get("checkpoint_activations") == "True",
+        "precision": "bf16" if args.get("bf16") == "True" else "fp16",
+        "flash_attention": args.get("use_flash_attn") == "True",
+        "step_time": step_ms / 1000 if step_ms else None,
+        "tflops": _measured([float(v) for v in LOGGED_TFLOPS.findall(text)]),
+    }
+
+
+def parse_benchmark_summary(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """benchmark_summary_*.json written by megatron_benchmark.sh"""
+    config = doc.get("model_config", {})
+    gpu_count = doc.get("gpu_count") or 1
+    tflops = (doc.get("results") or {}).get("tflops")
+    if not config.get("num_layers") or not tflops:
+        return None
+    tp, pp = legacy_parallelism(gpu_count)
+    mb = config.get("batch_size", 1)
+    return {
+        "gpu": doc.get("gpu_model"),
+        "layers": config["num_layers"],
+        "hidden": config["hidden_size"],
+        "heads": config["num_attention_heads"],
+        "seq_length": config.get("seq_length", DEFAULT_SEQ_LENGTH),
+        "vocab": DEFAULT_VOCAB,
+        "gpu_count": gpu_count,
+        "tp": config.get("tensor_parallel", tp),
+        "pp": config.get("pipeline_parallel", pp),
+        "mb": mb,
+        "global_batch": config.get("global_batch_size", mb * gpu_count),
+        "recompute": False,
+        "precision": "fp16",
+        "flash_attention": False,
+        "step_time": None,
+        "tflops": float(tflops),
+    }
+
+
+def load_runs(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """Recorded runs from Megatron logs and benchmark summaries (files or directories)"""
+    runs = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "**", "*"), recursive=True)) if os.path.isdir(path) else [path]
+        for name in files:
+            if not os.path.isfile(name) or not name.endswith((".json", ".txt", ".log", ".out")):
+                continue
+            try:
+                with open(name, errors="replace") as f:
+                    text = f.read()
+                run = parse_benchmark_summary(json.loads(text)) if name.endswith(".json") else parse_megatron_log(text)
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                continue
+            if run and (run["step_time"] or run["tflops"]):
+                run["source"] = name
+                runs.append(run)
+    return runs
+
+
+def validate_run(run: Dict[str, Any], gpu: str, gpus_per_node: int, network: str = None,
+                 efficiency: float = None) -> Dict[str, Any]:
+    """Prediction for a recorded run, with the error of step time (or TFLOPs when no step time)"""
+    gpu_model = run.get("gpu") or gpu
+    if not gpu_model:
+        raise ValueError("the log does not name its GPU (use --gpu)")
+    gpn = min(gpus_per_node, run["gpu_count"])
+    hw = hardware(gpu_model, gpn, network, precision=run["precision"], efficiency=efficiency)
+    shape = {"layers": run["layers"], "hidden": run["hidden"], "heads": run["heads"]}
+    predicted = predict(shape, hw, max(1, run["gpu_count"] // gpn), run["tp"], run["pp"], run["mb"],
+                        run["recompute"], run["seq_length"], run["vocab"], run["global_batch"],
+                        run["flash_attention"])
+    if run["step_time"]:
+        metric, measured, value = "step_time", run["step_time"], predicted["step_time"]
+    else:
+        metric, measured, value = "tflops", run["tflops"], predicted["tflops"]
+    return {"source": run["source"], "gpu": hw["gpu"], "metric": metric, "measured": measured,
+            "predicted": value, "error": (value - measured) / measured, "config": predicted}
+
+
+def _family_gpu(family: str) -> Optional[str]:
+    """Baseline GPU for a MEGATRON_BASELINES family key ("a100"): the SXM part with most memory"""
+    candidates = [name for name in GPU_BASELINES if name.lower().startswith(family + "-")]
+    candidates.sort(key=lambda name: ("SXM" in name, GPU_BASELINES[name]["memory_gb"]), reverse=True)
+    return candidates[0] if candidates else None
+
+
+def validate_baselines(gpus_per_node: int = 8, network: str = None, efficiency: float = None,
+                       use_numpy: bool = True) -> List[Dict[str, Any]]:
+    """
+    Best predicted configuration against every MEGATRON_BASELINES point with per-GPU TFLOPs
+
+    The recorded runs were tuned, so the comparable prediction is the best
+    valid configuration for their model, GPU family and GPU count. They
+    predate flash attention.
+    """
+    results = []
+    for model in baseline_model_names():
+        baseline = get_megatron_baseline(model)
+        shape = model_shape(model)
+        for config, metrics in baseline.items():
+            match = re.match(r"([a-z0-9]+)_(single_|\d+)gpu$", config)
+            if not match or not isinstance(metrics, dict):
+                continue
+            gpu_count = 1 if match.group(2) == "single_" else int(match.group(2))
+            tflops = metrics.get("per_gpu_tflops") or metrics.get("tflops")
+            if not tflops and metrics.get("petaflops"):
+                tflops = metrics["petaflops"] * 1000 / gpu_count
+            gpu = _family_gpu(match.group(1))
+            if not tflops or not gpu:
+                continue
+            gpn = min(gpus_per_node, gpu_count)
+            hw = hardware(gpu, gpn, network, efficiency=efficiency)
+            space = search_space(shape, hw, [gpu_count // gpn])
+            best = sweep(shape, hw, space, global_batch=max(DEFAULT_GLOBAL_BATCH, gpu_count),
+                         flash_attention=False, top=1, use_numpy=use_numpy)["configs"]
+            if not best:
+                continue
+            results.append({"source": f"{model} {config}", "gpu": gpu, "metric": "tflops", "measured": tflops,
+                            "predicted": best[0]["tflops"], "error": (best[0]["tflops"] - tflops) / tflops,
+                            "config": best[0]})
+    return results
+
+
+def baseline_model_names() -> List[str]:
+    """MEGATRON_BASELINES models that record their transformer shape"""
+    from performance_baselines import MEGATRON_BASELINES
+    return [name for name, spec in MEGATRON_BASELINES.items() if spec.get("num_layers")]
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def parse_int_list(text: str) -> List[int]:
+    """ "1,2,4-8" -> [1, 2, 4, 5, 6, 7, 8] """
+    values = []
+    for part in text.split(","):
+        low, _, high = part.partition("-")
+        values.extend(range(int(low), int(high or low) + 1))
+    return values
+
+
+def _config_label(row: Dict[str, Any]) -> str:
+    return (f"nodes={row['nodes']:<4d} TP={row['tp']:<2d} PP={row['pp']:<3d} DP={row['dp']:<5d} "
+            f"mb={row['mb']:<3d}{' recompute' if row['recompute'] else ''}")
+
+
+def print_sweep(result: Dict[str, Any], hw: Dict[str, Any]):
+    """Print ranked configurations"""
+    print(f"{hw['gpu']} ({hw['precision']}, {hw['network']}), "
+          f"{result['candidates']} candidates, {result['evaluated']} valid configurations "
+          f"in {result['seconds'] * 1000:.1f} ms ({result['engine']}), {result['oom']} exceed GPU memory\n")
+    if not result["configs"]:
+        print("No configuration fits")
+        return
+    print(f"{'Configuration':<54} {'Step s':>8} {'MFU':>6} {'TFLOPs':>7} {'Comm':>6} {'Bubble':>7} {'Mem GB':>7}")
+    print("-" * 100)
+    for row in result["configs"]:
+        print(f"{_config_label(row):<54} {row['step_time']:>8.3f} {row['mfu'] * 100:>5.1f}% {row['tflops']:>7.1f} "
+              f"{row['comm_share'] * 100:>5.1f}% {row['bubble_share'] * 100:>6.1f}% {row['memory_gb']:>7.1f}")
+
+
+def print_validation(results: List[Dict[str, Any]], efficiency: Optional[float]) -> bool:
+    """
+    Print predicted vs measured, mean absolute error and a calibrated
+    efficiency; True when every run is within VALIDATION_TOLERANCE
+    """
+    if not results:
+        print("No recorded runs to validate against")
+        return True
+    for r in results:
+        unit = "s" if r["metric"] == "step_time" else " TFLOPs"
+        outside = "" if abs(r["error"]) <= VALIDATION_TOLERANCE else ", outside tolerance"
+        print(f"{r['source']}\n  {r['gpu']}  {_config_label(r['config'])}\n"
+              f"  {r['metric']}: measured {r['measured']:.3f}{unit}, predicted {r['predicted']:.3f}{unit} "
+              f"({r['error'] * 100:+.1f}%{outside})")
+    errors = [abs(r["error"]) for r in results]
+    within = sum(e <= VALIDATION_TOLERANCE for e in errors)
+    print(f"\n{len(results)} runs, mean absolute error {statistics.mean(errors) * 100:.1f}%, "
+          f"worst {max(errors) * 100:.1f}%, {within} within {VALIDATION_TOLERANCE * 100:.0f}%")
+    # Compute dominates, so predicted speed scales roughly with the efficiency
+    speed = [1 + r["error"] if r["metric"] == "step_time" else r["measured"] / r["predicted"] for r in results]
+    scale = statistics.median(speed)
+    print(f"Median measured/predicted speed {scale:.2f}; try --efficiency {min(1.0, (efficiency or GEMM_EFFICIENCY) * scale):.2f}")
+    return within == len(results)
+
+
+def _add_hardware_arguments(parser):
+    parser.add_argument("--gpu", help="GPU model or device name (e.g. H100-SXM5-80GB)")
+    parser.add_argument("--gpus-per-node", type=int, default=8)
+    parser.add_argument("--network", choices=sorted(NETWORK_BASELINES),
+                        help="Inter-node network (default: from the GPU's NCCL baseline, else IB-HDR)")
+    parser.add_argument("--nics", type=int, help="NICs per node (default: one per GPU)")
+    parser.add_argument("--efficiency", type=float,
+                        help=f"Fraction of peak large GEMMs reach (default: {GEMM_EFFICIENCY})")
+    parser.add_argument("--no-numpy", action="store_true", help="Evaluate configurations one at a time")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="Megatron Parallelism Planner - predict and rank TP/PP/DP/micro-batch configurations"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    for command, help_text in (("sweep", "Rank configurations"), ("best", "Print the best configuration")):
+        sub = subparsers.add_parser(command, help=help_text)
+        _add_hardware_arguments(sub)
+        sub.add_argument("--model", help="Model from the Megatron baselines (e.g. GPT-8.3B)")
+        sub.add_argument("--layers", type=int)
+        sub.add_argument("--hidden", type=int)
+        sub.add_argument("--heads", type=int)
+        sub.add_argument("--seq-length", type=int, default=DEFAULT_SEQ_LENGTH)
+        sub.add_argument("--vocab", type=int, default=DEFAULT_VOCAB)
+        sub.add_argument("-b", "--global-batch", type=int, default=DEFAULT_GLOBAL_BATCH)
+        sub.add_argument("-n", "--nodes", type=parse_int_list, default=[1], help="Node counts, e.g. 1-64 or 4,8,16")
+        sub.add_argument("--gpus", type=int, help="Total GPUs on one node (overrides --nodes)")
+        sub.add_argument("--micro-batches", type=parse_int_list, default=list(DEFAULT_MICRO_BATCHES))
+        sub.add_argument("--tp", type=parse_int_list, help="Restrict tensor parallel sizes")
+        sub.add_argument("--pp", type=parse_int_list, help="Restrict pipeline parallel sizes")
+        sub.add_argument("--recompute", choices=["auto", "on", "off"], default="auto")
+        sub.add_argument("--no-flash-attention", action="store_true",
+                         help="Attention stores its s x s scores (Megatron without --use-flash-attn)")
+        sub.add_argument("--precision", choices=sorted(PRECISION_FIELDS), default="bf16")
+        sub.add_argument("--sort", choices=sorted(SORT_KEYS), default="throughput")
+        sub.add_argument("--top", type=int, default=10 if command == "sweep" else 1)
+        sub.add_argument("--format", choices=["text", "json", "shell"], default="text")
+
+    validate = subparsers.add_parser("validate", help="Compare predictions with recorded runs")
+    _add_hardware_arguments(validate)
+    validate.add_argument("paths", nargs="*", help="Megatron logs, benchmark_summary JSON or directories")
+    validate.add_argument("--baselines", action="store_true", help="Also validate against the Megatron baselines")
+
+    args = parser.parse_args()
+
+    if args.command in ("sweep", "best"):
+        if not args.gpu:
+            parser.error("--gpu is required")
+        gpn, nodes = args.gpus_per_node, args.nodes
+        if args.gpus:
+            gpn, nodes = args.gpus, [1]
+        try:
+            shape = model_shape(args.model, args.layers, args.hidden, args.heads)
+            hw = hardware(args.gpu, gpn, args.network, args.nics, args.precision, args.efficiency)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(2)
+        recompute = {"auto": (0, 1), "on": (1,), "off": (0,)}[args.recompute]
+        space = search_space(shape, hw, nodes, args.micro_batches, args.tp, args.pp, recompute)
+        result = sweep(shape, hw, space, args.seq_length, args.vocab, args.global_batch,
+                       not args.no_flash_attention, args.top, args.sort, use_numpy=not args.no_numpy)
+        if args.format == "json":
+            print(json.dumps(result, indent=2))
+        elif args.format == "shell":
+            if not result["configs"]:
+                sys.exit(1)
+            best = result["configs"][0]
+            print(f"TP={best['tp']} PP={best['pp']} DP={best['dp']} MICRO_BATCH={best['mb']} "
+                  f"RECOMPUTE={int(best['recompute'])} PREDICTED_TFLOPS={best['tflops']:.1f} "
+                  f"PREDICTED_MFU={best['mfu']:.3f}")
+        else:
+            print_sweep(result, hw)
+    elif args.command == "validate":
+        if not args.paths and not args.baselines:
+            parser.error("give result paths and/or --baselines")
+        results = []
+        try:
+            for run in load_runs(args.paths):
+                results.append(validate_run(run, args.gpu, args.gpus_per_node, args.network, args.efficiency))
+            if args.baselines:
+                results.extend(validate_baselines(args.gpus_per_node, args.network, args.efficiency,
+                                                  use_numpy=not args.no_numpy))
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(2)
+        if not print_validation(results, args.efficiency):
+            sys.exit(1)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,266 +2,26 @@
 """
 NGC (NVIDIA GPU Cloud) Container Image Registry
 Provides configuration and management for NGC container images
+The catalog itself lives in baselines_data.json (see baseline_store.py)
 """
 
-# NGC Container Image Registry
-NGC_IMAGES = {
-    "pytorch": {
-        "name": "PyTorch",
-        "description": "NVIDIA optimized PyTorch container with CUDA, cuDNN, NCCL",
-        "registry": "nvcr.io/nvidia/pytorch",
-        "versions": {
-            "24.01": {
-                "tag": "24.01-py3",
-                "pytorch_version": "2.3.0a0",
-                "cuda_version": "12.3",
-                "python_version": "3.10",
-                "ubuntu_version": "22.04",
-                "features": ["CUDA 12.3", "cuDNN 8.9", "NCCL 2.19", "TensorRT 8.6"]
-            },
-            "23.12": {
-                "tag": "23.12-py3",
-                "pytorch_version": "2.2.0a0",
-                "cuda_version": "12.3",
-                "python_version": "3.10",
-                "ubuntu_version": "22.04",
-                "features": ["CUDA 12.3", "cuDNN 8.9", "NCCL 2.19", "TensorRT 8.6"]
-            },
-            "23.10": {
-                "tag": "23.10-py3",
-                "pytorch_version": "2.1.0a0",
-                "cuda_version": "12.2",
-                "python_version": "3.10",
-                "ubuntu_version": "22.04",
-                "features": ["CUDA 12.2", "cuDNN 8.9", "NCCL 2.18", "TensorRT 8.6"]
-            },
-            "23.08": {
-                "tag": "23.08-py3",
-                "pytorch_version": "2.1.0a0",
-                "cuda_version": "12.2",
-                "python_version": "3.10",
-                "ubuntu_version": "22.04",
-                "features": ["CUDA 12.2", "cuDNN 8.9", "NCCL 2.18"]
-            }
-        },
-        "default_version": "24.01",
-        "use_cases": ["Training", "Inference", "Development"]
-    },
-
-    "tensorflow": {
-        "name": "TensorFlow",
-        "description": "NVIDIA optimized TensorFlow container",
-        "registry": "nvcr.io/nvidia/tensorflow",
-        "versions": {
-            "24.01": {
-                "tag": "24.01-tf2-py3",
-                "tensorflow_version": "2.15.0",
-                "cuda_version": "12.3",
-                "python_version": "3.10",
-                "ubuntu_version": "22.04",
-                "features": ["CUDA 12.3", "cuDNN 8.9", "NCCL 2.19", "TensorRT 8.6"]
-            },
-            "23.12": {
-                "tag": "23.12-tf2-py3",
-                "tensorflow_version": "2.14.0",
-                "cuda_version": "12.3",
-                "python_version": "3.10",
-                "ubuntu_version": "22.04",
-                "features": ["CUDA 12.3", "cuDNN 8.9", "NCCL 2.19"]
-            }
-        },
-        "default_version": "24.01",
-        "use_cases": ["Training", "Inference"]
-    },
-
-    "nemo": {
-        "name": "NVIDIA NeMo (includes Megatron-LM)",
-        "description": "NeMo framework for conversational AI with Megatron-LM",
-        "registry": "nvcr.io/nvidia/nemo",
-        "versions": {
-            "24.01": {
-                "tag": "24.01",
-                "nemo_version": "1.22.0",
-                "megatron_version": "core_0.5.0",
-                "pytorch_version": "2.2.0",
-                "cuda_version": "12.3",
-                "python_version": "3.10",
-                "ubuntu_version": "22.04",
-                "features": [
-                    "Megatron-LM Core 0.5.0",
-                    "CUDA 12.3",
-                    "cuDNN 8.9",
-                    "NCCL 2.19",
-                    "Transformer Engine",
-                    "Apex"
-                ]
-            },
-            "23.11": {
-                "tag": "23.11",
-                "nemo_version": "1.21.0",
-                "megatron_version": "core_0.4.0",
-                "pytorch_version": "2.1.0",
-                "cuda_version": "12.2",
-                "python_version": "3.10",
-                "ubuntu_version": "22.04",
-                "features": [
-                    "Megatron-LM Core 0.4.0",
-                    "CUDA 12.2",
-                    "NCCL 2.18",
-                    "Transformer Engine"
-                ]
-            }
-        },
-        "default_version": "24.01",
-        "use_cases": ["LLM Training", "LLM Fine-tuning", "ASR", "TTS", "NLP"]
-    },
-
-    "triton": {
-        "name": "Triton Inference Server",
-        "description": "NVIDIA Triton Inference Server for model deployment",
-        "registry": "nvcr.io/nvidia/tritonserver",
-        "versions": {
-            "24.01": {
-                "tag": "24.01-py3",
-                "triton_version": "2.42.0",
-                "cuda_version": "12.3",
-                "python_version": "3.10",
-                "ubuntu_version": "22.04",
-                "features": [
-                    "CUDA 12.3",
-                    "TensorRT 8.6",
-                    "PyTorch Backend",
-                    "TensorFlow Backend",
-                    "ONNX Runtime",
-                    "Python Backend"
-                ],
-                "backends": ["TensorRT", "PyTorch", "TensorFlow", "ONNX", "Python"]
-            },
-            "23.12": {
-                "tag": "23.12-py3",
-                "triton_version": "2.41.0",
-                "cuda_version": "12.3",
-                "python_version": "3.10",
-                "ubuntu_version": "22.04",
-                "features": ["CUDA 12.3", "TensorRT 8.6", "Multiple Backends"]
-            }
-        },
-        "default_version": "24.01",
-        "use_cases": ["Inference", "Production Deployment", "Model Serving"]
-    },
-
-    "tensorrt": {
-        "name": "TensorRT",
-        "description": "NVIDIA TensorRT for high-performance inference",
-        "registry": "nvcr.io/nvidia/tensorrt",
-        "versions": {
-            "24.01": {
-                "tag": "24.01-py3",
-                "tensorrt_version": "8.6.3",
-                "cuda_version": "12.3",
-                "python_version": "3.10",
-                "ubuntu_version": "22.04",
-                "features": ["CUDA 12.3", "cuDNN 8.9", "ONNX Parser", "Python API"]
-            },
-            "23.12": {
-                "tag": "23.12-py3",
-                "tensorrt_version": "8.6.1",
-                "cuda_version": "12.3",
-                "python_version": "3.10",
-                "ubuntu_version": "22.04",
-                "features": ["CUDA 12.3", "cuDNN 8.9"]
-            }
-        },
-        "default_version": "24.01",
-        "use_cases": ["Inference Optimization", "Model Conversion"]
-    },
-
-    "cuda": {
-        "name": "CUDA Development",
-        "description": "NVIDIA CUDA development container",
-        "registry": "nvcr.io/nvidia/cuda",
-        "versions": {
-            "12.3.2": {
-                "tag": "12.3.2-devel-ubuntu22.04",
-                "cuda_version": "12.3.2",
-                "ubuntu_version": "22.04",
-                "image_type": "devel",
-                "features": ["CUDA Toolkit", "NVCC", "cuBLAS", "cuFFT", "cuSPARSE"]
-            },
-            "12.2.2": {
-                "tag": "12.2.2-devel-ubuntu22.04",
-                "cuda_version": "12.2.2",
-                "ubuntu_version": "22.04",
-                "image_type": "devel",
-                "features": ["CUDA Toolkit", "Development Tools"]
-            },
-            "11.8.0": {
-                "tag": "11.8.0-devel-ubuntu22.04",
-                "cuda_version": "11.8.0",
-                "ubuntu_version": "22.04",
-                "image_type": "devel",
-                "features": ["CUDA Toolkit 11.8", "Legacy Support"]
-            }
-        },
-        "default_version": "12.3.2",
-        "use_cases": ["CUDA Development", "Custom Applications"]
-    },
-
-    "deepstream": {
-        "name": "DeepStream SDK",
-        "description": "NVIDIA DeepStream for video analytics and AI",
-        "registry": "nvcr.io/nvidia/deepstream",
-        "versions": {
-            "6.4": {
-                "tag": "6.4-triton-multiarch",
-                "deepstream_version": "6.4",
-                "cuda_version": "12.2",
-                "ubuntu_version": "22.04",
-                "features": [
-                    "Triton Integration",
-                    "Video Analytics",
-                    "TensorRT",
-                    "Multi-stream Support"
-                ]
-            },
-            "6.3": {
-                "tag": "6.3-triton",
-                "deepstream_version": "6.3",
-                "cuda_version": "12.1",
-                "ubuntu_version": "22.04",
-                "features": ["Triton", "Video Analytics"]
-            }
-        },
-        "default_version": "6.4",
-        "use_cases": ["Video Analytics", "Streaming AI"]
-    },
-
-    "rapids": {
-        "name": "RAPIDS",
-        "description": "NVIDIA RAPIDS for GPU-accelerated data science",
-        "registry": "nvcr.io/nvidia/rapidsai/rapids",
-        "versions": {
-            "24.02": {
-                "tag": "24.02-cuda12.0-py3.10",
-                "rapids_version": "24.02",
-                "cuda_version": "12.0",
-                "python_version": "3.10",
-                "features": ["cuDF", "cuML", "cuGraph", "cuSpatial", "Dask"]
-            },
-            "23.12": {
-                "tag": "23.12-cuda12.0-py3.10",
-                "rapids_version": "23.12",
-                "cuda_version": "12.0",
-                "python_version": "3.10",
-                "features": ["cuDF", "cuML", "cuGraph"]
-            }
-        },
-        "default_version": "24.02",
-        "use_cases": ["Data Science", "ML Preprocessing", "ETL"]
-    }
+import bisect
+
+import baseline_store
+
+# Tables live in baselines_data.json and are loaded on first access
+_TABLES = {
+    "NGC_IMAGES": "ngc_images",
+    "LAUNCH_PROFILES": "launch_profiles",
 }
 
 
+def __getattr__(name):
+    if name in _TABLES:
+        return baseline_store.table(_TABLES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def get_ngc_image_info(image_name: str, version: str = None) -> dict:
     """
     Get NGC image information
@@ -273,10 +33,11 @@ def get_ngc_image_info(image_name: str, version: str = None) -> dict:
     Returns:
         Dictionary containing image information
     """
-    if image_name not in NGC_IMAGES:
+    images = baseline_store.table("ngc_images")
+    if image_name not in images:
         return None
 
-    image_info = NGC_IMAGES[image_name].copy()
+    image_info = images[image_name].copy()
 
     if version is None:
         version = image_info["default_version"]
@@ -312,36 +73,203 @@ def get_image_url(image_name: str, version: str = None) -> str:
     return f"{registry}:{tag}"
 
 
+def parse_version(version: str) -> tuple:
+    """Ordered form of a version string ("12.3.2" -> (12, 3, 2), "2.3.0a0" -> (2, 3, 0, 0))"""
+    # Imported here so plain catalog lookups (get_image_url) do not pay for re
+    import re
+    return tuple(int(part) for part in re.findall(r"\d+", str(version)))
+
+
+def _after(key: tuple) -> tuple:
+    """Smallest key past every version starting with `key` ((12, 1) -> (12, 2), so 12.1.x but not 12.10)"""
+    return key[:-1] + (key[-1] + 1,) if key else (float("inf"),)
+
+
+def _range_max_table(values: list) -> list:
+    """Sparse table: level k holds the max of each window of 2**k values"""
+    levels = [list(values)]
+    width = 1
+    while 2 * width <= len(values):
+        previous = levels[-1]
+        levels.append([max(previous[i], previous[i + width]) for i in range(len(previous) - width)])
+        width *= 2
+    return levels
+
+
+def _range_max(levels: list, start: int, stop: int):
+    """Max of values[start:stop] in O(1) from a sparse table"""
+    level = (stop - start).bit_length() - 1
+    return max(levels[level][start], levels[level][stop - (1 << level)])
+
+
+# Inverted indexes over NGC_IMAGES, built on first query:
+#   "versions": {component: (sorted keys, [(image, version), ...])} for each
+#               "<component>_version" field (cuda, nccl, pytorch, ...)
+#   "images":   {image: (sorted CUDA keys, versions, sparse table of
+#               (release key, position))} for newest-release-in-CUDA-range
+#   "drivers":  (sorted min driver keys, running max of the CUDA releases)
+_index = None
+
+
+def rebuild_ngc_index():
+    """Rebuild the version indexes; call after changing NGC_IMAGES or CUDA_DRIVER_COMPATIBILITY"""
+    global _index
+    fields = {}
+    images = {}
+    for image_name, image_data in baseline_store.table("ngc_images").items():
+        by_cuda = []
+        for version, version_info in image_data["versions"].items():
+            for field, value in version_info.items():
+                if field.endswith("_version") and isinstance(value, str):
+                    fields.setdefault(field[:-len("_version")], []).append(
+                        (parse_version(value), image_name, version))
+            if "cuda_version" in version_info:
+                by_cuda.append((parse_version(version_info["cuda_version"]), parse_version(version), version))
+        by_cuda.sort()
+        images[image_name] = (
+            [cuda for cuda, _, _ in by_cuda],
+            [version for _, _, version in by_cuda],
+            _range_max_table([(release, position) for position, (_, release, _) in enumerate(by_cuda)]),
+        )
+
+    versions = {}
+    for component, entries in fields.items():
+        entries.sort(key=lambda entry: entry[0])
+        versions[component] = ([key for key, _, _ in entries], [(image, version) for _, image, version in entries])
+
+    releases = sorted((parse_version(info["min_driver_linux"]), parse_version(cuda))
+                      for cuda, info in baseline_store.table("cuda_driver_compatibility").items())
+    newest, newest_cuda = [], ()
+    for _, cuda in releases:
+        newest_cuda = max(newest_cuda, cuda)
+        newest.append(newest_cuda)
+    _index = {
+        "versions": versions,
+        "images": images,
+        "drivers": ([driver for driver, _ in releases], newest),
+    }
+
+
+def _ngc_index() -> dict:
+    if _index is None:
+        rebuild_ngc_index()
+    return _index
+
+
+def _image_entry(image_name: str, version: str) -> dict:
+    image_data = baseline_store.table("ngc_images")[image_name]
+    version_info = image_data["versions"][version]
+    return {
+        "image": image_name,
+        "version": version,
+        "name": image_data["name"],
+        "cuda_version": version_info.get("cuda_version"),
+        "url": f"{image_data['registry']}:{version_info['tag']}",
+    }
+
+
+def get_images_by_version(component: str, low: str = None, high: str = None, image_name: str = None) -> list:
+    """
+    Get NGC images whose component version falls in a range
+
+    Bounds are inclusive at the precision given: high="12.3" includes
+    12.3.2, and low="12.1" matches 12.1.x but not 12.10.
+
+    Args:
+        component: Version field without "_version" ("cuda", "nccl", "pytorch", ...)
+        low: Lowest version (optional)
+        high: Highest version (optional)
+        image_name: Only this NGC image (optional)
+
+    Returns:
+        List of image dicts, ordered by component version
+    """
+    keys, entries = _ngc_index()["versions"].get(component, ((), ()))
+    start = bisect.bisect_left(keys, parse_version(low)) if low else 0
+    stop = bisect.bisect_left(keys, _after(parse_version(high))) if high else len(keys)
+    return [_image_entry(image, version) for image, version in entries[start:stop]
+            if image_name is None or image == image_name]
+
+
 def get_images_by_cuda_version(cuda_version: str) -> list:
     """
     Get all NGC images compatible with a CUDA version
 
     Args:
-        cuda_version: CUDA version (e.g., "12.3", "12.2")
+        cuda_version: CUDA version (e.g., "12.3", "12.2"); "12.1" does not match "12.10"
 
     Returns:
         List of compatible image names and versions
     """
-    compatible_images = []
+    return get_images_by_version("cuda", cuda_version, cuda_version)
+
+
+def get_max_cuda_for_driver(driver_version: str) -> str:
+    """
+    Newest CUDA release a driver supports (CUDA_DRIVER_COMPATIBILITY minimums)
+
+    Returns:
+        CUDA version string (e.g., "12.2"), None if the driver is older than every release
+    """
+    drivers, newest = _ngc_index()["drivers"]
+    position = bisect.bisect_right(drivers, parse_version(driver_version))
+    return ".".join(map(str, newest[position - 1])) if position else None
 
-    for image_name, image_data in NGC_IMAGES.items():
-        for version, version_info in image_data["versions"].items():
-            if version_info.get("cuda_version", "").startswith(cuda_version):
-                compatible_images.append({
-                    "image": image_name,
-                    "version": version,
-                    "name": image_data["name"],
-                    "url": get_image_url(image_name, version)
-                })
 
-    return compatible_images
+def get_best_image_for_node(image_name: str, gpu_name: str = None, driver_version: str = None,
+                            version: str = None) -> dict:
+    """
+    Newest release of an NGC image a node can run
+
+    An image runs when its CUDA version is within the GPU's supported
+    range (cuda_compatibility) and the driver supports that CUDA release.
+
+    Args:
+        image_name: NGC image name (e.g., "pytorch")
+        gpu_name: GPU model or device name (optional)
+        driver_version: Installed or planned driver (optional)
+        version: Only consider this release (optional)
+
+    Returns:
+        Image information as from get_ngc_image_info, None if no release
+        runs on the node or the GPU is unknown
+
+    Raises:
+        AmbiguousGPUModelError: the GPU name matches entries that disagree
+    """
+    if image_name not in baseline_store.table("ngc_images"):
+        return None
+    low, high = (), None
+    if gpu_name:
+        from cuda_compatibility import get_gpu_cuda_info
+        gpu_info = get_gpu_cuda_info(gpu_name)
+        if not gpu_info:
+            return None
+        low, high = parse_version(gpu_info["min_cuda_version"]), parse_version(gpu_info["max_cuda_version"])
+    if driver_version:
+        driver_cuda = get_max_cuda_for_driver(driver_version)
+        if driver_cuda is None:
+            return None
+        high = min(high, parse_version(driver_cuda)) if high else parse_version(driver_cuda)
+
+    cuda_keys, versions, newest = _ngc_index()["images"][image_name]
+    start = bisect.bisect_left(cuda_keys, low)
+    stop = bisect.bisect_left(cuda_keys, _after(high)) if high else len(cuda_keys)
+    if version is not None:
+        if version not in versions[start:stop]:
+            return None
+    elif start >= stop:
+        return None
+    else:
+        version = versions[_range_max(newest, start, stop)[1]]
+    return get_ngc_image_info(image_name, version)
 
 
 def print_ngc_catalog():
     """Print NGC image catalog"""
     print("\n=== NGC Container Image Catalog ===\n")
 
-    for image_name, image_data in NGC_IMAGES.items():
+    for image_name, image_data in baseline_store.table("ngc_images").items():
         print(f"\n{image_data['name']} ({image_name})")
         print("-" * 80)
         print(f"Description: {image_data['description']}")
@@ -360,34 +288,139 @@ def print_ngc_catalog():
                 print(f"    Features: {', '.join(version_info['features'])}")
 
 
-def get_pull_command(image_name: str, version: str = None) -> str:
+def get_pull_command(image_name: str, version: str = None, pin_digest: bool = False,
+                     offline: bool = False) -> str:
     """
     Get docker pull command for an NGC image
 
     Args:
         image_name: NGC image name
         version: Specific version (optional)
+        pin_digest: Pull the digest the tag currently points to (from the
+            ngc_manifests.py cache) and tag it, so every node gets the same image
+        offline: Resolve the digest from the cache only
 
     Returns:
         Docker pull command string
     """
     url = get_image_url(image_name, version)
-    if url:
-        return f"docker pull {url}"
-    return None
+    if not url:
+        return None
+    if pin_digest:
+        import sys
+        from ngc_manifests import resolve_digest
+        try:
+            pinned = f"{url.rsplit(':', 1)[0]}@{resolve_digest(url, offline)}"
+            return f"docker pull {pinned} && docker tag {pinned} {url}"
+        except (OSError, ValueError, LookupError) as e:
+            print(f"Warning: pulling {url} by tag, digest unavailable: {e}", file=sys.stderr)
+    return f"docker pull {url}"
+
+
+def _gpu_selection(gpus: str, topology) -> list:
+    """
+    Indexes of the GPUs a --gpus value selects: "all", a count ("2", the
+    first two) or a device list ("device=0,1" or "0,1")
+    """
+    indexes = [gpu.index for gpu in topology.gpus]
+    value = str(gpus).strip().strip('"')
+    if value == "all":
+        return indexes
+    if value.isdigit():
+        return indexes[:int(value)]
+    return [int(index) for index in value.replace("device=", "").split(",") if index.strip().isdigit()]
+
+
+def _gpus_flag(gpus: str) -> str:
+    value = str(gpus).strip().strip('"')
+    if value == "all" or value.isdigit():
+        return f"--gpus {value}"
+    return f"--gpus '\"device={value.replace('device=', '')}\"'"
+
+
+def get_launch_options(profile: str, gpus: str = "all", topology=None) -> list:
+    """
+    docker run options of a launch profile for the selected GPUs
+
+    Adds the profile's IPC/shm, ulimits and capabilities, the RDMA
+    devices of the NICs closest to the selected GPUs (with NCCL_IB_HCA),
+    and, when only some of the node's GPUs are selected, pins the
+    container to their CPUs and NUMA nodes.
+
+    Args:
+        profile: LAUNCH_PROFILES name ("training", "inference", "benchmark")
+        gpus: GPU selection as for get_run_command
+        topology: node_topology.Topology (default: detected on this node)
+
+    Returns:
+        List of option strings (without --gpus)
+
+    Raises:
+        ValueError: unknown profile
+    """
+    spec = baseline_store.table("launch_profiles").get(profile)
+    if spec is None:
+        raise ValueError(f"unknown launch profile '{profile}' "
+                         f"(available: {', '.join(baseline_store.table('launch_profiles'))})")
+    if topology is None:
+        from node_topology import detect_topology
+        topology = detect_topology()
+    from node_topology import format_cpulist, parse_cpulist
+
+    selected = set(_gpu_selection(gpus, topology))
+    devices = [gpu for gpu in topology.gpus if gpu.index in selected]
+    options = []
+    if spec.get("network"):
+        options.append(f"--network={spec['network']}")
+    if spec.get("ipc"):
+        options.append(f"--ipc={spec['ipc']}")
+    elif spec.get("shm_size"):
+        options.append(f"--shm-size={spec['shm_size']}")
+    for name, limit in spec.get("ulimits", {}).items():
+        options.append(f"--ulimit {name}={limit}")
+    for capability in spec.get("cap_add", []):
+        options.append(f"--cap-add={capability}")
+
+    env = dict(spec.get("env", {}))
+    if spec.get("rdma"):
+        wanted = {gpu.nic for gpu in devices if gpu.nic}
+        nics = [nic for nic in topology.nics if nic.active and nic.uverbs
+                and (nic.name in wanted or not topology.gpus)]
+        for nic in nics:
+            options.append(f"--device={nic.uverbs}")
+        if nics:
+            options.append("--device=/dev/infiniband/rdma_cm")
+            env["NCCL_IB_HCA"] = ",".join(nic.name for nic in nics)
+
+    if devices and len(devices) < len(topology.gpus):
+        cpus = [cpu for gpu in devices for cpu in parse_cpulist(gpu.cpus)]
+        nodes = sorted({gpu.numa for gpu in devices if gpu.numa is not None})
+        if cpus:
+            options.append(f"--cpuset-cpus={format_cpulist(cpus)}")
+        if nodes:
+            options.append(f"--cpuset-mems={','.join(map(str, nodes))}")
+
+    for name, value in env.items():
+        options.append(f"-e {name}={value}")
+    return options
 
 
 def get_run_command(image_name: str, version: str = None, gpus: str = "all",
-                    interactive: bool = True, volumes: list = None) -> str:
+                    interactive: bool = True, volumes: list = None,
+                    profile: str = None, topology=None) -> str:
     """
     Get docker run command for an NGC image
 
     Args:
         image_name: NGC image name
         version: Specific version (optional)
-        gpus: GPU specification (default: "all")
+        gpus: GPU specification (default: "all"); with a profile also a
+            count ("2") or device list ("device=0,1" or "0,1")
         interactive: Run in interactive mode (default: True)
         volumes: List of volume mounts
+        profile: Launch profile from LAUNCH_PROFILES (optional); without
+            one the command uses host network and IPC only
+        topology: node_topology.Topology for the profile (default: this node)
 
     Returns:
         Docker run command string
@@ -399,7 +432,7 @@ def get_run_command(image_name: str, version: str = None, gpus: str = "all",
     cmd_parts = ["docker run"]
 
     # GPU support
-    cmd_parts.append(f"--gpus {gpus}")
+    cmd_parts.append(_gpus_flag(gpus) if profile else f"--gpus {gpus}")
 
     # Interactive mode
     if interactive:
@@ -408,11 +441,15 @@ def get_run_command(image_name: str, version: str = None, gpus: str = "all",
     # Remove container on exit
     cmd_parts.append("--rm")
 
-    # Network
-    cmd_parts.append("--network=host")
+    if profile:
+        # Network, IPC, limits, RDMA devices and CPU/NUMA pinning
+        cmd_parts.extend(get_launch_options(profile, gpus, topology))
+    else:
+        # Network
+        cmd_parts.append("--network=host")
 
-    # IPC mode for shared memory
-    cmd_parts.append("--ipc=host")
+        # IPC mode for shared memory
+        cmd_parts.append("--ipc=host")
 
     # Volumes
     if volumes:
@@ -425,6 +462,19 @@ def get_run_command(image_name: str, version: str = None, gpus: str = "all",
     return " ".join(cmd_parts)
 
 
+def get_run_commands_per_gpu(image_name: str, version: str = None, profile: str = "inference",
+                             interactive: bool = False, volumes: list = None, topology=None) -> list:
+    """
+    One docker run command per GPU of the node, each pinned to that GPU's
+    CPUs, NUMA node and NIC (e.g. an inference server per GPU)
+    """
+    if topology is None:
+        from node_topology import detect_topology
+        topology = detect_topology()
+    return [get_run_command(image_name, version, f"device={gpu.index}", interactive, volumes, profile, topology)
+            for gpu in topology.gpus]
+
+
 if __name__ == "__main__":
     import sys
 
@@ -432,22 +482,46 @@ if __name__ == "__main__":
         if sys.argv[1] == "--catalog":
             print_ngc_catalog()
         elif sys.argv[1] == "--pull":
-            if len(sys.argv) > 2:
-                image_name = sys.argv[2]
-                version = sys.argv[3] if len(sys.argv) > 3 else None
-                cmd = get_pull_command(image_name, version)
+            args = [arg for arg in sys.argv[2:] if arg not in ("--digest", "--offline")]
+            if args:
+                image_name = args[0]
+                version = args[1] if len(args) > 1 and args[1] else None
+                cmd = get_pull_command(image_name, version, "--digest" in sys.argv, "--offline" in sys.argv)
                 if cmd:
                     print(cmd)
                 else:
                     print(f"Image '{image_name}' not found")
                     sys.exit(1)
         elif sys.argv[1] == "--run":
-            if len(sys.argv) > 2:
-                image_name = sys.argv[2]
-                version = sys.argv[3] if len(sys.argv) > 3 else None
-                cmd = get_run_command(image_name, version)
-                if cmd:
-                    print(cmd)
+            # --run <image> [version] [--profile NAME] [--gpus SPEC] [--per-gpu] [--sysfs-root DIR]
+            args, options = [], {}
+            remaining = iter(sys.argv[2:])
+            for arg in remaining:
+                if arg in ("--profile", "--gpus", "--sysfs-root"):
+                    options[arg] = next(remaining, None)
+                elif arg == "--per-gpu":
+                    options[arg] = True
+                else:
+                    args.append(arg)
+            if args:
+                image_name = args[0]
+                version = args[1] if len(args) > 1 and args[1] else None
+                topology = None
+                if "--sysfs-root" in options:
+                    from node_topology import read_topology
+                    topology = read_topology(options["--sysfs-root"])
+                try:
+                    if "--per-gpu" in options:
+                        cmds = get_run_commands_per_gpu(image_name, version, options.get("--profile") or "inference",
+                                                        topology=topology)
+                    else:
+                        cmds = [get_run_command(image_name, version, options.get("--gpus") or "all",
+                                                profile=options.get("--profile"), topology=topology)]
+                except ValueError as e:
+                    print(f"Error: {e}", file=sys.stderr)
+                    sys.exit(1)
+                if cmds and all(cmds):
+                    print("\n".join(cmds))
                 else:
                     print(f"Image '{image_name}' not found")
                     sys.exit(1)
@@ -458,6 +532,28 @@ if __name__ == "__main__":
                 print(f"\nNGC Images compatible with CUDA {cuda_version}:\n")
                 for img in images:
                     print(f"  {img['name']}: {img['url']}")
+        elif sys.argv[1] == "--range":
+            if len(sys.argv) > 2:
+                component = sys.argv[2]
+                low = sys.argv[3] if len(sys.argv) > 3 and sys.argv[3] != "-" else None
+                high = sys.argv[4] if len(sys.argv) > 4 and sys.argv[4] != "-" else None
+                images = get_images_by_version(component, low, high)
+                print(f"\nNGC Images with {component} {low or 'any'} .. {high or 'any'}:\n")
+                for img in images:
+                    version = baseline_store.table("ngc_images")[img["image"]]["versions"][img["version"]]
+                    print(f"  {img['name']} ({component} {version[component + '_version']}): {img['url']}")
+        elif sys.argv[1] == "--best":
+            if len(sys.argv) > 3:
+                image_name = sys.argv[2]
+                gpu_name = sys.argv[3]
+                driver_version = sys.argv[4] if len(sys.argv) > 4 else None
+                info = get_best_image_for_node(image_name, gpu_name, driver_version)
+                if info:
+                    print(get_image_url(image_name, info["selected_version"]))
+                else:
+                    print(f"No '{image_name}' image runs on {gpu_name}"
+                          + (f" with driver {driver_version}" if driver_version else ""))
+                    sys.exit(1)
         else:
             image_name = sys.argv[1]
             version = sys.argv[2] if len(sys.argv) > 2 else None
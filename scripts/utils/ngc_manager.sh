@@ -19,7 +19,7 @@ show_help() {
     cat << EOF
 NGC Container Image Manager
 
-Usage: $(basename "$0") <command> [options]
+Usage: $(basename "$0") [--offline] [--digest] [--profile NAME] <command> [options]
 
 Commands:
   list                  List available NGC images in catalog
@@ -29,19 +29,30 @@ Commands:
   info <image> [ver]    Show image information
   catalog              Show full NGC image catalog
   cuda <version>       Show images compatible with CUDA version
+  digest <image> [ver]  Show the registry digest of an image (cached)
+  status <image> [ver]  Check whether the local image is the current one
+
+Options:
+  --offline            Answer digest/status (and --digest pulls) from the manifest cache only
+  --digest             Pull by the digest the tag points to, then tag it
+  --profile NAME       Run with a launch profile (training, inference, benchmark):
+                       RDMA devices, ulimits and shm from this node's topology
 
 Examples:
   $(basename "$0") list
   $(basename "$0") pull pytorch
   $(basename "$0") pull pytorch 24.01
   $(basename "$0") run nemo
+  $(basename "$0") --profile training run nemo
   $(basename "$0") test pytorch
   $(basename "$0") cuda 12.3
   $(basename "$0") info triton
+  $(basename "$0") --offline status pytorch 24.01
 
 Environment Variables:
   NGC_API_KEY          NGC API key for private repositories (optional)
   CUDA_VISIBLE_DEVICES GPU devices to use (default: all)
+  NGC_MANIFEST_CACHE   Manifest cache file (default: ~/.cache/ngc-images/manifests.json)
 
 Available Images:
   - pytorch    : PyTorch with CUDA, cuDNN, NCCL
@@ -78,7 +89,7 @@ cmd_pull() {
 
     # Get pull command from Python script
     local pull_cmd
-    pull_cmd=$(python3 "$SCRIPT_DIR/ngc_images.py" --pull "$image_name" "$version" 2>&1)
+    pull_cmd=$(python3 "$SCRIPT_DIR/ngc_images.py" --pull "$image_name" "$version" "${PULL_FLAGS[@]}")
 
     if [ $? -ne 0 ]; then
         echo -e "${RED}ERROR: Failed to get pull command${NC}"
@@ -109,7 +120,7 @@ cmd_run() {
 
     # Get run command from Python script
     local run_cmd
-    run_cmd=$(python3 "$SCRIPT_DIR/ngc_images.py" --run "$image_name" "$version" 2>&1)
+    run_cmd=$(python3 "$SCRIPT_DIR/ngc_images.py" --run "$image_name" "$version" "${RUN_FLAGS[@]}" 2>&1)
 
     if [ $? -ne 0 ]; then
         echo -e "${RED}ERROR: Failed to get run command${NC}"
@@ -198,6 +209,47 @@ cmd_cuda() {
     python3 "$SCRIPT_DIR/ngc_images.py" --cuda "$cuda_version"
 }
 
+# Tag digest from the manifest cache (ngc_manifests.py)
+cmd_digest() {
+    local image_name="$1"
+    local version="${2:-}"
+
+    python3 "$SCRIPT_DIR/ngc_manifests.py" resolve "$image_name${version:+:$version}" "${CACHE_FLAGS[@]}"
+}
+
+# Compare the local image with the registry (or cached) digest
+cmd_status() {
+    local image_name="$1"
+    local version="${2:-}"
+
+    python3 "$SCRIPT_DIR/ngc_manifests.py" status "$image_name${version:+:$version}" "${CACHE_FLAGS[@]}"
+}
+
+# Global options
+CACHE_FLAGS=()
+PULL_FLAGS=()
+RUN_FLAGS=()
+while [ $# -gt 0 ]; do
+    case "$1" in
+        --offline)
+            CACHE_FLAGS+=(--offline)
+            PULL_FLAGS+=(--offline)
+            shift
+            ;;
+        --digest)
+            PULL_FLAGS+=(--digest)
+            shift
+            ;;
+        --profile)
+            RUN_FLAGS+=(--profile "${2:?--profile needs a name}")
+            shift 2
+            ;;
+        *)
+            break
+            ;;
+    esac
+done
+
 # Main command dispatcher
 if [ $# -eq 0 ]; then
     show_help
@@ -249,6 +301,20 @@ case "$command" in
         fi
         cmd_cuda "$@"
         ;;
+    digest)
+        if [ $# -lt 1 ]; then
+            echo "Usage: $(basename "$0") digest <image> [version]"
+            exit 1
+        fi
+        cmd_digest "$@"
+        ;;
+    status)
+        if [ $# -lt 1 ]; then
+            echo "Usage: $(basename "$0") status <image> [version]"
+            exit 1
+        fi
+        cmd_status "$@"
+        ;;
     help|--help|-h)
         show_help
         ;;
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+NGC Manifest Cache
+Resolves image tags to digests and layer lists through a local cache, so
+inventory and "is this image current" checks across a fleet do not each
+go back to the registry.
+
+Tags are trusted for --ttl seconds, then revalidated with a conditional
+request (If-None-Match / If-Modified-Since): an unchanged tag costs a 304
+and no manifest transfer. Manifests are stored by digest and never
+change, so platform manifests of multi-arch images are fetched once.
+If the registry cannot be reached, the stale entry is used. Tags not
+checked for EVICT_AFTER seconds are dropped, with the manifests only
+they used. --offline answers from the cache alone, stale or not.
+
+Manifests are read over the Docker Registry HTTP API v2; --registry
+points at another base URL, e.g. a local registry or a static file tree
+served with "python3 -m http.server" (v2/<repo>/manifests/<tag>).
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from ngc_images import get_image_url
+
+STORE_VERSION = 1
+DEFAULT_CACHE = os.environ.get("NGC_MANIFEST_CACHE", os.path.expanduser("~/.cache/ngc-images/manifests.json"))
+
+# Seconds a cached tag is answered without asking the registry
+DEFAULT_TTL = 3600
+# Seconds after its last check that a tag is evicted
+EVICT_AFTER = 30 * 86400
+
+MANIFEST_TYPES = ", ".join([
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+    "application/vnd.oci.image.manifest.v1+json",
+])
+HTTP_TIMEOUT = 30
+
+
+class ImageRef(NamedTuple):
+    registry: str     # "nvcr.io"
+    repository: str   # "nvidia/pytorch"
+    tag: str          # "24.01-py3"
+
+    @property
+    def url(self) -> str:
+        return f"{self.registry}/{self.repository}:{self.tag}"
+
+
+class Layer(NamedTuple):
+    digest: str
+    size: int         # compressed bytes
+
+
+class ImageManifest(NamedTuple):
+    url: str
+    digest: str       # tag's manifest (or multi-arch index) digest, as in docker RepoDigests
+    layers: List[Layer]
+    checked: float    # when the registry last confirmed the digest
+    source: str       # "cache", "revalidated" (304), "registry" or "stale" (registry unreachable)
+
+
+class CacheMiss(LookupError):
+    """Offline lookup of an image the cache does not hold"""
+
+
+def parse_image(spec: str) -> ImageRef:
+    """
+    Image reference from a catalog name ("pytorch", "nemo:24.01") or a
+    full reference ("nvcr.io/nvidia/pytorch:24.01-py3")
+    """
+    if "/" not in spec:
+        name, _, version = spec.partition(":")
+        url = get_image_url(name, version or None)
+        if url is None:
+            raise ValueError(f"image '{spec}' not in the NGC catalog")
+        spec = url
+    registry, _, rest = spec.partition("/")
+    repository, _, tag = rest.rpartition(":")
+    if not repository or "/" in tag:
+        repository, tag = rest, "latest"
+    return ImageRef(registry, repository, tag)
+
+
+def _bearer_token(challenge: str, auth: Optional[Tuple[str, str]]) -> str:
+    """Token for a 'WWW-Authenticate: Bearer realm=...,service=...,scope=...' challenge"""
+    params = {}
+    for item in urllib.request.parse_http_list(challenge.split(" ", 1)[1]):
+        key, _, value = item.partition("=")
+        params[key.strip()] = value.strip().strip('"')
+    query = urllib.parse.urlencode({key: params[key] for key in ("service", "scope") if key in params})
+    request = urllib.request.Request(f"{params['realm']}?{query}")
+    if auth:
+        import base64
+        request.add_header("Authorization", "Basic " + base64.b64encode(":".join(auth).encode()).decode())
+    with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+        body = json.load(response)
+    return body.get("token") or body["access_token"]
+
+
+def request_manifest(base: str, repository: str, reference: str, auth: Optional[Tuple[str, str]] = None,
+                     validators: Optional[Dict[str, str]] = None) -> Tuple[Optional[bytes], Dict[str, str]]:
+    """
+    GET a manifest, conditionally when validators ({"etag", "last_modified"}) are given
+
+    Returns:
+        (body, headers); body is None when the registry answered 304 Not Modified
+    """
+    url = f"{base}/v2/{repository}/manifests/{reference}"
+    headers = {"Accept": MANIFEST_TYPES}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    for attempt in range(2):
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=HTTP_TIMEOUT) as response:
+                return response.read(), dict(response.headers)
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return None, dict(e.headers)
+            challenge = e.headers.get("WWW-Authenticate", "")
+            if e.code != 401 or attempt or not challenge.lower().startswith("bearer"):
+                raise
+            headers["Authorization"] = f"Bearer {_bearer_token(challenge, auth)}"
+
+
+def _registry_unreachable(error: OSError) -> bool:
+    """
+    Whether a failed request may be answered from a stale cache entry:
+    network errors, timeouts, 5xx and 429. Other HTTP errors (404 removed
+    tag, 401 bad credentials) are answers and are raised.
+    """
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code >= 500 or error.code == 429
+    return True
+
+
+class ManifestCache:
+    """
+    JSON store of tag and manifest data
+
+    "tags" maps an image URL to its digest, the response validators and
+    when it was last checked; index tags also map each architecture to
+    its platform manifest digest. "manifests" maps a digest to its layers.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE, ttl: float = DEFAULT_TTL, offline: bool = False,
+                 registry: str = None, auth: Optional[Tuple[str, str]] = None):
+        self.path = path
+        self.ttl = ttl
+        self.offline = offline
+        self.registry = registry
+        self.auth = auth
+        self.state = self.load()
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"version": STORE_VERSION, "tags": {}, "manifests": {}}
+        if state.get("version") != STORE_VERSION:
+            return {"version": STORE_VERSION, "tags": {}, "manifests": {}}
+        return state
+
+    def save(self, now: float = None) -> int:
+        """
+        Merge into the file (the newest check of a tag wins), evict old
+        tags and write atomically; returns the number of tags evicted
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            disk = self.load()
+            for url, entry in disk["tags"].items():
+                if entry["checked"] > self.state["tags"].get(url, {}).get("checked", -1):
+                    self.state["tags"][url] = entry
+            for digest, manifest in disk["manifests"].items():
+                self.state["manifests"].setdefault(digest, manifest)
+            evicted = self.evict(now)
+
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.state, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        return evicted
+
+    def evict(self, now: float = None) -> int:
+        """Drop tags unchecked for EVICT_AFTER and manifests no tag uses"""
+        now = time.time() if now is None else now
+        tags = self.state["tags"]
+        old = [url for url, entry in tags.items() if now - entry["checked"] > EVICT_AFTER]
+        for url in old:
+            del tags[url]
+        used = set()
+        for entry in tags.values():
+            used.add(entry["digest"])
+            used.update(entry.get("platforms", {}).values())
+        self.state["manifests"] = {digest: m for digest, m in self.state["manifests"].items() if digest in used}
+        return len(old)
+
+    def _base(self, image: ImageRef) -> str:
+        return (self.registry or f"https://{image.registry}").rstrip("/")
+
+    def _store_manifest(self, digest: str, manifest: dict):
+        self.state["manifests"][digest] = {
+            "layers": [[layer["digest"], int(layer.get("size", 0))] for layer in manifest.get("layers", [])],
+        }
+
+    def _refresh(self, image: ImageRef, entry: Optional[dict], now: float) -> Tuple[dict, str]:
+        body, headers = request_manifest(self._base(image), image.repository, image.tag, self.auth, entry)
+        headers = {key.lower(): value for key, value in headers.items()}
+        if body is None:
+            entry = dict(entry, checked=now)
+            self.state["tags"][image.url] = entry
+            return entry, "revalidated"
+
+        manifest = json.loads(body)
+        digest = headers.get("docker-content-digest") or "sha256:" + hashlib.sha256(body).hexdigest()
+        entry = {"digest": digest, "checked": now,
+                 "etag": headers.get("etag"), "last_modified": headers.get("last-modified")}
+        if "manifests" in manifest:
+            entry["platforms"] = {
+                m["platform"]["architecture"]: m["digest"] for m in manifest["manifests"]
+                if m.get("platform", {}).get("os", "linux") == "linux" and "architecture" in m.get("platform", {})
+            }
+        else:
+            self._store_manifest(digest, manifest)
+        self.state["tags"][image.url] = entry
+        return entry, "registry"
+
+    def resolve(self, image: ImageRef, arch: str = "amd64", now: float = None) -> ImageManifest:
+        """
+        Digest and layers of an image tag
+
+        Raises:
+            CacheMiss: offline and the image is not cached
+            OSError / ValueError: the registry could not be read
+        """
+        now = time.time() if now is None else now
+        entry = self.state["tags"].get(image.url)
+        source = "cache"
+        if entry is None or (not self.offline and now - entry["checked"] >= self.ttl):
+            if self.offline:
+                raise CacheMiss(f"{image.url} is not in the manifest cache")
+            try:
+                entry, source = self._refresh(image, entry, now)
+            except OSError as e:
+                # Registry unreachable: a stale answer beats none
+                if entry is None or not _registry_unreachable(e):
+                    raise
+                source = "stale"
+
+        digest = entry["digest"]
+        if "platforms" in entry:
+            if arch not in entry["platforms"]:
+                raise ValueError(f"{image.url} has no linux/{arch} manifest")
+            digest = entry["platforms"][arch]
+        if digest not in self.state["manifests"]:
+            if self.offline:
+                raise CacheMiss(f"{image.url} ({arch}) manifest is not in the manifest cache")
+            body, _ = request_manifest(self._base(image), image.repository, digest, self.auth)
+            self._store_manifest(digest, json.loads(body))
+        layers = [Layer(*layer) for layer in self.state["manifests"][digest]["layers"]]
+        return ImageManifest(image.url, entry["digest"], layers, entry["checked"], source)
+
+
+def resolve_digest(url: str, offline: bool = False, cache_path: str = DEFAULT_CACHE) -> str:
+    """
+    Registry digest of an image reference through the cache (saved afterwards)
+
+    Raises:
+        CacheMiss: offline and the image is not cached
+        OSError / ValueError: the registry could not be read
+    """
+    cache = ManifestCache(cache_path, offline=offline)
+    digest = cache.resolve(parse_image(url)).digest
+    if not offline:
+        cache.save()
+    return digest
+
+
+def local_digest(image: ImageRef) -> Optional[str]:
+    """Registry digest of the locally pulled image (docker RepoDigests), None if not pulled"""
+    try:
+        result = subprocess.run(["docker", "image", "inspect", "--format", "{{json .RepoDigests}}", image.url],
+                                capture_output=True, text=True, timeout=HTTP_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    prefix = f"{image.registry}/{image.repository}@"
+    for repo_digest in json.loads(result.stdout or "[]") or []:
+        if repo_digest.startswith(prefix):
+            return repo_digest[len(prefix):]
+    return None
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="NGC Manifest Cache - cached tag digests and layers, revalidated with conditional requests"
+    )
+    parser.add_argument("command", choices=["resolve", "status", "evict"],
+                        help="resolve: digest and layers; status: compare with local images; evict: prune the cache")
+    parser.add_argument("images", nargs="*",
+                        help="Catalog names (pytorch, nemo:24.01) or full references (nvcr.io/nvidia/pytorch:24.01-py3)")
+    parser.add_argument("--offline", action="store_true", help="Answer from the cache only")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL,
+                        help=f"Seconds a cached tag is trusted (default: {DEFAULT_TTL})")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help=f"Cache file (default: {DEFAULT_CACHE})")
+    parser.add_argument("--registry", help="Read manifests from this base URL (e.g. http://127.0.0.1:5000)")
+    parser.add_argument("--arch", default="amd64", help="Platform for multi-arch images (default: amd64)")
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    args = parser.parse_args()
+
+    api_key = os.environ.get("NGC_API_KEY")
+    cache = ManifestCache(args.cache, args.ttl, args.offline, args.registry,
+                          ("$oauthtoken", api_key) if api_key else None)
+    if args.command == "evict":
+        print(f"Evicted {cache.save()} tags from {args.cache}")
+        return
+
+    results = []
+    failed = False
+    for spec in args.images:
+        try:
+            image = parse_image(spec)
+            manifest = cache.resolve(image, args.arch)
+        except (OSError, ValueError, LookupError) as e:
+            print(f"Error resolving {spec}: {e}", file=sys.stderr)
+            failed = True
+            continue
+        result = {
+            "image": manifest.url,
+            "digest": manifest.digest,
+            "layers": len(manifest.layers),
+            "bytes": sum(layer.size for layer in manifest.layers),
+            "age_seconds": round(time.time() - manifest.checked),
+            "source": manifest.source,
+        }
+        if args.command == "status":
+            local = local_digest(image)
+            result["local_digest"] = local
+            result["status"] = "not pulled" if local is None else "current" if local == manifest.digest else "outdated"
+            failed = failed or result["status"] != "current"
+        results.append(result)
+    if not args.offline:
+        try:
+            cache.save()
+        except OSError as e:
+            print(f"Error saving manifest cache {args.cache}: {e}", file=sys.stderr)
+
+    if args.format == "json":
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            line = (f"{result['image']:<48} {result['digest'][:19]}  {result['bytes'] / 1e9:6.2f} GB  "
+                    f"{result['source']}, checked {result['age_seconds']}s ago")
+            if args.command == "status":
+                line += f"  {result['status']}"
+            print(line)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+NGC Image Pre-pull Planner
+Plans how a fleet pre-pulls NGC images without fetching the same layers
+from the registry on every host.
+
+Image manifests (Docker Registry HTTP API v2) give the layer digests of
+the requested images; layers shared between images are counted once. The
+pull is then staged through pull-through cache registries:
+
+  wave 0   the cache host pulls every image through its local cache, so
+           each distinct layer crosses the uplink exactly once
+  wave 1   one host per rack pulls through its own rack cache, which is
+           fed by the central cache (--no-rack-caches skips this tier)
+  wave 2+  the other hosts pull from their rack cache, at most
+           --rack-concurrency hosts per rack at a time
+
+The ngc_images Ansible role runs the waves in order (pull_strategy
+"prepull"). Manifests are read through the ngc_manifests.py cache;
+--registry points them at a local registry (e.g. a registry:2 container,
+or a static file tree served over HTTP) for testing.
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from ngc_manifests import DEFAULT_TTL, ImageRef, Layer, ManifestCache, parse_image
+
+
+def fetch_all_layers(images: List[ImageRef], cache: ManifestCache, arch: str = "amd64"
+                     ) -> Dict[ImageRef, Optional[List[Layer]]]:
+    """Layers of every image, read in parallel through the manifest cache; None (with a warning) where unavailable"""
+    def fetch(image):
+        try:
+            return cache.resolve(image, arch).layers
+        except (OSError, ValueError, LookupError) as e:
+            print(f"Warning: no manifest for {image.url}: {e}", file=sys.stderr)
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(8, len(images) or 1)) as pool:
+        layers = dict(zip(images, pool.map(fetch, images)))
+    if not cache.offline:
+        try:
+            cache.save()
+        except OSError as e:
+            print(f"Warning: manifest cache not saved: {e}", file=sys.stderr)
+    return layers
+
+
+def layer_summary(layers: Dict[ImageRef, Optional[List[Layer]]]) -> dict:
+    """
+    Shared layers and bytes across images
+
+    Each host fetches every distinct layer once however many images use
+    it; the staged plan also fetches it from the registry only once for
+    the whole fleet.
+    """
+    sizes = {}
+    users = {}
+    pull_order = []
+    for image, image_layers in layers.items():
+        if image_layers is None:
+            continue
+        new_bytes = 0
+        for layer in {layer.digest: layer for layer in image_layers}.values():
+            if layer.digest not in sizes:
+                new_bytes += layer.size
+            sizes[layer.digest] = layer.size
+            users.setdefault(layer.digest, []).append(image.url)
+        pull_order.append({
+            "image": image.url,
+            "layers": len(image_layers),
+            "bytes": sum(layer.size for layer in image_layers),
+            "new_bytes": new_bytes,
+        })
+    shared = {digest: urls for digest, urls in users.items() if len(urls) > 1}
+    return {
+        "images": pull_order,
+        "unique_layers": len(sizes),
+        "unique_bytes": sum(sizes.values()),
+        "image_bytes": sum(entry["bytes"] for entry in pull_order),
+        "shared_layers": len(shared),
+        "shared_bytes": sum(sizes[digest] for digest in shared),
+        "shared": {digest: {"size": sizes[digest], "images": urls} for digest, urls in shared.items()},
+        "missing": [image.url for image, image_layers in layers.items() if image_layers is None],
+    }
+
+
+def schedule(hosts: Dict[str, str], cache_host: str = None, rack_concurrency: int = 4,
+             rack_caches: bool = True) -> Dict[str, dict]:
+    """
+    Pull waves for a fleet
+
+    Args:
+        hosts: {host: rack}
+        cache_host: Host running the central pull-through cache (default: first host)
+        rack_concurrency: Most hosts of one rack pulling at the same time
+        rack_caches: Give every other rack its own cache host fed by the central cache
+
+    Returns:
+        {host: {"wave", "rack", "role" (cache, rack-cache, node), "source" (host
+        whose cache it pulls from), "upstream" (cache hosts only: host their
+        cache fetches from, None for the registry)}}
+    """
+    if rack_concurrency < 1:
+        raise ValueError("rack concurrency must be at least 1")
+    if not hosts:
+        return {}
+    cache_host = cache_host or sorted(hosts)[0]
+    if cache_host not in hosts:
+        raise ValueError(f"cache host {cache_host} is not in the host list")
+
+    racks = {}
+    for host in sorted(hosts):
+        racks.setdefault(hosts[host], []).append(host)
+
+    plan = {cache_host: {"wave": 0, "rack": hosts[cache_host], "role": "cache",
+                         "source": cache_host, "upstream": None}}
+    for rack, members in sorted(racks.items()):
+        members = [host for host in members if host != cache_host]
+        source = cache_host
+        first_wave = 1
+        if rack_caches and members and rack != hosts[cache_host]:
+            seed = members.pop(0)
+            plan[seed] = {"wave": 1, "rack": rack, "role": "rack-cache", "source": seed, "upstream": cache_host}
+            source = seed
+            first_wave = 2
+        for i, host in enumerate(members):
+            plan[host] = {"wave": first_wave + i // rack_concurrency, "rack": rack, "role": "node",
+                          "source": source, "upstream": None}
+    return plan
+
+
+def build_plan(images: List[str], hosts: Dict[str, str], cache_host: str = None, rack_concurrency: int = 4,
+               rack_caches: bool = True, cache: ManifestCache = None, arch: str = "amd64") -> dict:
+    """Layer summary plus pull waves, as consumed by the ngc_images role"""
+    refs = [parse_image(spec) for spec in images]
+    summary = layer_summary(fetch_all_layers(refs, cache or ManifestCache(), arch))
+    hosts_plan = schedule(hosts, cache_host, rack_concurrency, rack_caches)
+    return {
+        "images": [{"url": ref.url, "registry": ref.registry, "repository": ref.repository, "tag": ref.tag}
+                   for ref in refs],
+        "layers": summary,
+        "hosts": hosts_plan,
+        "waves": max((entry["wave"] for entry in hosts_plan.values()), default=-1) + 1,
+        "registry_bytes": summary["unique_bytes"],
+        "naive_registry_bytes": summary["unique_bytes"] * len(hosts),
+    }
+
+
+def parse_hosts(items: List[str]) -> Dict[str, str]:
+    """{host: rack} from "host=rack" items (no rack: "default")"""
+    hosts = {}
+    for item in items:
+        host, _, rack = item.partition("=")
+        if host:
+            hosts[host] = rack or "default"
+    return hosts
+
+
+def _gb(size: int) -> str:
+    return f"{size / 1e9:.2f} GB"
+
+
+def print_plan(plan: dict):
+    """Print a pre-pull plan"""
+    layers = plan["layers"]
+    print("\n=== NGC Pre-pull Plan ===\n")
+    print(f"{'Image':<48} {'Layers':>6} {'Size':>10} {'New':>10}")
+    print("-" * 78)
+    for entry in layers["images"]:
+        print(f"{entry['image']:<48} {entry['layers']:>6} {_gb(entry['bytes']):>10} {_gb(entry['new_bytes']):>10}")
+    for url in layers["missing"]:
+        print(f"{url:<48} {'?':>6}  (manifest unavailable)")
+    print(f"\nDistinct layers: {layers['unique_layers']} ({_gb(layers['unique_bytes'])}), "
+          f"shared by several images: {layers['shared_layers']} ({_gb(layers['shared_bytes'])})")
+
+    hosts = plan["hosts"]
+    print(f"\nRegistry traffic: {_gb(plan['registry_bytes'])} "
+          f"(pulling on every host: {_gb(plan['naive_registry_bytes'])})"
+          + (", not counting images without a manifest" if layers["missing"] else ""))
+    print(f"Hosts: {len(hosts)}, waves: {plan['waves']}\n")
+    for wave in range(plan["waves"]):
+        members = sorted(host for host, entry in hosts.items() if entry["wave"] == wave)
+        by_source = {}
+        for host in members:
+            by_source.setdefault(hosts[host]["source"], []).append(host)
+        print(f"Wave {wave}: {len(members)} hosts")
+        for source, pulling in sorted(by_source.items()):
+            shown = ", ".join(pulling[:6]) + (f" and {len(pulling) - 6} more" if len(pulling) > 6 else "")
+            print(f"  from {source} cache: {shown}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="NGC Pre-pull Planner - layer-aware, rack-staged image pulls"
+    )
+    parser.add_argument("images", nargs="+",
+                        help="Catalog names (pytorch, nemo:24.01) or full references (nvcr.io/nvidia/pytorch:24.01-py3)")
+    parser.add_argument("--hosts", nargs="*", default=[], metavar="HOST=RACK", help="Hosts to plan for")
+    parser.add_argument("--hosts-file", help="File of 'host rack' lines")
+    parser.add_argument("--cache-host", help="Host running the central cache (default: first host)")
+    parser.add_argument("--rack-concurrency", type=int, default=4, help="Hosts per rack pulling at once (default: 4)")
+    parser.add_argument("--no-rack-caches", action="store_true", help="Pull every host from the central cache")
+    parser.add_argument("--registry", help="Read manifests from this base URL (e.g. http://127.0.0.1:5000)")
+    parser.add_argument("--arch", default="amd64", help="Platform for multi-arch images (default: amd64)")
+    parser.add_argument("--offline", action="store_true", help="Use cached manifests only (ngc_manifests.py)")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="Seconds a cached manifest is trusted")
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    args = parser.parse_args()
+
+    items = list(args.hosts)
+    try:
+        if args.hosts_file:
+            with open(args.hosts_file) as f:
+                items += ["=".join(line.split()[:2]) for line in f if line.strip() and not line.startswith("#")]
+        api_key = os.environ.get("NGC_API_KEY")
+        cache = ManifestCache(ttl=args.ttl, offline=args.offline, registry=args.registry,
+                              auth=("$oauthtoken", api_key) if api_key else None)
+        plan = build_plan(args.images, parse_hosts(items), args.cache_host, args.rack_concurrency,
+                          not args.no_rack_caches, cache, args.arch)
+    except (OSError, ValueError) as e:
+        print(f"Error planning pre-pull: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.format == "json":
+        print(json.dumps(plan, indent=2))
+    else:
+        print_plan(plan)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Node Topology
+Reads GPU, RDMA NIC and NUMA affinity of a node from sysfs, or from
+`nvidia-smi topo -m` where sysfs shows no NVIDIA GPUs (e.g. inside a
+container), for ngc_images launch profiles.
+
+Every path is taken under a root directory, so a fake sysfs tree
+(sys/bus/pci/devices, sys/class/infiniband, proc/driver/nvidia/gpus)
+renders the same way as a real node. Each GPU is paired with the RDMA
+NIC sharing the deepest PCIe path with it (same switch before same root
+complex), then one on the same NUMA node.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Iterable, List, NamedTuple, Optional
+
+NVIDIA_VENDOR = "0x10de"
+# PCI classes of GPUs: 0x0300 VGA, 0x0302 3D controller
+GPU_CLASSES = ("0x0300", "0x0302")
+# `nvidia-smi topo -m` GPU-NIC links, closest first
+TOPO_LINK_RANK = {"PIX": 0, "PXB": 1, "PHB": 2, "NODE": 3, "SYS": 4}
+
+
+class GPUInfo(NamedTuple):
+    index: int
+    pci: str               # "0000:1b:00.0", "" if unknown
+    numa: Optional[int]
+    cpus: str              # local CPU list ("0-27,56-83"), "" if unknown
+    nic: Optional[str]     # closest active RDMA device
+
+
+class NICInfo(NamedTuple):
+    name: str              # "mlx5_0"
+    pci: str
+    numa: Optional[int]
+    uverbs: Optional[str]  # "/dev/infiniband/uverbs0"
+    link_layer: str        # "InfiniBand" or "Ethernet" (RoCE)
+    active: bool
+
+
+class Topology(NamedTuple):
+    gpus: List[GPUInfo]
+    nics: List[NICInfo]
+    source: str            # "sysfs", "nvidia-smi" or "none"
+
+
+def _read(path: str, default: str = "") -> str:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def _numa(path: str) -> Optional[int]:
+    value = _read(path, "-1")
+    return int(value) if value.lstrip("-").isdigit() and int(value) >= 0 else None
+
+
+def parse_cpulist(cpulist: str) -> List[int]:
+    """CPUs of a list like "0-3,8,10-11" """
+    cpus = []
+    for part in filter(None, cpulist.replace(" ", "").split(",")):
+        low, _, high = part.partition("-")
+        cpus.extend(range(int(low), int(high or low) + 1))
+    return sorted(set(cpus))
+
+
+def format_cpulist(cpus: Iterable[int]) -> str:
+    """Compact list of CPUs ([0, 1, 2, 3, 8] -> "0-3,8")"""
+    ranges = []
+    for cpu in sorted(set(cpus)):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(low) if low == high else f"{low}-{high}" for low, high in ranges)
+
+
+def _pci_path(root: str, device_dir: str) -> List[str]:
+    """PCIe path components of a device (root complex, bridges, device) from its sysfs location"""
+    real = os.path.realpath(device_dir)
+    devices = os.path.realpath(os.path.join(root, "sys", "devices"))
+    relative = os.path.relpath(real, devices) if real.startswith(devices + os.sep) else real
+    return [part for part in relative.split(os.sep) if part and part != ".."]
+
+
+def _common_depth(a: List[str], b: List[str]) -> int:
+    depth = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        depth += 1
+    return depth
+
+
+def read_nics(root: str = "/") -> List[NICInfo]:
+    """RDMA devices from <root>/sys/class/infiniband"""
+    class_dir = os.path.join(root, "sys", "class", "infiniband")
+    try:
+        names = sorted(os.listdir(class_dir))
+    except OSError:
+        return []
+    nics = []
+    for name in names:
+        device = os.path.join(class_dir, name, "device")
+        ports_dir = os.path.join(class_dir, name, "ports")
+        try:
+            ports = sorted(os.listdir(ports_dir))
+        except OSError:
+            ports = []
+        states = [_read(os.path.join(ports_dir, port, "state")) for port in ports]
+        link_layer = _read(os.path.join(ports_dir, ports[0], "link_layer")) if ports else ""
+        try:
+            verbs = sorted(os.listdir(os.path.join(device, "infiniband_verbs")))
+        except OSError:
+            verbs = []
+        nics.append(NICInfo(
+            name=name,
+            pci=os.path.basename(os.path.realpath(device)),
+            numa=_numa(os.path.join(device, "numa_node")),
+            uverbs=f"/dev/infiniband/{verbs[0]}" if verbs else None,
+            link_layer=link_layer,
+            active=any("ACTIVE" in state for state in states),
+        ))
+    return nics
+
+
+def _closest_nic(path: List[str], numa: Optional[int], nics: List[NICInfo], nic_paths: dict) -> Optional[str]:
+    candidates = [nic for nic in nics if nic.active]
+    if not candidates:
+        return None
+    best = max(candidates, key=lambda nic: (_common_depth(path, nic_paths[nic.name]),
+                                            numa is not None and nic.numa == numa))
+    return best.name
+
+
+def read_topology(root: str = "/") -> Topology:
+    """GPUs and RDMA NICs of a node from sysfs under `root`"""
+    devices_dir = os.path.join(root, "sys", "bus", "pci", "devices")
+    try:
+        addresses = sorted(os.listdir(devices_dir))
+    except OSError:
+        addresses = []
+    nics = read_nics(root)
+    nic_paths = {nic.name: _pci_path(root, os.path.join(root, "sys", "class", "infiniband", nic.name, "device"))
+                 for nic in nics}
+
+    found = []
+    for address in addresses:
+        device = os.path.join(devices_dir, address)
+        if _read(os.path.join(device, "vendor")) != NVIDIA_VENDOR:
+            continue
+        if not _read(os.path.join(device, "class")).startswith(GPU_CLASSES):
+            continue
+        # nvidia-smi indexes follow the driver's minor numbers when known, PCI order otherwise
+        information = _read(os.path.join(root, "proc", "driver", "nvidia", "gpus", address, "information"))
+        minor = next((line.split(":", 1)[1].strip() for line in information.splitlines()
+                      if line.startswith("Device Minor")), None)
+        found.append((int(minor) if minor and minor.isdigit() else len(found), address, device))
+
+    gpus = []
+    for index, (_, address, device) in enumerate(sorted(found)):
+        numa = _numa(os.path.join(device, "numa_node"))
+        gpus.append(GPUInfo(
+            index=index,
+            pci=address,
+            numa=numa,
+            cpus=_read(os.path.join(device, "local_cpulist")),
+            nic=_closest_nic(_pci_path(root, device), numa, nics, nic_paths),
+        ))
+    return Topology(gpus, nics, "sysfs" if gpus else "none")
+
+
+def parse_nvidia_smi_topo(text: str, nics: List[NICInfo] = ()) -> List[GPUInfo]:
+    """
+    GPUs from `nvidia-smi topo -m`: CPU/NUMA affinity and the NIC with
+    the closest link. NIC columns are named by the "NIC Legend"; only
+    active devices among `nics` are considered when given.
+    """
+    lines = re.sub(r"\x1b\[[0-9;]*m", "", text).splitlines()
+    header = next((line for line in lines if line.strip().startswith("GPU0")), None)
+    if header is None:
+        return []
+    columns = [column.strip() for column in header.strip().split("\t") if column.strip()]
+    legend = {}
+    for line in lines:
+        key, _, value = line.strip().partition(":")
+        if key.startswith("NIC") and key[3:].isdigit() and value.strip():
+            legend[key] = value.strip()
+    active = {nic.name for nic in nics if nic.active} if nics else None
+
+    gpus = []
+    for line in lines:
+        cells = [cell.strip() for cell in line.split("\t")]
+        if not cells or not cells[0].startswith("GPU") or not cells[0][3:].isdigit():
+            continue
+        row = dict(zip(columns, cells[1:]))
+        links = []
+        for column, link in row.items():
+            name = legend.get(column, column if column.startswith("mlx") else None)
+            if name and link in TOPO_LINK_RANK and (active is None or name in active):
+                links.append((TOPO_LINK_RANK[link], name))
+        numa = row.get("NUMA Affinity", "")
+        gpus.append(GPUInfo(
+            index=int(cells[0][3:]),
+            pci="",
+            numa=int(numa) if numa.isdigit() else None,
+            cpus=row.get("CPU Affinity", "") if row.get("CPU Affinity", "N/A") != "N/A" else "",
+            nic=min(links)[1] if links else None,
+        ))
+    return gpus
+
+
+def detect_topology(root: str = "/") -> Topology:
+    """Topology from sysfs, falling back to `nvidia-smi topo -m` for the GPUs"""
+    topology = read_topology(root)
+    if topology.gpus or root not in ("/", ""):
+        return topology
+    try:
+        result = subprocess.run(["nvidia-smi", "topo", "-m"], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return topology
+    gpus = parse_nvidia_smi_topo(result.stdout, topology.nics) if result.returncode == 0 else []
+    return Topology(gpus, topology.nics, "nvidia-smi") if gpus else topology
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Node Topology - GPU, RDMA NIC and NUMA affinity")
+    parser.add_argument("--sysfs-root", default="/", help="Read sys/ and proc/ under this directory (default: /)")
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    args = parser.parse_args()
+
+    topology = detect_topology(args.sysfs_root)
+    if args.format == "json":
+        print(json.dumps({"source": topology.source,
+                          "gpus": [gpu._asdict() for gpu in topology.gpus],
+                          "nics": [nic._asdict() for nic in topology.nics]}, indent=2))
+        return
+
+    print(f"\n=== Node Topology ({topology.source}) ===\n")
+    print(f"{'GPU':<5} {'PCI':<14} {'NUMA':>4}  {'CPUs':<20} NIC")
+    for gpu in topology.gpus:
+        numa = "-" if gpu.numa is None else str(gpu.numa)
+        print(f"{gpu.index:<5} {gpu.pci or '-':<14} {numa:>4}  {gpu.cpus or '-':<20} {gpu.nic or '-'}")
+    if topology.nics:
+        print("\nRDMA devices:")
+        for nic in topology.nics:
+            numa = "-" if nic.numa is None else str(nic.numa)
+            print(f"  {nic.name:<10} {nic.pci:<14} NUMA {numa:>2}  {nic.link_layer or '?':<11} "
+                  f"{'ACTIVE' if nic.active else 'DOWN':<7} {nic.uverbs or '-'}")
+    if not topology.gpus:
+        print("No NVIDIA GPUs found", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
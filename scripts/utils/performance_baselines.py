@@ -3,358 +3,223 @@
 GPU and CPU Performance Baseline Database
 Contains expected performance metrics for different GPU/CPU models
 Based on official specifications and real-world benchmarks
+The tables themselves live in baselines_data.json (see baseline_store.py)
 """
 
-import json
-from typing import Dict, Any
-
-# GPU Performance Baselines
-GPU_BASELINES = {
-    # NVIDIA Ampere Architecture
-    "A100-SXM4-40GB": {
-        "architecture": "Ampere",
-        "compute_capability": "8.0",
-        "memory_gb": 40,
-        "memory_bandwidth_gbs": 1555,
-        "fp64_tflops": 9.7,
-        "fp32_tflops": 19.5,
-        "tf32_tflops": 156,
-        "fp16_tflops": 312,
-        "int8_tops": 624,
-        "nvlink_version": "3.0",
-        "nvlink_bandwidth_gbs": 600,  # 12 links x 50GB/s
-        "pcie_gen": 4,
-        "pcie_bandwidth_gbs": 64,  # PCIe Gen4 x16
-        "tdp_watts": 400,
-        "expected_mfu": {  # Model FLOP Utilization
-            "megatron_gpt": 0.52,  # 52% on large models
-            "bert_large": 0.45,
-        },
-        "nccl_allreduce_busbw_gbs": {
-            "intra_node_8gpu": 250,  # Expected bus bandwidth
-            "inter_node_ib_hdr": 180,  # InfiniBand HDR 200Gbps
-        }
-    },
-    "A100-SXM4-80GB": {
-        "architecture": "Ampere",
-        "compute_capability": "8.0",
-        "memory_gb": 80,
-        "memory_bandwidth_gbs": 2039,
-        "fp64_tflops": 9.7,
-        "fp32_tflops": 19.5,
-        "tf32_tflops": 156,
-        "fp16_tflops": 312,
-        "int8_tops": 624,
-        "nvlink_version": "3.0",
-        "nvlink_bandwidth_gbs": 600,
-        "pcie_gen": 4,
-        "pcie_bandwidth_gbs": 64,
-        "tdp_watts": 400,
-        "expected_mfu": {
-            "megatron_gpt": 0.52,
-            "bert_large": 0.45,
-        },
-        "nccl_allreduce_busbw_gbs": {
-            "intra_node_8gpu": 250,
-            "inter_node_ib_hdr": 180,
-        }
-    },
-    "A100-PCIE-40GB": {
-        "architecture": "Ampere",
-        "compute_capability": "8.0",
-        "memory_gb": 40,
-        "memory_bandwidth_gbs": 1555,
-        "fp64_tflops": 9.7,
-        "fp32_tflops": 19.5,
-        "tf32_tflops": 156,
-        "fp16_tflops": 312,
-        "int8_tops": 624,
-        "nvlink_version": None,
-        "nvlink_bandwidth_gbs": 0,
-        "pcie_gen": 4,
-        "pcie_bandwidth_gbs": 64,
-        "tdp_watts": 250,
-        "expected_mfu": {
-            "megatron_gpt": 0.48,  # Slightly lower due to PCIe
-            "bert_large": 0.42,
-        },
-        "nccl_allreduce_busbw_gbs": {
-            "intra_node_8gpu": 50,  # Limited by PCIe
-            "inter_node_ib_hdr": 180,
-        }
-    },
-
-    # NVIDIA Hopper Architecture
-    "H100-SXM5-80GB": {
-        "architecture": "Hopper",
-        "compute_capability": "9.0",
-        "memory_gb": 80,
-        "memory_bandwidth_gbs": 3350,
-        "fp64_tflops": 33.5,
-        "fp64_tensor_tflops": 60,
-        "fp32_tflops": 67,
-        "tf32_tflops": 378,
-        "fp16_tflops": 756,
-        "fp8_tflops": 1513,
-        "int8_tops": 1513,
-        "nvlink_version": "4.0",
-        "nvlink_bandwidth_gbs": 900,  # 18 links x 50GB/s
-        "pcie_gen": 5,
-        "pcie_bandwidth_gbs": 128,  # PCIe Gen5 x16
-        "tdp_watts": 700,
-        "expected_mfu": {
-            "megatron_gpt": 0.47,  # 47% on H100 clusters
-            "bert_large": 0.50,
-        },
-        "nccl_allreduce_busbw_gbs": {
-            "intra_node_8gpu": 450,  # Higher with NVLink 4.0
-            "inter_node_ib_ndr": 350,  # InfiniBand NDR 400Gbps
-        }
-    },
-    "H100-PCIE-80GB": {
-        "architecture": "Hopper",
-        "compute_capability": "9.0",
-        "memory_gb": 80,
-        "memory_bandwidth_gbs": 2000,
-        "fp64_tflops": 33.5,
-        "fp64_tensor_tflops": 60,
-        "fp32_tflops": 67,
-        "tf32_tflops": 378,
-        "fp16_tflops": 756,
-        "fp8_tflops": 1513,
-        "int8_tops": 1513,
-        "nvlink_version": None,
-        "nvlink_bandwidth_gbs": 0,
-        "pcie_gen": 5,
-        "pcie_bandwidth_gbs": 128,
-        "tdp_watts": 350,
-        "expected_mfu": {
-            "megatron_gpt": 0.43,
-            "bert_large": 0.46,
-        },
-        "nccl_allreduce_busbw_gbs": {
-            "intra_node_8gpu": 100,
-            "inter_node_ib_ndr": 350,
-        }
-    },
-
-    # NVIDIA Volta Architecture
-    "V100-SXM2-16GB": {
-        "architecture": "Volta",
-        "compute_capability": "7.0",
-        "memory_gb": 16,
-        "memory_bandwidth_gbs": 900,
-        "fp64_tflops": 7.8,
-        "fp32_tflops": 15.7,
-        "fp16_tflops": 125,
-        "nvlink_version": "2.0",
-        "nvlink_bandwidth_gbs": 300,  # 6 links x 50GB/s
-        "pcie_gen": 3,
-        "pcie_bandwidth_gbs": 32,  # PCIe Gen3 x16
-        "tdp_watts": 300,
-        "expected_mfu": {
-            "megatron_gpt": 0.30,
-            "bert_large": 0.35,
-        },
-        "nccl_allreduce_busbw_gbs": {
-            "intra_node_8gpu": 180,
-            "inter_node_ib_edr": 90,  # InfiniBand EDR 100Gbps
-        }
-    },
-    "V100-SXM2-32GB": {
-        "architecture": "Volta",
-        "compute_capability": "7.0",
-        "memory_gb": 32,
-        "memory_bandwidth_gbs": 900,
-        "fp64_tflops": 7.8,
-        "fp32_tflops": 15.7,
-        "fp16_tflops": 125,
-        "nvlink_version": "2.0",
-        "nvlink_bandwidth_gbs": 300,
-        "pcie_gen": 3,
-        "pcie_bandwidth_gbs": 32,
-        "tdp_watts": 300,
-        "expected_mfu": {
-            "megatron_gpt": 0.30,
-            "bert_large": 0.35,
-        },
-        "nccl_allreduce_busbw_gbs": {
-            "intra_node_8gpu": 180,
-            "inter_node_ib_edr": 90,
-        }
-    },
-    "V100-PCIE-16GB": {
-        "architecture": "Volta",
-        "compute_capability": "7.0",
-        "memory_gb": 16,
-        "memory_bandwidth_gbs": 900,
-        "fp64_tflops": 7.8,
-        "fp32_tflops": 15.7,
-        "fp16_tflops": 125,
-        "nvlink_version": None,
-        "nvlink_bandwidth_gbs": 0,
-        "pcie_gen": 3,
-        "pcie_bandwidth_gbs": 32,
-        "tdp_watts": 250,
-        "expected_mfu": {
-            "megatron_gpt": 0.28,
-            "bert_large": 0.32,
-        },
-        "nccl_allreduce_busbw_gbs": {
-            "intra_node_8gpu": 25,
-            "inter_node_ib_edr": 90,
-        }
-    },
-
-    # NVIDIA Ada Lovelace (Consumer/Workstation)
-    "RTX-4090": {
-        "architecture": "Ada Lovelace",
-        "compute_capability": "8.9",
-        "memory_gb": 24,
-        "memory_bandwidth_gbs": 1008,
-        "fp32_tflops": 82.6,
-        "fp16_tflops": 165.2,
-        "nvlink_version": None,
-        "nvlink_bandwidth_gbs": 0,
-        "pcie_gen": 4,
-        "pcie_bandwidth_gbs": 64,
-        "tdp_watts": 450,
-        "expected_mfu": {
-            "megatron_gpt": 0.35,
-            "bert_large": 0.38,
-        },
-        "nccl_allreduce_busbw_gbs": {
-            "intra_node_4gpu": 45,
-            "inter_node_10gbe": 9,
-        }
-    },
-}
+import functools
+import os
+import re
+from collections import namedtuple
 
-# InfiniBand/Network Baselines
-NETWORK_BASELINES = {
-    "IB-EDR": {
-        "name": "InfiniBand EDR",
-        "bandwidth_gbps": 100,
-        "bandwidth_gbs": 12.5,
-        "latency_us": 0.7,
-        "expected_ib_write_bw_gbs": 11.5,  # ~92% efficiency
-    },
-    "IB-HDR": {
-        "name": "InfiniBand HDR",
-        "bandwidth_gbps": 200,
-        "bandwidth_gbs": 25,
-        "latency_us": 0.6,
-        "expected_ib_write_bw_gbs": 23,  # ~92% efficiency
-    },
-    "IB-NDR": {
-        "name": "InfiniBand NDR",
-        "bandwidth_gbps": 400,
-        "bandwidth_gbs": 50,
-        "latency_us": 0.5,
-        "expected_ib_write_bw_gbs": 46,  # ~92% efficiency
-    },
-    "ROCE-V2-100G": {
-        "name": "RoCE v2 100GbE",
-        "bandwidth_gbps": 100,
-        "bandwidth_gbs": 12.5,
-        "latency_us": 2.0,
-        "expected_ib_write_bw_gbs": 11.0,  # ~88% efficiency
-    },
-    "ROCE-V2-200G": {
-        "name": "RoCE v2 200GbE",
-        "bandwidth_gbps": 200,
-        "bandwidth_gbs": 25,
-        "latency_us": 1.5,
-        "expected_ib_write_bw_gbs": 22,  # ~88% efficiency
-    },
-}
+import baseline_store
 
-# Megatron-LM Training Baselines
-MEGATRON_BASELINES = {
-    "GPT-1.2B": {
-        "parameters": 1.2e9,
-        "v100_single_gpu": {
-            "tflops": 39,
-            "mfu": 0.30,
-            "samples_per_sec": 12,
-        },
-        "a100_single_gpu": {
-            "tflops": 93.6,  # 156 * 0.6
-            "mfu": 0.60,
-            "samples_per_sec": 28,
-        },
-        "h100_single_gpu": {
-            "tflops": 178,
-            "mfu": 0.47,
-            "samples_per_sec": 45,
-        },
-    },
-    "GPT-8.3B": {
-        "parameters": 8.3e9,
-        "v100_512gpu": {
-            "petaflops": 15.1,
-            "scaling_efficiency": 0.76,
-        },
-        "a100_512gpu": {
-            "petaflops": 35,
-            "scaling_efficiency": 0.85,
-        },
-    },
-    "GPT-175B": {
-        "parameters": 175e9,
-        "a100_1024gpu": {
-            "training_time_days": 30,
-            "petaflops": 160,
-        },
-        "h100_1024gpu": {
-            "training_time_days": 10,
-            "petaflops": 480,
-        },
-    },
-    "GPT-1T": {
-        "parameters": 1e12,
-        "a100_3072gpu": {
-            "petaflops": 502,
-            "per_gpu_tflops": 163,
-            "mfu": 0.52,
-            "scaling_efficiency": 0.98,
-        },
-    },
+# Tables live in baselines_data.json and are loaded on first access
+_TABLES = {
+    "GPU_BASELINES": "gpu_baselines",
+    "NETWORK_BASELINES": "network_baselines",
+    "MEGATRON_BASELINES": "megatron_baselines",
 }
 
 
-def get_gpu_baseline(gpu_model: str) -> Dict[str, Any]:
-    """Get performance baseline for a GPU model"""
-    return GPU_BASELINES.get(gpu_model, {})
+def __getattr__(name):
+    if name in _TABLES:
+        return baseline_store.table(_TABLES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# GPU model resolution
+#
+# Device names come from NVML ("NVIDIA A100-SXM4-80GB", "Tesla V100-PCIE-16GB",
+# "NVIDIA H100 80GB HBM3") and from the shell scripts, which strip spaces
+# ("NVIDIAGeForceRTX4090"). Names and GPU_BASELINES keys are both reduced to
+# (family, form factor, memory GB) and matched on those.
+
+VENDOR_PREFIX = re.compile(r"^(?:NVIDIA|TESLA|GEFORCE|QUADRO)[\s_-]*")
+GPU_FAMILY = re.compile(r"RTX[\s_-]*\d{4}(?:[\s_-]*TI)?|[A-Z]\d{2,3}(?:[SGX](?![A-Z]))?")
+GPU_FORM = re.compile(r"SXM\d?|PCIE|NVL")
+GPU_MEMORY = re.compile(r"(\d+)\s*GB")
+
+# Form factor implied by other name parts ("H100 80GB HBM3" is the SXM5 part)
+FORM_HINTS = {"HBM3": "SXM"}
+
+
+class GPUModelMatch(namedtuple("GPUModelMatch", "name key candidates")):
+    """
+    Resolution of one device name against GPU_BASELINES: `key` is None
+    when the name is unknown or ambiguous, `candidates` holds every key
+    the name could refer to
+    """
+    __slots__ = ()
+
+    @property
+    def ambiguous(self) -> bool:
+        return len(self.candidates) > 1
+
+
+def gpu_model_tokens(name: str) -> tuple:
+    """(family, form factor, memory GB) of a device name; None for parts it lacks"""
+    text = name.upper().split(" MIG ")[0]
+    while True:
+        stripped = VENDOR_PREFIX.sub("", text)
+        if stripped == text:
+            break
+        text = stripped
+
+    family = GPU_FAMILY.search(text)
+    if family:
+        # Without spaces the memory size runs into the family ("H10080GB")
+        text = text[family.end():]
+    form = GPU_FORM.search(text)
+    memory = GPU_MEMORY.search(text)
+    form = form.group(0)[:3] if form else next((f for hint, f in FORM_HINTS.items() if hint in text), None)
+    return (
+        re.sub(r"[\s_-]", "", family.group(0)) if family else None,
+        form,
+        int(memory.group(1)) if memory else None,
+    )
+
+
+_model_index = None
+
+
+def rebuild_gpu_model_index():
+    """Re-index GPU_BASELINES keys by family; call after changing GPU_BASELINES"""
+    global _model_index
+    index = {}
+    for key in baseline_store.table("gpu_baselines"):
+        family, form, memory = gpu_model_tokens(key)
+        index.setdefault(family, []).append((key, form, memory))
+    _model_index = index
+    match_gpu_model.cache_clear()
+
+
+@functools.lru_cache(maxsize=4096)
+def match_gpu_model(name: str) -> GPUModelMatch:
+    """
+    Resolve a device name to a GPU_BASELINES key
 
+    Each known part of the name (form factor, memory) has to agree with
+    the key; parts missing from either side match anything. Exact keys
+    always win.
+    """
+    if name in baseline_store.table("gpu_baselines"):
+        return GPUModelMatch(name, name, (name,))
+    if _model_index is None:
+        rebuild_gpu_model_index()
+    family, form, memory = gpu_model_tokens(name)
+    candidates = tuple(
+        key for key, key_form, key_memory in _model_index.get(family, ())
+        if None in (form, key_form) or form == key_form
+        if None in (memory, key_memory) or memory == key_memory
+    )
+    return GPUModelMatch(name, candidates[0] if len(candidates) == 1 else None, candidates)
 
-def get_network_baseline(network_type: str) -> Dict[str, Any]:
+
+def resolve_gpu_model(name: str) -> str:
+    """GPU_BASELINES key for a device name, or None if unknown or ambiguous"""
+    return match_gpu_model(name).key
+
+
+def resolve_gpu_models(names) -> dict:
+    """
+    Resolve many device names (e.g. a fleet inventory) at once
+
+    Repeated names are resolved once. Entries with `ambiguous` set, or
+    with no candidates, are the ones that need a more specific name.
+    """
+    return {name: match_gpu_model(name) for name in dict.fromkeys(names)}
+
+
+# Site-learned baselines (site_baselines.py), loaded on first use
+SITE_STORE = os.environ.get("GPU_SITE_BASELINES", "/var/lib/gpu-validation/site_baselines.json")
+_site_store = None
+
+
+def site_store():
+    """Learned baseline store at SITE_STORE, or None if there is none"""
+    global _site_store
+    if _site_store is None:
+        _site_store = False
+        if not os.path.exists(SITE_STORE):
+            return None
+        try:
+            import site_baselines
+        except ImportError:
+            return None
+        _site_store = site_baselines.SiteBaselines(SITE_STORE)
+    return _site_store or None
+
+
+def with_learned(kind: str, name: str, spec: dict) -> dict:
+    """
+    Copy of a spec baseline with site-learned medians in place of spec values
+
+    Only series with at least site_baselines.MIN_SAMPLES runs replace spec
+    values. Full stats of every series are added under "site", keyed
+    "metric" or "metric/topology".
+    """
+    store = site_store()
+    if store is None:
+        return spec
+    import site_baselines
+    learned = store.series(kind, name)
+    if not learned:
+        return spec
+
+    import copy
+    baseline = copy.deepcopy(spec)
+    baseline["site"] = {}
+    for (_, _, metric, topology), stats in learned.items():
+        baseline["site"][f"{metric}/{topology}" if topology else metric] = stats
+        if stats["count"] < site_baselines.MIN_SAMPLES:
+            continue
+        if topology is None:
+            baseline[metric] = stats["p50"]
+        elif kind == "megatron":
+            # Megatron baselines are keyed by config first ("a100_8gpu": {"tflops": ...})
+            baseline.setdefault(topology, {})[metric] = stats["p50"]
+        elif isinstance(baseline.setdefault(metric, {}), dict):
+            baseline[metric][topology] = stats["p50"]
+    return baseline
+
+
+def get_gpu_baseline(gpu_model: str, learned: bool = True) -> dict:
+    """Get performance baseline for a GPU model or device name"""
+    key = resolve_gpu_model(gpu_model)
+    spec = baseline_store.table("gpu_baselines").get(key, {})
+    return with_learned("gpu", key, spec) if learned and key else spec
+
+
+def get_network_baseline(network_type: str, learned: bool = True) -> dict:
     """Get performance baseline for a network type"""
-    return NETWORK_BASELINES.get(network_type, {})
+    spec = baseline_store.table("network_baselines").get(network_type, {})
+    return with_learned("network", network_type, spec) if learned else spec
 
 
-def get_megatron_baseline(model_size: str) -> Dict[str, Any]:
+def get_megatron_baseline(model_size: str, learned: bool = True) -> dict:
     """Get training baseline for Megatron model"""
-    return MEGATRON_BASELINES.get(model_size, {})
+    spec = baseline_store.table("megatron_baselines").get(model_size, {})
+    return with_learned("megatron", model_size, spec) if learned else spec
 
 
 def list_available_gpus():
     """List all available GPU models in the database"""
-    return list(GPU_BASELINES.keys())
+    return list(baseline_store.table("gpu_baselines").keys())
 
 
 def list_available_networks():
     """List all available network types in the database"""
-    return list(NETWORK_BASELINES.keys())
+    return list(baseline_store.table("network_baselines").keys())
 
 
 def export_baselines_json(filename: str = "performance_baselines.json"):
     """Export all baselines to JSON file"""
     baselines = {
-        "gpu_baselines": GPU_BASELINES,
-        "network_baselines": NETWORK_BASELINES,
-        "megatron_baselines": MEGATRON_BASELINES,
+        "gpu_baselines": baseline_store.table("gpu_baselines"),
+        "network_baselines": baseline_store.table("network_baselines"),
+        "megatron_baselines": baseline_store.table("megatron_baselines"),
     }
+    import json
     with open(filename, 'w') as f:
         json.dump(baselines, f, indent=2)
     print(f"Baselines exported to {filename}")
@@ -408,8 +273,23 @@ if __name__ == "__main__":
         elif sys.argv[1] == "compare" and len(sys.argv) >= 4:
             compare_gpu_performance(sys.argv[2], sys.argv[3])
 
+        elif sys.argv[1] == "resolve":
+            # Names as arguments, or one per line on stdin (e.g. an inventory dump)
+            names = sys.argv[2:] or [line.strip() for line in sys.stdin if line.strip()]
+            unresolved = 0
+            for name, match in resolve_gpu_models(names).items():
+                if match.key:
+                    print(f"{name}: {match.key}")
+                elif match.ambiguous:
+                    unresolved += 1
+                    print(f"{name}: ambiguous ({', '.join(match.candidates)})")
+                else:
+                    unresolved += 1
+                    print(f"{name}: unknown")
+            sys.exit(1 if unresolved else 0)
+
         elif sys.argv[1] == "info" and len(sys.argv) >= 3:
-            gpu_model = sys.argv[2]
+            gpu_model = resolve_gpu_model(sys.argv[2]) or sys.argv[2]
             baseline = get_gpu_baseline(gpu_model)
             if baseline:
                 print(f"\n{gpu_model} Performance Baseline:")
@@ -424,10 +304,11 @@ if __name__ == "__main__":
             print("  python performance_baselines.py export [filename]")
             print("  python performance_baselines.py compare <gpu1> <gpu2>")
             print("  python performance_baselines.py info <gpu_model>")
+            print("  python performance_baselines.py resolve [device_name ...]")
     else:
         print("Available GPU Models:")
         for gpu in list_available_gpus():
-            baseline = GPU_BASELINES[gpu]
+            baseline = baseline_store.table("gpu_baselines")[gpu]
             print(f"\n{gpu}:")
             print(f"  Architecture: {baseline['architecture']}")
             print(f"  Memory: {baseline['memory_gb']}GB")
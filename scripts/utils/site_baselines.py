@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Site-Learned Performance Baselines
+Builds baselines from this site's own benchmark history (nccl-tests,
+bandwidthTest / p2pBandwidthLatencyTest, ib_write_bw and Megatron runs)
+instead of spec sheets. Results are kept per GPU model (or network type,
+or Megatron model) and topology, with percentiles and sample counts, and
+performance_baselines.get_*_baseline() prefers them over spec values.
+
+Ingestion is incremental: every file is remembered with its size and
+mtime, so re-running over a results directory only parses new or changed
+files. Series are stored sorted, which keeps percentiles a lookup. The
+benchmark scripts save a summary JSON next to the raw tool logs of the
+same run; the logs of a run with a summary are skipped so it counts once.
+"""
+
+import argparse
+import bisect
+import fcntl
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from performance_baselines import NETWORK_BASELINES, SITE_STORE, gpu_model_tokens, resolve_gpu_model
+
+STORE_VERSION = 1
+DEFAULT_STORE = SITE_STORE
+
+# A learned value only replaces the spec value once it has this many runs
+MIN_SAMPLES = 3
+PERCENTILES = (10, 50, 90)
+
+RESULT_SUFFIXES = (".json", ".txt", ".log", ".out")
+
+# Run timestamp the benchmark scripts append to every file of a run
+RUN_TIMESTAMP = re.compile(r"_(\d{8}_\d{6})\.\w+$")
+
+NCCL_OPS = {"all_reduce": "allreduce", "all_gather": "allgather", "reduce_scatter": "reduce_scatter",
+            "broadcast": "broadcast", "reduce": "reduce", "alltoall": "alltoall"}
+
+
+class Sample(NamedTuple):
+    kind: str                # "gpu", "network" or "megatron"
+    name: str                # GPU_BASELINES / NETWORK_BASELINES / MEGATRON_BASELINES key
+    metric: str
+    topology: Optional[str]  # e.g. "intra_node_8gpu", "a100_8gpu"; None if not topology specific
+    value: float
+
+
+def series_key(kind: str, name: str, metric: str, topology: Optional[str]) -> str:
+    return f"{kind}/{name}/{metric}/{topology or ''}"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linearly interpolated percentile of a sorted list"""
+    position = (len(values) - 1) * pct / 100.0
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def series_stats(values: List[float]) -> Dict[str, Any]:
+    stats = {"count": len(values), "min": values[0], "max": values[-1]}
+    for pct in PERCENTILES:
+        stats[f"p{pct}"] = round(percentile(values, pct), 3)
+    return stats
+
+
+def _gpu_name(raw: str) -> str:
+    return resolve_gpu_model(raw) or raw
+
+
+def _positive(value) -> Optional[float]:
+    # The benchmark scripts write 0 when they could not parse a result
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def parse_nccl_summary(doc: Dict[str, Any]) -> List[Sample]:
+    """nccl_summary_*.json written by nccl_benchmark.sh"""
+    name = _gpu_name(doc.get("gpu_model", ""))
+    topology = f"intra_node_{doc.get('gpu_count')}gpu"
+    samples = []
+    for metric, value in doc.get("nccl_tests", {}).items():
+        value = _positive(value)
+        if value is not None:
+            samples.append(Sample("gpu", name, f"nccl_{metric}", topology, value))
+    return samples
+
+
+def parse_bandwidth_results(doc: Dict[str, Any]) -> List[Sample]:
+    """bandwidth_results_*.json written by bandwidth_test.sh"""
+    name = _gpu_name(doc.get("gpu_model", ""))
+    tests = doc.get("tests", {})
+    samples = []
+    pcie = tests.get("pcie", {})
+    # nvbandwidth and bandwidthTest measure the same copies; prefer nvbandwidth
+    tool = pcie.get("nvbandwidth") or pcie.get("bandwidthTest") or {}
+    for field, metric in (("host_to_device_gbs", "pcie_h2d_gbs"), ("device_to_host_gbs", "pcie_d2h_gbs")):
+        value = _positive(tool.get(field))
+        if value is not None:
+            samples.append(Sample("gpu", name, metric, None, value))
+    nvlink = tests.get("nvlink", {})
+    topology = f"intra_node_{doc.get('gpu_count')}gpu"
+    for field in ("p2p_unidirectional_gbs", "p2p_bidirectional_gbs", "device_to_device_gbs"):
+        value = _positive(nvlink.get(field))
+        if value is not None:
+            samples.append(Sample("gpu", name, f"nvlink_{field}", topology, value))
+    return samples
+
+
+def megatron_config(gpu_model: str, gpu_count: int) -> str:
+    """MEGATRON_BASELINES config key, e.g. "a100_single_gpu" or "h100_64gpu" """
+    family = (gpu_model_tokens(gpu_model)[0] or gpu_model).lower()
+    return f"{family}_single_gpu" if gpu_count == 1 else f"{family}_{gpu_count}gpu"
+
+
+def parse_megatron_summary(doc: Dict[str, Any]) -> List[Sample]:
+    """benchmark_summary_*.json written by megatron_benchmark.sh"""
+    model_size = doc.get("model_config", {}).get("model_size")
+    if not model_size:
+        return []
+    config = megatron_config(doc.get("gpu_model", ""), doc.get("gpu_count") or 1)
+    results = doc.get("results", {})
+    samples = []
+    tflops = _positive(results.get("tflops"))
+    if tflops is not None:
+        samples.append(Sample("megatron", model_size, "tflops", config, tflops))
+    throughput = re.match(r"\s*([0-9.]+)", str(results.get("throughput", "")))
+    if throughput and _positive(throughput.group(1)) is not None:
+        samples.append(Sample("megatron", model_size, "samples_per_sec", config, float(throughput.group(1))))
+    return samples
+
+
+def parse_nccl_log(text: str) -> List[Sample]:
+    """Raw nccl-tests output (all_reduce_perf etc.): peak bus bandwidth"""
+    op = re.search(r"Collective test starting:\s*(\w+?)_perf", text)
+    devices = re.findall(r"^#\s+Rank\s+\d+.*? on\s+(\S+)\s+device\s+\d+\s+\[[^\]]*\]\s+(.+?)\s*$", text, re.M)
+    if not op or not devices:
+        return []
+    busbw = []
+    for line in text.splitlines():
+        fields = line.split()
+        # size count type redop root | time algbw busbw #wrong | time algbw busbw #wrong
+        if len(fields) >= 12 and fields[0].isdigit():
+            value = _positive(fields[11] if fields[11] != "N/A" else fields[7])
+            if value is not None:
+                busbw.append(value)
+    if not busbw:
+        return []
+    hosts = {host for host, _ in devices}
+    topology = (f"intra_node_{len(devices)}gpu" if len(hosts) == 1
+                else f"inter_node_{len(hosts)}x{len(devices) // len(hosts)}gpu")
+    metric = f"nccl_{NCCL_OPS.get(op.group(1), op.group(1))}_busbw_gbs"
+    return [Sample("gpu", _gpu_name(devices[0][1]), metric, topology, max(busbw))]
+
+
+def parse_bandwidth_test_log(text: str) -> List[Sample]:
+    """Raw CUDA samples bandwidthTest output"""
+    device = re.search(r"^\s*Device\s+\d+:\s*(.+?)\s*$", text, re.M)
+    if not device:
+        return []
+    samples = []
+    for section, metric in (("Host to Device", "pcie_h2d_gbs"), ("Device to Host", "pcie_d2h_gbs")):
+        match = re.search(section + r" Bandwidth.*?Bandwidth\((GB|MB)/s\)\s*\n((?:\s*\d+\s+[0-9.]+\s*\n?)+)",
+                          text, re.S)
+        if not match:
+            continue
+        values = [float(line.split()[1]) for line in match.group(2).strip().splitlines()]
+        value = max(values) / (1000.0 if match.group(1) == "MB" else 1.0)
+        samples.append(Sample("gpu", _gpu_name(device.group(1)), metric, None, round(value, 3)))
+    return samples
+
+
+def _matrix_mean(text: str, title: str) -> Optional[float]:
+    match = re.search(re.escape(title) + r".*?\n\s*D\\D[^\n]*\n((?:\s*\d+(?:\s+[0-9.]+)+\s*\n?)+)", text, re.S)
+    if not match:
+        return None
+    values = []
+    for row in match.group(1).strip().splitlines():
+        fields = row.split()
+        src = int(fields[0])
+        values += [float(v) for dst, v in enumerate(fields[1:]) if dst != src]
+    return sum(values) / len(values) if values else None
+
+
+def parse_p2p_log(text: str) -> List[Sample]:
+    """Raw p2pBandwidthLatencyTest output: mean GPU-to-GPU bandwidth with P2P enabled"""
+    devices = re.findall(r"^Device:\s*\d+,\s*(.+?),\s*pciBusID", text, re.M)
+    if not devices:
+        return []
+    name = _gpu_name(devices[0])
+    topology = f"intra_node_{len(devices)}gpu"
+    samples = []
+    for title, metric in (("Unidirectional P2P=Enabled Bandwidth", "nvlink_p2p_unidirectional_gbs"),
+                          ("Bidirectional P2P=Enabled Bandwidth", "nvlink_p2p_bidirectional_gbs")):
+        value = _matrix_mean(text, title)
+        if value:
+            samples.append(Sample("gpu", name, metric, topology, round(value, 2)))
+    return samples
+
+
+def parse_ib_write_bw(text: str, network: Optional[str]) -> List[Sample]:
+    """perftest ib_write_bw client output: average bandwidth of the largest message size"""
+    if network is None:
+        return []
+    unit = re.search(r"BW average\[(MB|Gb)/sec\]", text)
+    if not unit:
+        return []
+    rows = [line.split() for line in text.splitlines()]
+    rows = [r for r in rows if len(r) >= 4 and r[0].isdigit() and r[1].isdigit()]
+    if not rows:
+        return []
+    average = float(rows[-1][3])
+    # perftest's MB is 2^20 bytes
+    value = average / 8.0 if unit.group(1) == "Gb" else average * 1048576 / 1e9
+    return [Sample("network", network, "expected_ib_write_bw_gbs", None, round(value, 3))]
+
+
+def network_from_path(path: str) -> Optional[str]:
+    """NETWORK_BASELINES key named in a file path, e.g. ib_write_bw_IB-HDR_node07.txt"""
+    upper = path.upper()
+    return next((key for key in NETWORK_BASELINES if key in upper), None)
+
+
+def parse_result_file(path: str, network: Optional[str] = None) -> List[Sample]:
+    """Samples from one results file of any supported kind; [] if not recognized"""
+    with open(path, errors="replace") as f:
+        text = f.read()
+    if text.lstrip().startswith("{"):
+        try:
+            doc = json.loads(text)
+        except ValueError:
+            return []
+        if "nccl_tests" in doc:
+            return parse_nccl_summary(doc)
+        if "model_config" in doc:
+            return parse_megatron_summary(doc)
+        if "tests" in doc:
+            return parse_bandwidth_results(doc)
+        return []
+    if "Collective test starting" in text:
+        return parse_nccl_log(text)
+    if "P2P Connectivity Matrix" in text or "P2P=Enabled" in text:
+        return parse_p2p_log(text)
+    if "Host to Device Bandwidth" in text:
+        return parse_bandwidth_test_log(text)
+    if "RDMA_Write BW Test" in text:
+        return parse_ib_write_bw(text, network or network_from_path(path))
+    return []
+
+
+def iter_result_files(paths: Iterable[str]) -> Iterable[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith(RESULT_SUFFIXES):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def covered_by_summary(path: str, listings: Dict[str, List[str]]) -> bool:
+    """
+    Whether a raw log belongs to a run whose summary JSON (same directory
+    and run timestamp, e.g. allreduce_8gpu_<ts>.txt and nccl_summary_<ts>.json)
+    holds the same results; `listings` caches directory contents
+    """
+    match = RUN_TIMESTAMP.search(os.path.basename(path))
+    if path.endswith(".json") or not match:
+        return False
+    directory = os.path.dirname(path)
+    if directory not in listings:
+        try:
+            listings[directory] = os.listdir(directory)
+        except OSError:
+            listings[directory] = []
+    suffix = f"_{match.group(1)}.json"
+    return any(name.endswith(suffix) for name in listings[directory])
+
+
+class SiteBaselines:
+    """
+    JSON store of benchmark samples
+
+    "files" maps every ingested path to its (size, mtime) stamp and the
+    samples it contributed, so a changed file replaces its old samples;
+    "series" holds each series' values sorted.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE):
+        self.path = path
+        self.state = self.load()
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"version": STORE_VERSION, "files": {}, "series": {}}
+        if state.get("version") != STORE_VERSION:
+            return {"version": STORE_VERSION, "files": {}, "series": {}}
+        return state
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _add(self, key: str, value: float):
+        bisect.insort(self.state["series"].setdefault(key, []), value)
+
+    def _remove(self, key: str, value: float):
+        values = self.state["series"].get(key, [])
+        position = bisect.bisect_left(values, value)
+        if position < len(values) and values[position] == value:
+            values.pop(position)
+        if not values:
+            self.state["series"].pop(key, None)
+
+    def ingest(self, paths: Iterable[str], network: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Add the samples of new or changed result files; returns
+        (files parsed, samples added). Unchanged files are not opened, and
+        raw logs covered by their run's summary JSON are not counted. A
+        file that cannot be parsed is reported and skipped until it changes.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        parsed = added = 0
+        with open(f"{self.path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.state = self.load()
+            files = self.state["files"]
+            own = {os.path.abspath(self.path), os.path.abspath(f"{self.path}.tmp")}
+            listings = {}
+            for path in iter_result_files(paths):
+                path = os.path.abspath(path)
+                if path in own:
+                    continue
+                if covered_by_summary(path, listings):
+                    for key, value in files.pop(path, {}).get("samples", []):
+                        self._remove(key, value)
+                    continue
+                try:
+                    stat = os.stat(path)
+                    stamp = [stat.st_size, stat.st_mtime_ns]
+                    if files.get(path, {}).get("stamp") == stamp:
+                        continue
+                    samples = parse_result_file(path, network)
+                except OSError as e:
+                    print(f"Error reading {path}: {e}", file=sys.stderr)
+                    continue
+                except Exception as e:
+                    print(f"Warning: skipping malformed result {path}: {e!r}", file=sys.stderr)
+                    samples = []
+                for key, value in files.get(path, {}).get("samples", []):
+                    self._remove(key, value)
+                entries = [[series_key(s.kind, s.name, s.metric, s.topology), s.value] for s in samples]
+                for key, value in entries:
+                    self._add(key, value)
+                files[path] = {"stamp": stamp, "samples": entries}
+                parsed += 1
+                added += len(entries)
+            self._save()
+        return parsed, added
+
+    def series(self, kind: Optional[str] = None, name: Optional[str] = None,
+               min_samples: int = 1) -> Dict[Tuple[str, str, str, Optional[str]], Dict[str, Any]]:
+        """Stats per (kind, name, metric, topology), optionally for one kind and name"""
+        result = {}
+        for key, values in self.state["series"].items():
+            key_kind, key_name, metric, topology = key.split("/", 3)
+            if kind not in (None, key_kind) or name not in (None, key_name) or len(values) < min_samples:
+                continue
+            result[(key_kind, key_name, metric, topology or None)] = series_stats(values)
+        return result
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="Site-Learned Baselines - learn expected performance from past benchmark results"
+    )
+    parser.add_argument(
+        "-s", "--store",
+        default=DEFAULT_STORE,
+        help=f"Baseline store (default: $GPU_SITE_BASELINES or {DEFAULT_STORE})"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    ingest = subparsers.add_parser("ingest", help="Add new result files or directories")
+    ingest.add_argument("paths", nargs="+")
+    ingest.add_argument(
+        "--network",
+        choices=sorted(NETWORK_BASELINES),
+        help="Network type of ib_write_bw results whose path does not name one"
+    )
+
+    show = subparsers.add_parser("show", help="Print learned percentiles")
+    show.add_argument("kind", nargs="?", choices=["gpu", "network", "megatron"])
+    show.add_argument("name", nargs="?", help="GPU model, network type or Megatron model")
+
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        try:
+            parsed, added = SiteBaselines(args.store).ingest(args.paths, args.network)
+        except OSError as e:
+            print(f"Error updating {args.store}: {e}", file=sys.stderr)
+            sys.exit(2)
+        print(f"Ingested {parsed} new or changed files, {added} samples")
+    elif args.command == "show":
+        name = args.name
+        if args.kind == "gpu" and name:
+            name = resolve_gpu_model(name) or name
+        stats = SiteBaselines(args.store).series(args.kind, name)
+        if not stats:
+            print("No learned baselines")
+        for (kind, key, metric, topology), s in sorted(stats.items(), key=lambda i: tuple(map(str, i[0]))):
+            scope = f"{key} {metric}" + (f" [{topology}]" if topology else "")
+            flag = "" if s["count"] >= MIN_SAMPLES else "  (too few runs to override spec)"
+            print(f"{kind:8s} {scope:60s} n={s['count']:<5d} p10={s['p10']:<9g} p50={s['p50']:<9g} "
+                  f"p90={s['p90']:<9g}{flag}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
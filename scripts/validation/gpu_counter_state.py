@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+GPU Error Counter State
+Persists ECC, retired page, row remapping, PCIe replay and NVLink error
+counters per GPU UUID between runs, so health checks can judge new errors
+and error rates instead of lifetime totals. The time of each counter's
+last increase is kept too, so a new error keeps failing for a hold window
+rather than only on the one probe that saw it.
+"""
+
+import fcntl
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+STATE_VERSION = 1
+
+# Snapshot fields tracked between runs
+TRACKED_COUNTERS = (
+    "ecc_corrected",
+    "ecc_uncorrected",
+    "retired_pages_sbe",
+    "retired_pages_dbe",
+    "remapped_rows_correctable",
+    "remapped_rows_uncorrectable",
+    "pcie_replays",
+    "nvlink_replay_errors",
+    "nvlink_recovery_errors",
+    "nvlink_crc_errors",
+)
+
+# Rate thresholds in events per hour
+COUNTER_THRESHOLDS = {
+    "ecc_corrected_warn_per_hour": 100,
+    "pcie_replays_warn_per_hour": 480,   # DCGM's 8 replays per minute
+    "retired_pages_fail_total": 60,      # RMA is due at 64 retired pages
+    "nvlink_crc_warn_per_hour": 100,
+    "new_error_hold_hours": 24,          # a new uncorrectable error is reported this long
+}
+
+
+class CounterState:
+    """
+    JSON state file keyed by GPU UUID
+
+    Updates hold an exclusive flock on "<path>.lock" so concurrent probes
+    serialize, and the file is replaced atomically so a crash leaves the
+    previous state intact.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"version": STATE_VERSION, "gpus": {}}
+        if state.get("version") != STATE_VERSION:
+            return {"version": STATE_VERSION, "gpus": {}}
+        return state
+
+    def _save(self, state: Dict[str, Any]):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def update(self, snapshots, now: Optional[float] = None,
+               pcie_epoch: Optional[str] = None) -> Dict[str, Dict[str, Dict]]:
+        """
+        Record the counters of `snapshots` and return, per UUID and counter,
+        the current value, delta and hourly rate since the previous record,
+        and the seconds since the counter last increased (increased_ago)
+
+        "pcie_busy_link" is the PCIe link last seen while the GPU was busy,
+        with when it was seen and the driver epoch (`pcie_epoch`, boot and
+        driver identity) it was seen in.
+
+        delta and rate are None on the first sighting of a GPU. A counter
+        that went backwards (volatile counters reset on driver reload) is
+        treated as restarted from zero. Counters a selective probe did not
+        read keep their stored value and read time, so rates are always
+        taken between two actual reads of the counter.
+        """
+        now = time.time() if now is None else now
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(f"{self.path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            state = self.load()
+            results = {}
+            for snapshot in snapshots:
+                if snapshot.status != "ok":
+                    continue
+                previous = state["gpus"].get(snapshot.uuid)
+                stored = dict(previous["counters"]) if previous else {}
+                # Read time per counter; older state files only have the GPU's timestamp
+                read_at = {name: previous["timestamp"] for name in stored} if previous else {}
+                read_at.update(previous.get("read_at", {}) if previous else {})
+                increased = dict(previous.get("increased", {})) if previous else {}
+                counters = {}
+                for name in TRACKED_COUNTERS:
+                    value = getattr(snapshot, name)
+                    if value is None:
+                        continue
+                    interval = now - read_at[name] if name in read_at else None
+                    counters[name] = _delta(value, stored.get(name), interval)
+                    stored[name] = value
+                    read_at[name] = now
+                    if counters[name]["delta"]:
+                        increased[name] = now
+                    counters[name]["increased_ago"] = now - increased[name] if name in increased else None
+                counters["remap_pending"] = snapshot.remap_pending
+                counters["remap_failure"] = snapshot.remap_failure
+
+                # Last PCIe link seen while the GPU was busy (idle links downclock)
+                busy_link = previous.get("pcie_busy_link") if previous else None
+                if snapshot.util_gpu and snapshot.pcie_gen is not None:
+                    busy_link = {"gen": snapshot.pcie_gen, "width": snapshot.pcie_width,
+                                 "seen": now, "epoch": pcie_epoch}
+                counters["pcie_busy_link"] = busy_link
+
+                results[snapshot.uuid] = counters
+                state["gpus"][snapshot.uuid] = {
+                    "timestamp": now,
+                    "index": snapshot.index,
+                    "counters": stored,
+                    "read_at": read_at,
+                    "pcie_busy_link": busy_link,
+                    "increased": increased,
+                }
+            self._save(state)
+        return results
+
+
+def _delta(value: int, previous: Optional[int], interval: Optional[float]) -> Dict[str, Any]:
+    if previous is None:
+        return {"value": value, "delta": None, "rate_per_hour": None}
+    delta = value - previous if value >= previous else value
+    rate = round(delta / (interval / 3600.0), 2) if interval and interval > 0 else None
+    return {"value": value, "delta": delta, "rate_per_hour": rate}
+
+
+def _recent(counter: Optional[Dict[str, Any]], hold_hours: float) -> bool:
+    """Whether the counter increased in this run or within the hold window"""
+    if counter is None:
+        return False
+    if counter["delta"]:
+        return True
+    ago = counter.get("increased_ago")
+    return ago is not None and ago <= hold_hours * 3600
+
+
+def evaluate_counters(counters: Dict[str, Any], thresholds: Dict[str, float] = COUNTER_THRESHOLDS) -> List[Dict]:
+    """
+    Health checks for one GPU from the output of CounterState.update
+
+    New uncorrectable errors count as new until new_error_hold_hours after
+    the last increase, so high-frequency probes do not clear a failure on
+    the next run.
+    """
+    checks = []
+    hold = thresholds.get("new_error_hold_hours", COUNTER_THRESHOLDS["new_error_hold_hours"])
+
+    # Uncorrected ECC: new errors fail, errors that predate tracking only warn
+    unc = counters.get("ecc_uncorrected")
+    if unc is None:
+        checks.append({"check": "ecc_errors", "status": "n/a"})
+    elif unc["delta"] is None:
+        checks.append({"check": "ecc_errors", "status": "warn" if unc["value"] else "pass", "value": unc})
+    else:
+        checks.append({"check": "ecc_errors", "status": "fail" if _recent(unc, hold) else "pass", "value": unc})
+
+    corr = counters.get("ecc_corrected")
+    if corr is not None and corr["rate_per_hour"] is not None:
+        status = "warn" if corr["rate_per_hour"] > thresholds["ecc_corrected_warn_per_hour"] else "pass"
+        checks.append({"check": "ecc_corrected_rate", "status": status, "value": corr})
+
+    sbe = counters.get("retired_pages_sbe")
+    dbe = counters.get("retired_pages_dbe")
+    if sbe is not None and dbe is not None:
+        if _recent(dbe, hold) or sbe["value"] + dbe["value"] >= thresholds["retired_pages_fail_total"]:
+            status = "fail"
+        elif _recent(sbe, hold):
+            status = "warn"
+        else:
+            status = "pass"
+        checks.append({"check": "retired_pages", "status": status,
+                       "value": {"single_bit": sbe, "double_bit": dbe}})
+
+    unc_rows = counters.get("remapped_rows_uncorrectable")
+    if unc_rows is not None:
+        if counters.get("remap_failure"):
+            status = "fail"
+        elif counters.get("remap_pending") or _recent(unc_rows, hold):
+            status = "warn"
+        else:
+            status = "pass"
+        checks.append({"check": "row_remapping", "status": status,
+                       "value": {"uncorrectable": unc_rows, "pending": counters.get("remap_pending")}})
+
+    replays = counters.get("pcie_replays")
+    if replays is not None and replays["rate_per_hour"] is not None:
+        status = "warn" if replays["rate_per_hour"] > thresholds["pcie_replays_warn_per_hour"] else "pass"
+        checks.append({"check": "pcie_replay_rate", "status": status, "value": replays})
+
+    # Any new NVLink recovery is a link fault; CRC errors only matter as a rate
+    crc = counters.get("nvlink_crc_errors")
+    recovery = counters.get("nvlink_recovery_errors")
+    if crc is not None and crc["rate_per_hour"] is not None:
+        if _recent(recovery, hold):
+            status = "fail"
+        elif crc["rate_per_hour"] > thresholds["nvlink_crc_warn_per_hour"]:
+            status = "warn"
+        else:
+            status = "pass"
+        checks.append({"check": "nvlink_error_rate", "status": status,
+                       "value": {"crc": crc, "recovery": recovery,
+                                 "replay": counters.get("nvlink_replay_errors")}})
+
+    return checks
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+GPU XID and ECC Event Watcher
+Blocks on NVML event sets and turns XID critical errors and ECC events
+into timestamped records for the health report, so a dying GPU is
+reported within a second instead of at the next scheduled run.
+"""
+
+import ctypes
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import pynvml
+
+# NVML event type bits (nvmlEventType*)
+EVENT_SINGLE_BIT_ECC = 0x0001
+EVENT_DOUBLE_BIT_ECC = 0x0002
+EVENT_XID_CRITICAL = 0x0008
+
+WATCHED_EVENTS = EVENT_SINGLE_BIT_ECC | EVENT_DOUBLE_BIT_ECC | EVENT_XID_CRITICAL
+
+NVML_ERROR_TIMEOUT = 10
+
+# Seconds an event counts towards the health verdict; older events stay in
+# the report's event list but no longer warn or fail
+EVENT_WINDOW = 3600
+
+# Common XIDs (NVIDIA XID catalog); severity "warn" marks XIDs that are
+# usually caused by the application rather than the GPU
+XID_DESCRIPTIONS = {
+    13: ("Graphics engine exception", "warn"),
+    31: ("GPU memory page fault", "warn"),
+    43: ("GPU stopped processing", "warn"),
+    45: ("Preemptive cleanup due to previous errors", "warn"),
+    48: ("Double bit ECC error", "fail"),
+    61: ("Internal micro-controller breakpoint/warning", "fail"),
+    62: ("Internal micro-controller halt", "fail"),
+    63: ("ECC page retirement or row remapping recorded", "warn"),
+    64: ("ECC page retirement or row remapping failure", "fail"),
+    74: ("NVLink error", "fail"),
+    79: ("GPU has fallen off the bus", "fail"),
+    92: ("High single-bit ECC error rate", "fail"),
+    94: ("Contained ECC error", "warn"),
+    95: ("Uncontained ECC error", "fail"),
+    119: ("GSP RPC timeout", "fail"),
+    120: ("GSP error", "fail"),
+}
+
+
+class GPUEvent(NamedTuple):
+    """One NVML event, timestamped when the watcher received it"""
+    timestamp: float
+    gpu_index: int           # -1 when the device could not be resolved
+    event_type: str          # "xid", "ecc_single_bit" or "ecc_double_bit"
+    xid: Optional[int]
+    severity: str            # "info", "warn" or "fail"
+    description: str
+
+
+def classify_event(gpu_index: int, event_type: int, event_data: int,
+                   timestamp: Optional[float] = None) -> GPUEvent:
+    """Turn raw NVML event fields into a GPUEvent"""
+    now = time.time() if timestamp is None else timestamp
+    if event_type & EVENT_XID_CRITICAL:
+        description, severity = XID_DESCRIPTIONS.get(event_data, ("Unlisted XID", "fail"))
+        return GPUEvent(now, gpu_index, "xid", event_data, severity, f"XID {event_data}: {description}")
+    if event_type & EVENT_DOUBLE_BIT_ECC:
+        return GPUEvent(now, gpu_index, "ecc_double_bit", None, "fail", "Double bit (uncorrected) ECC error")
+    return GPUEvent(now, gpu_index, "ecc_single_bit", None, "info", "Single bit (corrected) ECC error")
+
+
+def _handle_key(handle):
+    """Hashable identity of a device handle (the nvmlDevice_t pointer value)"""
+    try:
+        return ctypes.cast(handle, ctypes.c_void_p).value
+    except (TypeError, ctypes.ArgumentError):
+        return id(handle)
+
+
+class NVMLEventSource:
+    """NVML event set registered for XID and ECC events on every GPU"""
+
+    def __init__(self, checker):
+        self.event_set = pynvml.nvmlEventSetCreate()
+        self.registered = {}
+        # Event data carries the handle we registered, so a GPU that no
+        # longer answers nvmlDeviceGetIndex (XID 79) is still attributed
+        self._indexes = {}
+        for index in range(checker.device_count):
+            handle = checker.get_handle(index)
+            self._indexes[_handle_key(handle)] = index
+            try:
+                supported = pynvml.nvmlDeviceGetSupportedEventTypes(handle)
+                wanted = supported & WATCHED_EVENTS
+                if wanted:
+                    pynvml.nvmlDeviceRegisterEvents(handle, wanted, self.event_set)
+                    self.registered[index] = wanted
+            except pynvml.NVMLError:
+                continue
+
+    def wait(self, timeout_ms: int) -> Optional[GPUEvent]:
+        """Block up to timeout_ms for the next event"""
+        try:
+            data = pynvml.nvmlEventSetWait_v2(self.event_set, timeout_ms)
+        except pynvml.NVMLError as e:
+            if getattr(e, "value", None) == NVML_ERROR_TIMEOUT:
+                return None
+            raise
+        index = self._indexes.get(_handle_key(data.device))
+        if index is None:
+            try:
+                index = pynvml.nvmlDeviceGetIndex(data.device)
+            except pynvml.NVMLError:
+                index = -1
+        return classify_event(index, data.eventType, data.eventData)
+
+    def close(self):
+        try:
+            pynvml.nvmlEventSetFree(self.event_set)
+        except pynvml.NVMLError:
+            pass
+
+
+class EventWatcher:
+    """
+    Background thread blocking on an event source and keeping recent events
+
+    The source only needs a wait(timeout_ms) method returning a GPUEvent or
+    None; the timeout just bounds how long stop() takes to be noticed.
+    """
+
+    def __init__(self, source, max_events: int = 1024,
+                 on_event: Optional[Callable[[GPUEvent], None]] = None):
+        self.source = source
+        self.on_event = on_event
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                event = self.source.wait(1000)
+            except pynvml.NVMLError as e:
+                print(f"Error waiting for NVML events: {e}", file=sys.stderr)
+                self._stop.wait(1.0)
+                continue
+            if event is None:
+                continue
+            with self._lock:
+                self._events.append(event)
+            if self.on_event is not None:
+                try:
+                    self.on_event(event)
+                except Exception as e:
+                    print(f"Error handling GPU event: {e}", file=sys.stderr)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="nvml-events", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+        if hasattr(self.source, "close"):
+            self.source.close()
+
+    def events(self, since: Optional[float] = None) -> List[GPUEvent]:
+        """Recorded events, optionally only those after `since` (epoch s)"""
+        with self._lock:
+            events = list(self._events)
+        if since is not None:
+            events = [e for e in events if e.timestamp > since]
+        return events
+
+    def events_by_gpu(self) -> Dict[int, List[GPUEvent]]:
+        grouped = {}
+        for event in self.events():
+            grouped.setdefault(event.gpu_index, []).append(event)
+        return grouped
+
+
+def evaluate_events(events: List[GPUEvent], window: Optional[float] = EVENT_WINDOW,
+                    now: Optional[float] = None) -> List[Dict]:
+    """
+    Health checks for one GPU's recorded XID and ECC events
+
+    Only events from the last `window` seconds count (None: all), so a
+    resident exporter or agent recovers once a GPU has stayed clean.
+    """
+    if window:
+        cutoff = (time.time() if now is None else now) - window
+        events = [e for e in events if e.timestamp > cutoff]
+    checks = []
+
+    xids = [e for e in events if e.event_type == "xid"]
+    if not xids:
+        checks.append({"check": "xid_errors", "status": "pass", "value": []})
+    else:
+        status = "fail" if any(e.severity == "fail" for e in xids) else "warn"
+        checks.append({"check": "xid_errors", "status": status, "value": sorted({e.xid for e in xids})})
+
+    double_bit = sum(1 for e in events if e.event_type == "ecc_double_bit")
+    checks.append({
+        "check": "ecc_events",
+        "status": "fail" if double_bit else "pass",
+        "value": double_bit
+    })
+
+    return checks
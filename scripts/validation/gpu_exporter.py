@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+GPU Prometheus Exporter
+Serves GPUHealthChecker metrics in the Prometheus text exposition format.
+Snapshots are refreshed on a fixed cadence by one background thread, and
+scrapes only ever read the last rendered page, so NVML cost is independent
+of how many scrapers there are or how often they poll.
+"""
+
+import argparse
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import gpu_health
+import gpu_snapshot
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (metric name, type, help, function of a DeviceSnapshot)
+GPU_METRICS = [
+    ("gpu_temperature_celsius", "gauge", "GPU core temperature",
+     lambda s: s.temperature),
+    ("gpu_utilization_percent", "gauge", "GPU SM utilization",
+     lambda s: s.util_gpu),
+    ("gpu_memory_utilization_percent", "gauge", "GPU memory controller utilization",
+     lambda s: s.util_memory),
+    ("gpu_memory_total_bytes", "gauge", "Total framebuffer memory",
+     lambda s: s.memory_total),
+    ("gpu_memory_used_bytes", "gauge", "Used framebuffer memory",
+     lambda s: s.memory_used),
+    ("gpu_power_draw_watts", "gauge", "Current power draw",
+     lambda s: s.power_draw_mw / 1000.0 if s.power_draw_mw is not None else None),
+    ("gpu_power_limit_watts", "gauge", "Power management limit",
+     lambda s: s.power_limit_mw / 1000.0 if s.power_limit_mw is not None else None),
+    ("gpu_pcie_link_gen", "gauge", "Current PCIe link generation",
+     lambda s: s.pcie_gen),
+    ("gpu_pcie_link_width", "gauge", "Current PCIe link width",
+     lambda s: s.pcie_width),
+    ("gpu_pcie_link_max_gen", "gauge", "Maximum PCIe link generation",
+     lambda s: s.pcie_max_gen),
+    ("gpu_pcie_link_max_width", "gauge", "Maximum PCIe link width",
+     lambda s: s.pcie_max_width),
+    ("gpu_pcie_tx_bytes_per_second", "gauge", "Sampled PCIe TX throughput",
+     lambda s: s.pcie_tx_kbs * 1000 if s.pcie_tx_kbs is not None else None),
+    ("gpu_pcie_rx_bytes_per_second", "gauge", "Sampled PCIe RX throughput",
+     lambda s: s.pcie_rx_kbs * 1000 if s.pcie_rx_kbs is not None else None),
+    ("gpu_nvlink_active_links", "gauge", "NVLinks in the active state",
+     lambda s: sum(1 for link in s.nvlinks if link.active) if s.nvlinks is not None else None),
+    ("gpu_nvlink_replay_errors_total", "counter", "NVLink data link replay errors summed over links",
+     lambda s: s.nvlink_replay_errors),
+    ("gpu_nvlink_recovery_errors_total", "counter", "NVLink data link recovery errors summed over links",
+     lambda s: s.nvlink_recovery_errors),
+    ("gpu_nvlink_crc_errors_total", "counter", "NVLink CRC flit and data errors summed over links",
+     lambda s: s.nvlink_crc_errors),
+    ("gpu_ecc_errors_corrected", "gauge", "Volatile corrected ECC errors",
+     lambda s: s.ecc_corrected),
+    ("gpu_ecc_errors_uncorrected", "gauge", "Volatile uncorrected ECC errors",
+     lambda s: s.ecc_uncorrected),
+    ("gpu_compute_processes", "gauge", "Running compute processes",
+     lambda s: s.process_count),
+    ("gpu_retired_pages_single_bit", "gauge", "Pages retired for multiple single bit ECC errors",
+     lambda s: s.retired_pages_sbe),
+    ("gpu_retired_pages_double_bit", "gauge", "Pages retired for double bit ECC errors",
+     lambda s: s.retired_pages_dbe),
+    ("gpu_remapped_rows_uncorrectable", "gauge", "Rows remapped for uncorrectable errors",
+     lambda s: s.remapped_rows_uncorrectable),
+    ("gpu_pcie_replays_total", "counter", "PCIe replays since driver load",
+     lambda s: s.pcie_replays),
+    ("gpu_sm_clock_mhz", "gauge", "Current SM clock",
+     lambda s: s.sm_clock),
+    ("gpu_sm_clock_max_mhz", "gauge", "Maximum SM clock",
+     lambda s: s.sm_clock_max),
+    ("gpu_clocks_throttle_reasons", "gauge", "Bitmask of active clock throttle reasons",
+     lambda s: s.throttle_reasons),
+    ("gpu_throttle_perf_loss_percent", "gauge", "Estimated SM clock loss from throttling",
+     gpu_snapshot.estimate_perf_loss),
+]
+
+# Health check status encoded as a number for alerting
+STATUS_VALUES = {"pass": 0, "warn": 1, "fail": 2, "timeout": 3, "error": 4}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def render_metrics(snapshots: List[gpu_health.DeviceSnapshot], health_checks: List[Dict[str, Any]],
+                   refresh_seconds: float, collected_at: float) -> bytes:
+    """Render snapshots and their health verdicts as a Prometheus text page"""
+    labels = {
+        s.index: f'gpu="{s.index}",uuid="{_escape(s.uuid)}",name="{_escape(s.name)}"'
+        for s in snapshots
+    }
+    lines = []
+
+    for name, metric_type, help_text, getter in GPU_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for snapshot in snapshots:
+            if snapshot.status != "ok":
+                continue
+            value = getter(snapshot)
+            if value is not None:
+                lines.append(f"{name}{{{labels[snapshot.index]}}} {value}")
+
+    lines.append("# HELP gpu_collection_timeout 1 if the GPU missed its collection deadline")
+    lines.append("# TYPE gpu_collection_timeout gauge")
+    for snapshot in snapshots:
+        lines.append(f"gpu_collection_timeout{{{labels[snapshot.index]}}} {int(snapshot.status == 'timeout')}")
+
+    lines.append("# HELP gpu_health_check_status Health check verdict (0=pass 1=warn 2=fail 3=timeout 4=error)")
+    lines.append("# TYPE gpu_health_check_status gauge")
+    for gpu_check in health_checks:
+        for check in gpu_check["checks"]:
+            value = STATUS_VALUES.get(check["status"])
+            if value is not None:
+                lines.append(
+                    f'gpu_health_check_status{{{labels[gpu_check["gpu_index"]]},check="{check["check"]}"}} {value}'
+                )
+
+    lines.append("# HELP gpu_exporter_refresh_seconds Time spent collecting the last snapshot")
+    lines.append("# TYPE gpu_exporter_refresh_seconds gauge")
+    lines.append(f"gpu_exporter_refresh_seconds {refresh_seconds:.6f}")
+    lines.append("# HELP gpu_exporter_last_refresh_timestamp_seconds Unix time of the last snapshot")
+    lines.append("# TYPE gpu_exporter_last_refresh_timestamp_seconds gauge")
+    lines.append(f"gpu_exporter_last_refresh_timestamp_seconds {collected_at:.3f}")
+
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class SnapshotCache:
+    """Background refresher holding the last rendered metrics page"""
+
+    def __init__(self, checker: gpu_health.GPUHealthChecker, interval: float = 10.0):
+        self.checker = checker
+        self.interval = interval
+        self.refreshes = 0
+        self._page = b""
+        self._refresh_lock = threading.Lock()
+        self._ready = threading.Event()
+        # Set by trigger(); wakes the refresh thread before the interval is up
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """Collect one snapshot of every GPU and swap in the rendered page"""
+        with self._refresh_lock:
+            start = time.monotonic()
+            snapshots = self.checker.collect_snapshots()
+            health_checks = self.checker.perform_health_checks(snapshots)
+            page = render_metrics(snapshots, health_checks, time.monotonic() - start, time.time())
+            # Rebinding a bytes attribute is atomic; readers never see a partial page
+            self._page = page
+            self.refreshes += 1
+        self._ready.set()
+
+    def page(self, wait: Optional[float] = None) -> bytes:
+        """Last rendered page; never touches NVML"""
+        if wait is not None:
+            self._ready.wait(wait)
+        return self._page
+
+    def trigger(self):
+        """
+        Ask the refresh thread for an early refresh without waiting for it;
+        triggers arriving before or during one refresh coalesce into it
+        """
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            # Cleared before collecting, so a trigger during this refresh
+            # still gets one more
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing GPU snapshot: {e}", file=sys.stderr)
+            self._wake.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="snapshot-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+class ExporterServer(ThreadingHTTPServer):
+    """Threading HTTP server with room for many simultaneous scrapers"""
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def make_handler(cache: SnapshotCache):
+    """Build a request handler class bound to one cache"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out as separate writes; don't let Nagle hold the body
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] == "/metrics":
+                body = cache.page(wait=5.0)
+                status = 200 if body else 503
+            elif self.path == "/":
+                body = b"<html><body><a href=\"/metrics\">Metrics</a></body></html>\n"
+                status = 200
+            else:
+                body = b"Not Found\n"
+                status = 404
+            self.send_response(status)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+def serve(checker: gpu_health.GPUHealthChecker, address: str = "", port: int = 9835,
+          interval: float = 10.0):
+    """Start the refresher and HTTP server; returns (server, cache)"""
+    cache = SnapshotCache(checker, interval)
+    cache.start()
+    server = ExporterServer((address, port), make_handler(cache))
+    return server, cache
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="GPU Prometheus Exporter - Based on NVIDIA NVML"
+    )
+    parser.add_argument(
+        "-a", "--address",
+        default="",
+        help="Listen address (default: all interfaces)"
+    )
+    parser.add_argument(
+        "-p", "--port",
+        type=int,
+        default=9835,
+        help="Listen port (default: 9835)"
+    )
+    parser.add_argument(
+        "-r", "--refresh",
+        type=float,
+        default=10.0,
+        help="Seconds between NVML snapshots (default: 10)"
+    )
+    parser.add_argument(
+        "-d", "--deadline",
+        type=float,
+        default=5.0,
+        help="Per-GPU collection deadline in seconds (default: 5)"
+    )
+    parser.add_argument(
+        "--state",
+        help="Counter state file for delta/rate based ECC, page retirement and PCIe replay checks"
+    )
+    parser.add_argument(
+        "--nvlink",
+        action="store_true",
+        help="Also read per-link NVLink state and error counters for the gpu_nvlink_* metrics "
+             "(about 4 NVML calls per link per refresh)"
+    )
+    parser.add_argument(
+        "--events",
+        action="store_true",
+        help="Watch NVML XID/ECC events and refresh as soon as one arrives (one refresh per burst)"
+    )
+    parser.add_argument(
+        "--event-window",
+        type=float,
+        default=3600.0,
+        help="Seconds an XID/ECC event counts towards the health verdict; 0 keeps every event (default: 3600)"
+    )
+
+    args = parser.parse_args()
+
+    checker = gpu_health.GPUHealthChecker(deadline=args.deadline or None)
+    if args.nvlink:
+        checker.select(sorted(gpu_snapshot.DEFAULT_FIELD_GROUPS | gpu_snapshot.ON_REQUEST_FIELD_GROUPS))
+    if args.state:
+        import gpu_counter_state
+        checker.counter_state = gpu_counter_state.CounterState(args.state)
+    server, cache = serve(checker, args.address, args.port, args.refresh)
+    if args.events:
+        checker.start_event_watcher(window=args.event_window).on_event = lambda event: cache.trigger()
+    print(f"Serving metrics for {checker.device_count} GPUs on :{server.server_address[1]}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cache.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
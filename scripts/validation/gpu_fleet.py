@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+GPU Fleet Collector
+Runs gpu_health.py on many hosts at once with asyncio and folds the NDJSON
+reports into one fleet summary as they arrive. Concurrency is capped, every
+attempt has a timeout, and failed hosts are retried with backoff.
+
+Transports are objects with `async run(host) -> bytes` returning the
+remote gpu_health.py NDJSON output and raising TransportError on failure:
+SSHTransport shells out to ssh, FakeTransport simulates hosts locally.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import gpu_health
+import gpu_report_io
+
+DEFAULT_REMOTE_COMMAND = "python3 /opt/gpu-validation/scripts/validation/gpu_health.py -f ndjson -o - -d 10"
+
+
+class TransportError(Exception):
+    """A host could not be reached or produced no report"""
+
+
+class SSHTransport:
+    """Runs the remote command over the system ssh client (keys, ssh_config)"""
+
+    def __init__(self, remote_command: str = DEFAULT_REMOTE_COMMAND, ssh_options: Iterable[str] = (),
+                 connect_timeout: int = 10):
+        self.remote_command = remote_command
+        self.ssh_args = ["-o", "BatchMode=yes", "-o", f"ConnectTimeout={connect_timeout}"]
+        for option in ssh_options:
+            self.ssh_args += ["-o", option]
+
+    async def run(self, host: str) -> bytes:
+        proc = await asyncio.create_subprocess_exec(
+            "ssh", *self.ssh_args, host, self.remote_command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await proc.communicate()
+        except asyncio.CancelledError:
+            # Timed out: don't leave the ssh process behind
+            proc.kill()
+            await proc.wait()
+            raise
+        # gpu_health.py exits 1 on failed GPUs; only 255 is an ssh failure
+        if proc.returncode == 255 or not stdout.strip():
+            message = stderr.decode("utf-8", "replace").strip().splitlines()
+            raise TransportError(f"exit {proc.returncode}: {message[-1] if message else 'no output'}")
+        return stdout
+
+
+class FakeTransport:
+    """
+    Simulated hosts with random latency, connection failures, hangs and
+    unhealthy GPUs; deterministic for a given seed
+    """
+
+    def __init__(self, seed: int = 0, latency=(0.05, 2.0), failure_rate: float = 0.03,
+                 hang_rate: float = 0.01, gpu_fail_rate: float = 0.005, gpus: int = 8):
+        self.seed = seed
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.gpu_fail_rate = gpu_fail_rate
+        self.gpus = gpus
+        self.calls = {}
+
+    def _report(self, rng: random.Random, host: str) -> bytes:
+        snapshots = [
+            gpu_health.DeviceSnapshot(
+                index=i, name="NVIDIA H100-SXM5-80GB", uuid=f"GPU-{host}-{i}",
+                temperature=99 if rng.random() < self.gpu_fail_rate else rng.randint(35, 70),
+                power_draw_mw=rng.randint(80000, 650000), power_limit_mw=700000,
+                ecc_corrected=0, ecc_uncorrected=0,
+            )
+            for i in range(self.gpus)
+        ]
+        checks = [gpu_health.evaluate_health(s) for s in snapshots]
+        statuses = {c["status"] for g in checks for c in g["checks"]}
+        report = {
+            "timestamp": "1970-01-01T00:00:00Z", "driver_version": "535.154.05", "cuda_version": "12.2",
+            "gpu_count": self.gpus, "gpus": [gpu_health.snapshot_to_info(s) for s in snapshots],
+            "health_checks": checks,
+            "overall_status": "fail" if "fail" in statuses else "warn" if "warn" in statuses else "pass",
+        }
+
+        class Buffer(list):
+            write = list.append
+
+        out = Buffer()
+        gpu_report_io.write_ndjson(report, out, host)
+        return "".join(out).encode("utf-8")
+
+    async def run(self, host: str) -> bytes:
+        attempt = self.calls[host] = self.calls.get(host, 0) + 1
+        rng = random.Random(f"{self.seed}:{host}:{attempt}")
+        await asyncio.sleep(rng.uniform(*self.latency))
+        roll = rng.random()
+        if roll < self.hang_rate:
+            await asyncio.sleep(3600)
+        if roll < self.hang_rate + self.failure_rate:
+            raise TransportError("ssh: connect to host port 22: Connection refused")
+        return self._report(rng, host)
+
+
+class HostResult(NamedTuple):
+    host: str
+    status: str              # "ok", "error" or "timeout"
+    attempts: int
+    elapsed: float           # seconds from first attempt to result, incl. backoff, not queueing
+    records: List[Dict[str, Any]]
+    error: Optional[str] = None
+
+
+def parse_records(output: bytes, host: str) -> List[Dict[str, Any]]:
+    """NDJSON report records, each tagged with the host it was collected from"""
+    records = [json.loads(line) for line in output.splitlines() if line.strip()]
+    if not records or records[0].get("type") != "node":
+        raise ValueError("output is not a gpu_health.py NDJSON report")
+    for record in records:
+        record["source"] = host
+    return records
+
+
+async def collect_host(host: str, transport, semaphore: asyncio.Semaphore, timeout: float,
+                       retries: int, backoff: float) -> HostResult:
+    """Collect one host, retrying with exponential backoff outside the concurrency slot"""
+    start = None
+    status, error = "error", None
+    for attempt in range(retries + 1):
+        async with semaphore:
+            if start is None:
+                start = time.monotonic()
+            try:
+                output = await asyncio.wait_for(transport.run(host), timeout)
+                return HostResult(host, "ok", attempt + 1, time.monotonic() - start, parse_records(output, host))
+            except asyncio.TimeoutError:
+                status, error = "timeout", f"no report within {timeout:g}s"
+            except (TransportError, OSError, ValueError) as e:
+                status, error = "error", str(e)
+        if attempt < retries:
+            await asyncio.sleep(backoff * 2 ** attempt)
+    return HostResult(host, status, retries + 1, time.monotonic() - start, [], error)
+
+
+async def iter_fleet_results(hosts: List[str], transport, concurrency: int = 64, timeout: float = 120.0,
+                             retries: int = 2, backoff: float = 1.0):
+    """Yield HostResults in completion order"""
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.ensure_future(collect_host(host, transport, semaphore, timeout, retries, backoff))
+             for host in hosts]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_fleet(hosts: List[str], transport, concurrency: int = 64, timeout: float = 120.0,
+                    retries: int = 2, backoff: float = 1.0, output=None,
+                    progress: Optional[Callable[[int, int, HostResult], None]] = None) -> Dict[str, Any]:
+    """
+    Collect every host and return the fleet summary
+
+    Records are added to the summary (and written to `output` as NDJSON)
+    as each host answers, so memory holds the summary, not the reports.
+    """
+    start = time.monotonic()
+    summary = gpu_report_io.FleetSummary()
+    unreachable = []
+    latencies = []
+    retried = 0
+    done = 0
+    async for result in iter_fleet_results(hosts, transport, concurrency, timeout, retries, backoff):
+        done += 1
+        retried += result.attempts > 1
+        if result.status == "ok":
+            latencies.append(result.elapsed)
+            for record in result.records:
+                summary.add(record)
+                if output is not None:
+                    output.write(json.dumps(record, separators=(",", ":")) + "\n")
+        else:
+            unreachable.append({"host": result.host, "status": result.status,
+                                "attempts": result.attempts, "error": result.error})
+        if progress is not None:
+            progress(done, len(hosts), result)
+
+    latencies.sort()
+    fleet = summary.as_dict()
+    fleet["hosts"] = len(hosts)
+    fleet["unreachable"] = unreachable
+    fleet["collection"] = {
+        "wall_seconds": round(time.monotonic() - start, 2),
+        "concurrency": concurrency,
+        "retried_hosts": retried,
+        "host_seconds_p50": round(latencies[len(latencies) // 2], 2) if latencies else None,
+        "host_seconds_max": round(latencies[-1], 2) if latencies else None,
+    }
+    return fleet
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="GPU Fleet Collector - run gpu_health.py across hosts and summarize"
+    )
+    hosts = parser.add_mutually_exclusive_group(required=True)
+    hosts.add_argument(
+        "-n", "--nodes-file",
+        help="File with one host per line (same format as detect_slow_nodes.sh)"
+    )
+    hosts.add_argument(
+        "--hosts",
+        help="Comma-separated host list"
+    )
+    hosts.add_argument(
+        "--fake",
+        type=int,
+        metavar="N",
+        help="Simulate N hosts with the fake transport"
+    )
+    parser.add_argument(
+        "-c", "--concurrency",
+        type=int,
+        default=64,
+        help="Hosts collected at once (default: 64)"
+    )
+    parser.add_argument(
+        "-t", "--timeout",
+        type=float,
+        default=120.0,
+        help="Seconds per attempt before a host counts as timed out (default: 120)"
+    )
+    parser.add_argument(
+        "-r", "--retries",
+        type=int,
+        default=2,
+        help="Retries per host after a failure or timeout (default: 2)"
+    )
+    parser.add_argument(
+        "--backoff",
+        type=float,
+        default=1.0,
+        help="First retry delay in seconds, doubled per retry (default: 1.0)"
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Also write every collected record to this NDJSON file"
+    )
+    parser.add_argument(
+        "--remote-command",
+        default=DEFAULT_REMOTE_COMMAND,
+        help=f"Command run on each host; must print NDJSON (default: {DEFAULT_REMOTE_COMMAND})"
+    )
+    parser.add_argument(
+        "--ssh-option",
+        action="append",
+        default=[],
+        help="Extra ssh -o option, e.g. User=ubuntu (repeatable)"
+    )
+    parser.add_argument(
+        "-q", "--quiet",
+        action="store_true",
+        help="No progress line on stderr"
+    )
+
+    args = parser.parse_args()
+
+    if args.fake:
+        host_list = [f"gpu-node-{i:04d}" for i in range(args.fake)]
+        transport = FakeTransport()
+    else:
+        if args.nodes_file:
+            with open(args.nodes_file) as f:
+                host_list = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        else:
+            host_list = [h for h in args.hosts.split(",") if h]
+        transport = SSHTransport(args.remote_command, args.ssh_option)
+
+    def progress(done, total, result):
+        sys.stderr.write(f"\r[{done}/{total}] last: {result.host} {result.status}   ")
+        if done == total:
+            sys.stderr.write("\n")
+
+    output = open(args.output, "w") if args.output else None
+    try:
+        fleet = asyncio.run(run_fleet(host_list, transport, args.concurrency, args.timeout, args.retries,
+                                      args.backoff, output, None if args.quiet else progress))
+    except KeyboardInterrupt:
+        sys.exit(130)
+    finally:
+        if output is not None:
+            output.close()
+
+    print(json.dumps(fleet, indent=2))
+    sys.exit(1 if fleet["failing_gpus"] or fleet["unreachable"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,23 +6,341 @@ Implements best practices from NVIDIA DCGM and community tools
 """
 
 import json
+import socket
 import sys
+import time
 import argparse
+import queue
+import threading
+import weakref
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
 try:
     import pynvml
 except ImportError:
-    print("Error: pynvml library not installed. Install with: pip install pynvml")
+    # Saved reports can still be judged (gpu_rules.py) without NVML
+    pynvml = None
+
+try:
+    from gpu_snapshot import (DEFAULT_FIELD_GROUPS, FIELD_GROUPS, ON_REQUEST_FIELD_GROUPS, DeviceSnapshot,
+                              NVLinkStatus, gpu_baseline_for, groups_of_fields, nvlink_error_totals,
+                              snapshot_to_info)
+except ImportError:
+    # Unlike the helpers below, the snapshot model is required
+    print("Error: gpu_snapshot.py not found; deploy it next to gpu_health.py", file=sys.stderr)
     sys.exit(1)
 
+try:
+    import gpu_processes
+except ImportError:
+    # Without it only process counts are reported
+    gpu_processes = None
+
+# Usable GB/s per lane and direction for each PCIe generation
+PCIE_LANE_GBS = {1: 0.25, 2: 0.5, 3: 0.985, 4: 1.969, 5: 3.938, 6: 7.563}
+
+# NVLink error counters (nvmlNvLinkErrorCounter_t), in NVLinkStatus field order
+NVLINK_ERROR_COUNTERS = (
+    ("replay_errors", 0),      # NVML_NVLINK_ERROR_DL_REPLAY
+    ("recovery_errors", 1),    # NVML_NVLINK_ERROR_DL_RECOVERY
+    ("crc_flit_errors", 2),    # NVML_NVLINK_ERROR_DL_CRC_FLIT
+    ("crc_data_errors", 3),    # NVML_NVLINK_ERROR_DL_CRC_DATA
+)
+
+# Snapshot fields NVML serves through nvmlDeviceGetFieldValues, so one call
+# replaces a call per field; values are in the units of the single-field
+# queries (mW, error and page counts)
+BATCHED_FIELDS = {
+    "power_draw_mw": "NVML_FI_DEV_POWER_AVERAGE",
+    "power_limit_mw": "NVML_FI_DEV_POWER_REQUESTED_LIMIT",
+    "ecc_corrected": "NVML_FI_DEV_ECC_SBE_VOL_TOTAL",
+    "ecc_uncorrected": "NVML_FI_DEV_ECC_DBE_VOL_TOTAL",
+    "retired_pages_sbe": "NVML_FI_DEV_RETIRED_SBE",
+    "retired_pages_dbe": "NVML_FI_DEV_RETIRED_DBE",
+    "pcie_replays": "NVML_FI_DEV_PCIE_REPLAY_COUNTER",
+}
+
+# c_nvmlValue_t member holding each nvmlValueType_t
+FIELD_VALUE_MEMBERS = ("dVal", "uiVal", "ulVal", "ullVal", "sllVal", "siVal", "usVal")
+
+# Observed PCIe throughput at or above this share of the negotiated link
+# means a degraded link is actively limiting transfers
+PCIE_SATURATION_RATIO = 0.8
+
+# Seconds the link last seen while busy stands in for an idle GPU's link;
+# older observations, or ones from before a reboot or driver change, are
+# reported as unknown
+PCIE_BUSY_LINK_MAX_AGE = 6 * 3600
+
+
+# Collection groups each built-in check needs (--checks)
+CHECK_FIELDS = {
+    "temperature": ("temperature",),
+    "ecc_errors": ("ecc_errors",),
+    "power": ("power",),
+    "clock_throttle": ("clocks", "throttle"),
+    "pcie_link": ("pcie", "utilization"),
+    "pcie_throughput": ("pcie", "utilization"),
+    "nvlink": ("nvlink",),
+    "foreign_processes": ("processes",),
+    "ecc_corrected_rate": ("ecc_errors",),
+    "retired_pages": ("retired_pages",),
+    "row_remapping": ("remapped_rows",),
+    "pcie_replay_rate": ("pcie_replays",),
+    "nvlink_error_rate": ("nvlink",),
+    "xid_errors": (),
+    "ecc_events": (),
+}
+
+
+def _nvml_or_none(func, *args):
+    """Call an NVML query, mapping NVMLError to None"""
+    try:
+        return func(*args)
+    except pynvml.NVMLError:
+        return None
+
+
+def pcie_link_fraction(gen: int, width: int, max_gen: int, max_width: int) -> Optional[float]:
+    """Bandwidth of a gen/width link relative to the maximum link"""
+    if gen not in PCIE_LANE_GBS or max_gen not in PCIE_LANE_GBS or not max_width:
+        return None
+    return (PCIE_LANE_GBS[gen] * width) / (PCIE_LANE_GBS[max_gen] * max_width)
+
+
+def evaluate_pcie(snapshot: DeviceSnapshot, busy_link: Optional[Dict[str, Any]] = None,
+                  now: Optional[float] = None, max_age: float = PCIE_BUSY_LINK_MAX_AGE) -> List[Dict[str, Any]]:
+    """
+    PCIe link degradation and throughput checks
+
+    Idle GPUs drop their link generation to save power, so the current
+    link is only judged while the GPU is busy. An idle GPU is judged on the
+    link last seen while busy (`busy_link`, with its "seen" time) when that
+    is at most max_age seconds old, and reported as unknown otherwise.
+    """
+    if snapshot.pcie_max_width is None:
+        return [{"check": "pcie_link", "status": "unknown"}]
+
+    checks = []
+    busy = bool(snapshot.util_gpu)
+    age = None
+    if busy_link and "seen" in busy_link:
+        age = round((time.time() if now is None else now) - busy_link["seen"], 1)
+    if busy:
+        gen, width = snapshot.pcie_gen, snapshot.pcie_width
+        source = "current"
+    elif age is not None and age <= max_age:
+        # Width is read live: lost lanes are never an idle power-saving state
+        gen, width = busy_link["gen"], snapshot.pcie_width
+        source = "last_busy"
+    else:
+        gen, width = None, snapshot.pcie_width
+        source = "idle" if age is None else "last_busy_expired"
+
+    baseline_gbs = gpu_baseline_for(snapshot.name).get("pcie_bandwidth_gbs")
+    value = {
+        "gen": gen, "width": width,
+        "max_gen": snapshot.pcie_max_gen, "max_width": snapshot.pcie_max_width,
+        "source": source
+    }
+    if age is not None and not busy:
+        value["busy_age_s"] = age
+    fraction = None
+    if gen is not None:
+        fraction = pcie_link_fraction(gen, width, snapshot.pcie_max_gen, snapshot.pcie_max_width)
+        if fraction is not None:
+            value["bandwidth_fraction"] = round(fraction, 3)
+            if baseline_gbs:
+                value["expected_bandwidth_gbs"] = round(baseline_gbs * fraction, 1)
+
+    # Lost lanes are never an idle power-saving state
+    if width < snapshot.pcie_max_width:
+        status = "fail"
+    elif gen is None:
+        status = "unknown"
+    elif gen < snapshot.pcie_max_gen:
+        status = "fail"
+    else:
+        status = "pass"
+    checks.append({"check": "pcie_link", "status": status, "value": value})
+
+    if snapshot.pcie_tx_kbs is not None and snapshot.pcie_rx_kbs is not None:
+        observed_gbs = (snapshot.pcie_tx_kbs + snapshot.pcie_rx_kbs) / 1e6
+        throughput = {"tx_gbs": round(snapshot.pcie_tx_kbs / 1e6, 3),
+                      "rx_gbs": round(snapshot.pcie_rx_kbs / 1e6, 3)}
+        status = "pass"
+        if baseline_gbs:
+            throughput["baseline_gbs"] = baseline_gbs
+            throughput["utilization_percent"] = round(observed_gbs / baseline_gbs * 100, 1)
+            current = pcie_link_fraction(snapshot.pcie_gen, snapshot.pcie_width,
+                                         snapshot.pcie_max_gen, snapshot.pcie_max_width)
+            if current is not None and current < 1 and \
+                    observed_gbs >= baseline_gbs * current * PCIE_SATURATION_RATIO:
+                status = "warn"
+        checks.append({"check": "pcie_throughput", "status": status, "value": throughput})
+
+    return checks
+
+
+def evaluate_nvlink(snapshot: DeviceSnapshot) -> List[Dict[str, Any]]:
+    """
+    NVLink check: active links against the model's expected link count,
+    and links that have needed recovery (a retrain after a link fault)
+
+    Error totals are counted since driver load; CounterState turns them
+    into rates between runs.
+    """
+    expected = gpu_baseline_for(snapshot.name).get("nvlink_links")
+    if snapshot.nvlinks is None:
+        return [{"check": "nvlink", "status": "unknown"}] if expected else []
+
+    active = [link.link for link in snapshot.nvlinks if link.active]
+    down = [link.link for link in snapshot.nvlinks if not link.active]
+    erroring = [link.link for link in snapshot.nvlinks if link.recovery_errors]
+    value = {"active_links": len(active), "expected_links": expected}
+    if down:
+        value["down_links"] = down
+    if erroring:
+        value["erroring_links"] = erroring
+
+    if expected and len(active) < expected:
+        status = "fail"
+    elif erroring:
+        status = "warn"
+    else:
+        status = "pass"
+    return [{"check": "nvlink", "status": status, "value": value}]
+
+
+def evaluate_health(snapshot: DeviceSnapshot, pcie_busy_link: Optional[Dict[str, Any]] = None,
+                    job: Optional[str] = None, threshold_checks: Optional[List[Dict]] = None) -> Dict[str, Any]:
+    """
+    Derive health verdicts for one GPU purely from its snapshot
+
+    pcie_busy_link is the PCIe link last seen while the GPU was busy, used
+    to judge links that have dropped generation while idle. When job is
+    given, memory held by processes outside it is flagged.
+    threshold_checks are this GPU's results from a batch RuleSet run; by
+    default the built-in rules are evaluated for this snapshot alone.
+    """
+    if snapshot.status != "ok":
+        return {
+            "gpu_index": snapshot.index,
+            "checks": [{"check": "collection", "status": snapshot.status}]
+        }
+
+    # Temperature, ECC, power and throttling thresholds (gpu_rules.py)
+    if threshold_checks is None:
+        import gpu_rules
+        threshold_checks = gpu_rules.default_rules().evaluate(snapshot)
+    gpu_checks = list(threshold_checks)
+
+    # PCIe link degradation and throughput
+    gpu_checks.extend(evaluate_pcie(snapshot, pcie_busy_link))
+
+    # NVLink state and errors
+    gpu_checks.extend(evaluate_nvlink(snapshot))
+
+    # Leftover processes from other jobs holding GPU memory
+    if job is not None and gpu_processes is not None:
+        gpu_checks.extend(gpu_processes.evaluate_processes(snapshot.processes, job))
+
+    return {
+        "gpu_index": snapshot.index,
+        "checks": gpu_checks
+    }
+
+
+
+class _DeviceWorker:
+    """
+    Persistent collection thread of one GPU with at most one call in flight
+
+    A call stuck in a hung NVML query keeps the worker busy until it
+    returns; callers skip a busy worker instead of starting another thread.
+    The checker is held weakly so a dropped checker can still be shut down.
+    """
+
+    def __init__(self, checker, index: int):
+        self.busy = False
+        self._requests = queue.Queue()
+        self.thread = threading.Thread(target=self._run, args=(weakref.ref(checker), index),
+                                       name=f"nvml-gpu{index}", daemon=True)
+        self.thread.start()
+
+    def submit(self) -> Dict[str, Any]:
+        """Queue one snapshot; the returned job's "done" event is set once it finishes"""
+        self.busy = True
+        job = {"done": threading.Event()}
+        self._requests.put(job)
+        return job
+
+    def stop(self):
+        self._requests.put(None)
+
+    def _run(self, checker_ref, index: int):
+        while True:
+            job = self._requests.get()
+            checker = checker_ref()
+            if job is None or checker is None:
+                return
+            try:
+                job["result"] = checker.collect_snapshot(index)
+            except Exception as e:
+                job["error"] = e
+            finally:
+                del checker
+                self.busy = False
+                job["done"].set()
+
 
 class GPUHealthChecker:
     """GPU health monitoring using NVIDIA Management Library"""
 
-    def __init__(self):
-        """Initialize NVML"""
+    def __init__(self, deadline: Optional[float] = None, pcie_sample_window: float = 0.0,
+                 job: Optional[str] = None):
+        """
+        Initialize NVML
+
+        Args:
+            deadline: Per-device collection deadline in seconds. When set,
+                GPUs are read concurrently and a GPU that misses it is
+                reported as "timeout". None reads GPUs serially.
+            pcie_sample_window: Seconds to sample PCIe TX/RX throughput
+                per GPU; 0 skips throughput sampling.
+            job: Owner of the current job ("slurm:<id>", "container:<id>");
+                GPU memory held by processes of any other owner is flagged.
+        """
+        self.deadline = deadline
+        self.pcie_sample_window = pcie_sample_window
+        self.job = job
+        # gpu_rules.RuleSet; None uses the built-in threshold rules
+        self.rules = None
+        # FIELD_GROUPS to collect (None: all) and checks to report (None: all
+        # the collected fields can answer); see select()
+        self.fields = DEFAULT_FIELD_GROUPS
+        self.checks = None
+        self.event_watcher = None
+        # Seconds XID/ECC events count towards the verdict (gpu_events.EVENT_WINDOW)
+        self.event_window = None
+        self.counter_state = None
+        self._handles = {}
+        # BATCHED_FIELDS per GPU index the driver would not batch; read singly
+        self._unbatched = {}
+        # (sm, mem) maximum clocks per GPU index; fixed for the device
+        self._max_clocks = {}
+        # Persistent per-GPU collection threads (deadline mode)
+        self._workers = {}
+        self._workers_lock = threading.Lock()
+        # PCIe link per GPU UUID last seen while busy, for this process
+        self._pcie_busy_link = {}
+        self._pcie_epoch = None
+        # Newest per-process utilization sample timestamp per GPU index
+        self._process_util_seen = {}
+        if pynvml is None:
+            print("Error: pynvml library not installed. Install with: pip install pynvml")
+            sys.exit(1)
         try:
             pynvml.nvmlInit()
             self.device_count = pynvml.nvmlDeviceGetCount()
@@ -32,6 +350,8 @@ class GPUHealthChecker:
 
     def __del__(self):
         """Cleanup NVML"""
+        for worker in getattr(self, "_workers", {}).values():
+            worker.stop()
         try:
             pynvml.nvmlShutdown()
         except:
@@ -54,152 +374,402 @@ class GPUHealthChecker:
         except pynvml.NVMLError:
             return "Unknown"
 
-    def check_gpu_info(self, index: int) -> Dict[str, Any]:
-        """Get detailed information for a specific GPU"""
-        handle = pynvml.nvmlDeviceGetHandleByIndex(index)
-
-        info = {
+    def select(self, fields: Optional[List[str]] = None, checks: Optional[List[str]] = None):
+        """
+        Restrict collection to some FIELD_GROUPS and reporting to some checks
+
+        Requested checks pull in the groups they need. With only fields
+        given, every check those fields can answer is reported; with
+        neither, DEFAULT_FIELD_GROUPS are read. Raises ValueError on
+        unknown names.
+        """
+        import gpu_rules
+        rules = self.rules or gpu_rules.default_rules()
+        unknown = [f for f in fields or () if f not in FIELD_GROUPS]
+        if unknown:
+            raise ValueError(f"unknown field(s): {', '.join(unknown)}")
+        groups = set(fields or ())
+        for check in checks or ():
+            needed = self._check_groups(check, rules)
+            if needed is None:
+                raise ValueError(f"unknown check: {check}")
+            groups |= needed
+        self.fields = frozenset(groups) if fields is not None or checks else DEFAULT_FIELD_GROUPS
+        self.checks = frozenset(checks) if checks else None
+
+    @staticmethod
+    def _check_groups(check: str, rules) -> Optional[frozenset]:
+        if check in CHECK_FIELDS:
+            return frozenset(CHECK_FIELDS[check])
+        snapshot_fields = rules.snapshot_fields(check)
+        return groups_of_fields(snapshot_fields) if snapshot_fields is not None else None
+
+    def _check_selected(self, check: str, rules) -> bool:
+        if self.checks is not None:
+            return check in self.checks
+        if self.fields is None or check == "collection":
+            return True
+        needed = self._check_groups(check, rules)
+        return needed is None or needed <= self.fields
+
+    def get_handle(self, index: int):
+        """Device handle, fetched from NVML once per checker"""
+        handle = self._handles.get(index)
+        if handle is None:
+            handle = self._handles[index] = pynvml.nvmlDeviceGetHandleByIndex(index)
+        return handle
+
+    def _get_max_clocks(self, index: int, handle) -> tuple:
+        """(sm, mem) maximum clocks of one GPU, read once per checker"""
+        max_clocks = self._max_clocks.get(index)
+        if max_clocks is None:
+            max_clocks = (
+                _nvml_or_none(pynvml.nvmlDeviceGetMaxClockInfo, handle, pynvml.NVML_CLOCK_SM),
+                _nvml_or_none(pynvml.nvmlDeviceGetMaxClockInfo, handle, pynvml.NVML_CLOCK_MEM),
+            )
+            if None in max_clocks:
+                # Not cached, so a transient error is retried next collection
+                return max_clocks
+            self._max_clocks[index] = max_clocks
+        return max_clocks
+
+    def _read_field_values(self, index: int, handle, want) -> Dict[str, Any]:
+        """
+        Read the selected BATCHED_FIELDS of one GPU in a single call
+
+        Fields the driver (or an older pynvml) cannot return this way are
+        left out of the result and read with their own calls from then on.
+        """
+        unbatched = self._unbatched.setdefault(index, set())
+        names = [name for name in BATCHED_FIELDS
+                 if name not in unbatched and (want is None or groups_of_fields((name,)) <= want)]
+        if not names:
+            return {}
+        try:
+            field_ids = [getattr(pynvml, BATCHED_FIELDS[name]) for name in names]
+            results = pynvml.nvmlDeviceGetFieldValues(handle, field_ids)
+        except (AttributeError, pynvml.NVMLError):
+            unbatched.update(names)
+            return {}
+
+        values = {}
+        for name, result in zip(names, results):
+            if result.nvmlReturn != pynvml.NVML_SUCCESS:
+                unbatched.add(name)
+            else:
+                values[name] = getattr(result.value, FIELD_VALUE_MEMBERS[result.valueType])
+        return values
+
+    def collect_snapshot(self, index: int) -> DeviceSnapshot:
+        """Read every selected metric of one GPU exactly once"""
+        handle = self.get_handle(index)
+        want = self.fields
+        fields = {
             "index": index,
             "name": pynvml.nvmlDeviceGetName(handle),
             "uuid": pynvml.nvmlDeviceGetUUID(handle),
+            "collected": want,
         }
+        batched = self._read_field_values(index, handle, want)
+        fields.update(batched)
 
         # Memory information
-        try:
-            mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-            info["memory"] = {
-                "total": mem_info.total,
-                "free": mem_info.free,
-                "used": mem_info.used,
-                "utilization_percent": round((mem_info.used / mem_info.total) * 100, 2)
-            }
-        except pynvml.NVMLError:
-            info["memory"] = "N/A"
+        if want is None or "memory" in want:
+            mem_info = _nvml_or_none(pynvml.nvmlDeviceGetMemoryInfo, handle)
+            if mem_info is not None:
+                fields["memory_total"] = mem_info.total
+                fields["memory_free"] = mem_info.free
+                fields["memory_used"] = mem_info.used
 
         # Temperature
-        try:
-            info["temperature"] = {
-                "gpu": pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU),
-                "unit": "C"
-            }
-        except pynvml.NVMLError:
-            info["temperature"] = "N/A"
+        if want is None or "temperature" in want:
+            fields["temperature"] = _nvml_or_none(
+                pynvml.nvmlDeviceGetTemperature, handle, pynvml.NVML_TEMPERATURE_GPU
+            )
 
         # Utilization
-        try:
-            util = pynvml.nvmlDeviceGetUtilizationRates(handle)
-            info["utilization"] = {
-                "gpu": util.gpu,
-                "memory": util.memory
-            }
-        except pynvml.NVMLError:
-            info["utilization"] = "N/A"
-
-        # Power
-        try:
-            power = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000.0  # mW to W
-            power_limit = pynvml.nvmlDeviceGetPowerManagementLimit(handle) / 1000.0
-            info["power"] = {
-                "draw": round(power, 2),
-                "limit": round(power_limit, 2),
-                "unit": "W"
-            }
-        except pynvml.NVMLError:
-            info["power"] = "N/A"
+        if want is None or "utilization" in want:
+            util = _nvml_or_none(pynvml.nvmlDeviceGetUtilizationRates, handle)
+            if util is not None:
+                fields["util_gpu"] = util.gpu
+                fields["util_memory"] = util.memory
+
+        # Power (both values are reported in mW)
+        if want is None or "power" in want:
+            if "power_draw_mw" not in batched:
+                fields["power_draw_mw"] = _nvml_or_none(pynvml.nvmlDeviceGetPowerUsage, handle)
+            if "power_limit_mw" not in batched:
+                fields["power_limit_mw"] = _nvml_or_none(pynvml.nvmlDeviceGetPowerManagementLimit, handle)
 
         # PCIe information
-        try:
-            pcie_gen = pynvml.nvmlDeviceGetCurrPcieLinkGeneration(handle)
-            pcie_width = pynvml.nvmlDeviceGetCurrPcieLinkWidth(handle)
-            max_pcie_gen = pynvml.nvmlDeviceGetMaxPcieLinkGeneration(handle)
-            max_pcie_width = pynvml.nvmlDeviceGetMaxPcieLinkWidth(handle)
-            info["pcie"] = {
-                "current_gen": pcie_gen,
-                "current_width": pcie_width,
-                "max_gen": max_pcie_gen,
-                "max_width": max_pcie_width
-            }
-        except pynvml.NVMLError:
-            info["pcie"] = "N/A"
+        if want is None or "pcie" in want:
+            try:
+                fields["pcie_gen"] = pynvml.nvmlDeviceGetCurrPcieLinkGeneration(handle)
+                fields["pcie_width"] = pynvml.nvmlDeviceGetCurrPcieLinkWidth(handle)
+                fields["pcie_max_gen"] = pynvml.nvmlDeviceGetMaxPcieLinkGeneration(handle)
+                fields["pcie_max_width"] = pynvml.nvmlDeviceGetMaxPcieLinkWidth(handle)
+            except pynvml.NVMLError:
+                for key in ("pcie_gen", "pcie_width", "pcie_max_gen", "pcie_max_width"):
+                    fields.pop(key, None)
+            if self.pcie_sample_window > 0:
+                fields["pcie_tx_kbs"], fields["pcie_rx_kbs"] = self._sample_pcie_throughput(handle)
 
         # ECC errors
-        try:
-            ecc_single = pynvml.nvmlDeviceGetTotalEccErrors(
-                handle, pynvml.NVML_MEMORY_ERROR_TYPE_CORRECTED, pynvml.NVML_VOLATILE_ECC
-            )
-            ecc_double = pynvml.nvmlDeviceGetTotalEccErrors(
-                handle, pynvml.NVML_MEMORY_ERROR_TYPE_UNCORRECTED, pynvml.NVML_VOLATILE_ECC
-            )
-            info["ecc_errors"] = {
-                "corrected": ecc_single,
-                "uncorrected": ecc_double
-            }
-        except pynvml.NVMLError:
-            info["ecc_errors"] = "N/A"
+        if want is None or "ecc_errors" in want:
+            if "ecc_corrected" not in batched:
+                fields["ecc_corrected"] = _nvml_or_none(
+                    pynvml.nvmlDeviceGetTotalEccErrors,
+                    handle, pynvml.NVML_MEMORY_ERROR_TYPE_CORRECTED, pynvml.NVML_VOLATILE_ECC
+                )
+            if "ecc_uncorrected" not in batched:
+                fields["ecc_uncorrected"] = _nvml_or_none(
+                    pynvml.nvmlDeviceGetTotalEccErrors,
+                    handle, pynvml.NVML_MEMORY_ERROR_TYPE_UNCORRECTED, pynvml.NVML_VOLATILE_ECC
+                )
 
         # Processes
-        try:
-            processes = pynvml.nvmlDeviceGetComputeRunningProcesses(handle)
-            info["processes"] = len(processes)
-        except pynvml.NVMLError:
-            info["processes"] = 0
-
-        return info
-
-    def perform_health_checks(self) -> List[Dict[str, Any]]:
-        """Perform health checks on all GPUs"""
-        checks = []
-
-        for i in range(self.device_count):
-            handle = pynvml.nvmlDeviceGetHandleByIndex(i)
-            gpu_checks = []
-
-            # Temperature check
+        if want is None or "processes" in want:
+            processes = _nvml_or_none(pynvml.nvmlDeviceGetComputeRunningProcesses, handle)
+            fields["process_count"] = len(processes) if processes is not None else 0
+            if processes is not None and gpu_processes is not None:
+                fields["processes"] = self._resolve_processes(index, handle, processes)
+
+        # Retired pages (pre-Ampere) and row remapping (Ampere and later)
+        if (want is None or "retired_pages" in want) and not (
+                "retired_pages_sbe" in batched and "retired_pages_dbe" in batched):
+            sbe_pages = _nvml_or_none(
+                pynvml.nvmlDeviceGetRetiredPages,
+                handle, pynvml.NVML_PAGE_RETIREMENT_CAUSE_MULTIPLE_SINGLE_BIT_ECC_ERRORS
+            )
+            if sbe_pages is not None:
+                dbe_pages = _nvml_or_none(
+                    pynvml.nvmlDeviceGetRetiredPages,
+                    handle, pynvml.NVML_PAGE_RETIREMENT_CAUSE_DOUBLE_BIT_ECC_ERROR
+                )
+                if dbe_pages is not None:
+                    fields["retired_pages_sbe"] = len(sbe_pages)
+                    fields["retired_pages_dbe"] = len(dbe_pages)
+
+        if want is None or "remapped_rows" in want:
+            remapped = _nvml_or_none(pynvml.nvmlDeviceGetRemappedRows, handle)
+            if remapped is not None:
+                corr_rows, unc_rows, pending, failure = remapped
+                fields["remapped_rows_correctable"] = corr_rows
+                fields["remapped_rows_uncorrectable"] = unc_rows
+                fields["remap_pending"] = bool(pending)
+                fields["remap_failure"] = bool(failure)
+
+        if (want is None or "pcie_replays" in want) and "pcie_replays" not in batched:
+            fields["pcie_replays"] = _nvml_or_none(pynvml.nvmlDeviceGetPcieReplayCounter, handle)
+
+        # Clocks and the reasons they are held below maximum
+        if want is None or "throttle" in want:
+            fields["throttle_reasons"] = _nvml_or_none(pynvml.nvmlDeviceGetCurrentClocksThrottleReasons, handle)
+        if want is None or "clocks" in want:
+            fields["sm_clock"] = _nvml_or_none(pynvml.nvmlDeviceGetClockInfo, handle, pynvml.NVML_CLOCK_SM)
+            fields["mem_clock"] = _nvml_or_none(pynvml.nvmlDeviceGetClockInfo, handle, pynvml.NVML_CLOCK_MEM)
+            fields["sm_clock_max"], fields["mem_clock_max"] = self._get_max_clocks(index, handle)
+
+        if want is None or "nvlink" in want:
+            nvlinks = self._collect_nvlinks(handle)
+            if nvlinks is not None:
+                fields["nvlinks"] = nvlinks
+                fields.update(nvlink_error_totals(nvlinks))
+
+        return DeviceSnapshot(**fields)
+
+    def _resolve_processes(self, index: int, handle, processes) -> tuple:
+        """
+        Attach command, cgroup owner and SM/memory utilization to NVML's
+        process list
+
+        Only utilization samples newer than the previous call are requested,
+        so the driver returns a handful of records per probe.
+        """
+        utilization = {}
+        if processes:
+            samples = _nvml_or_none(pynvml.nvmlDeviceGetProcessUtilization,
+                                    handle, self._process_util_seen.get(index, 0))
+            for sample in samples or ():
+                latest = utilization.get(sample.pid)
+                if latest is None or sample.timeStamp > latest.timeStamp:
+                    utilization[sample.pid] = sample
+            if utilization:
+                self._process_util_seen[index] = max(u.timeStamp for u in utilization.values())
+
+        records = []
+        for proc in processes:
+            record = gpu_processes.resolve_process(proc.pid, getattr(proc, "usedGpuMemory", None))
+            sample = utilization.get(proc.pid)
+            if sample is not None:
+                record = record._replace(sm_util=sample.smUtil, mem_util=sample.memUtil)
+            records.append(record)
+        return tuple(records)
+
+    def _collect_nvlinks(self, handle) -> Optional[tuple]:
+        """
+        State, error and utilization counters of every NVLink
+
+        Links are numbered contiguously, so enumeration stops at the first
+        link NVML rejects; counters are only read for active links.
+        """
+        links = []
+        for link in range(pynvml.NVML_NVLINK_MAX_LINKS):
             try:
-                temp = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
-                if temp < 85:
-                    gpu_checks.append({"check": "temperature", "status": "pass", "value": temp})
-                elif temp < 95:
-                    gpu_checks.append({"check": "temperature", "status": "warn", "value": temp})
-                else:
-                    gpu_checks.append({"check": "temperature", "status": "fail", "value": temp})
+                active = pynvml.nvmlDeviceGetNvLinkState(handle, link) == pynvml.NVML_FEATURE_ENABLED
             except pynvml.NVMLError:
-                gpu_checks.append({"check": "temperature", "status": "unknown"})
-
-            # ECC errors check
+                break
+            if not active:
+                links.append(NVLinkStatus(link, False))
+                continue
+            errors = [_nvml_or_none(pynvml.nvmlDeviceGetNvLinkErrorCounter, handle, link, counter)
+                      for _, counter in NVLINK_ERROR_COUNTERS]
+            utilization = _nvml_or_none(pynvml.nvmlDeviceGetNvLinkUtilizationCounter, handle, link, 0)
+            rx, tx = utilization if utilization is not None else (None, None)
+            links.append(NVLinkStatus(link, True, *errors, rx_counter=rx, tx_counter=tx))
+        return tuple(links) if links else None
+
+    def _sample_pcie_throughput(self, handle):
+        """Mean PCIe TX/RX KB/s over the sample window (each NVML read covers 20ms)"""
+        tx_total = rx_total = samples = 0
+        expires = time.monotonic() + self.pcie_sample_window
+        while True:
             try:
-                ecc_errors = pynvml.nvmlDeviceGetTotalEccErrors(
-                    handle, pynvml.NVML_MEMORY_ERROR_TYPE_UNCORRECTED, pynvml.NVML_VOLATILE_ECC
-                )
-                if ecc_errors == 0:
-                    gpu_checks.append({"check": "ecc_errors", "status": "pass", "value": 0})
-                else:
-                    gpu_checks.append({"check": "ecc_errors", "status": "fail", "value": ecc_errors})
+                tx_total += pynvml.nvmlDeviceGetPcieThroughput(handle, pynvml.NVML_PCIE_UTIL_TX_BYTES)
+                rx_total += pynvml.nvmlDeviceGetPcieThroughput(handle, pynvml.NVML_PCIE_UTIL_RX_BYTES)
             except pynvml.NVMLError:
-                gpu_checks.append({"check": "ecc_errors", "status": "n/a"})
+                return None, None
+            samples += 1
+            if time.monotonic() >= expires:
+                break
+        return tx_total // samples, rx_total // samples
+
+    def collect_snapshots(self) -> List[DeviceSnapshot]:
+        """Snapshot all GPUs on the node"""
+        if self.deadline is None:
+            return [self.collect_snapshot(i) for i in range(self.device_count)]
+        return self._collect_concurrently(self.deadline)
+
+    def _collect_concurrently(self, deadline: float) -> List[DeviceSnapshot]:
+        """
+        Snapshot every GPU on its own persistent worker, reporting any GPU
+        still inside NVML once the deadline has passed as "timeout"
+
+        A GPU whose previous call has not returned yet is reported as
+        "timeout" right away without queueing another call, so a hung GPU
+        costs one thread however long it stays hung. Workers are daemon
+        threads so a hung NVML call can never keep the process alive; the
+        wall time is bounded by the deadline.
+        """
+        jobs = []
+        with self._workers_lock:
+            for i in range(self.device_count):
+                worker = self._workers.get(i)
+                if worker is None:
+                    worker = self._workers[i] = _DeviceWorker(self, i)
+                jobs.append(None if worker.busy else worker.submit())
+
+        expires = time.monotonic() + deadline
+        snapshots = []
+        for i, job in enumerate(jobs):
+            if job is None or not job["done"].wait(max(0.0, expires - time.monotonic())):
+                snapshots.append(DeviceSnapshot(index=i, name="Unknown", uuid="Unknown", status="timeout"))
+            elif "error" in job:
+                print(f"Error collecting GPU {i}: {job['error']}", file=sys.stderr)
+                snapshots.append(DeviceSnapshot(index=i, name="Unknown", uuid="Unknown", status="error"))
+            else:
+                snapshots.append(job["result"])
+
+        return snapshots
 
-            # Power check
+    def check_gpu_info(self, index: int) -> Dict[str, Any]:
+        """Get detailed information for a specific GPU"""
+        return snapshot_to_info(self.collect_snapshot(index))
+
+    def perform_health_checks(self, snapshots: Optional[List[DeviceSnapshot]] = None) -> List[Dict[str, Any]]:
+        """Perform health checks on all GPUs, reusing snapshots when given"""
+        if snapshots is None:
+            snapshots = self.collect_snapshots()
+
+        counters = {}
+        if self.counter_state is not None:
+            counters = self.counter_state.update(snapshots, pcie_epoch=self.pcie_epoch())
+
+        import gpu_rules
+        rules = self.rules or gpu_rules.default_rules()
+        threshold_checks = rules.evaluate_batch(snapshots)
+
+        results = []
+        for snapshot, thresholds in zip(snapshots, threshold_checks):
+            busy_link = self._update_pcie_busy_link(snapshot, counters.get(snapshot.uuid, {}))
+            results.append(evaluate_health(snapshot, busy_link, self.job, thresholds))
+
+        # Error counters judged on deltas and rates since the previous run
+        if counters:
+            import gpu_counter_state
+            for snapshot, result in zip(snapshots, results):
+                if snapshot.uuid in counters:
+                    result["checks"] = [c for c in result["checks"] if c["check"] != "ecc_errors"]
+                    result["checks"].extend(gpu_counter_state.evaluate_counters(counters[snapshot.uuid]))
+
+        # XID/ECC events seen since the watcher started
+        if self.event_watcher is not None:
+            import gpu_events
+            by_gpu = self.event_watcher.events_by_gpu()
+            # An event no GPU could be resolved for may belong to any of them;
+            # counting it on each fails the node instead of dropping it
+            unattributed = by_gpu.get(-1, [])
+            for result in results:
+                result["checks"].extend(gpu_events.evaluate_events(
+                    by_gpu.get(result["gpu_index"], []) + unattributed, self.event_window))
+
+        if self.fields is not None or self.checks is not None:
+            for result in results:
+                result["checks"] = [c for c in result["checks"]
+                                    if c["status"] in ("timeout", "error") or self._check_selected(c["check"], rules)]
+
+        return results
+
+    def pcie_epoch(self) -> str:
+        """
+        Boot and driver identity; a link seen busy under another epoch (before
+        a reboot, reseat or driver change) says nothing about the link now
+        """
+        if self._pcie_epoch is None:
             try:
-                power = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000.0
-                power_limit = pynvml.nvmlDeviceGetPowerManagementLimit(handle) / 1000.0
-                power_percent = (power / power_limit) * 100
-
-                if power_percent < 95:
-                    gpu_checks.append({"check": "power", "status": "pass", "value": round(power, 2)})
-                else:
-                    gpu_checks.append({"check": "power", "status": "warn", "value": round(power, 2)})
-            except pynvml.NVMLError:
-                gpu_checks.append({"check": "power", "status": "unknown"})
-
-            checks.append({
-                "gpu_index": i,
-                "checks": gpu_checks
-            })
-
-        return checks
-
-    def generate_report(self, output_format: str = "json") -> str:
-        """Generate health check report"""
+                with open("/proc/sys/kernel/random/boot_id") as f:
+                    boot_id = f.read().strip()
+            except OSError:
+                boot_id = "unknown"
+            self._pcie_epoch = f"{boot_id}/{self.get_driver_version()}"
+        return self._pcie_epoch
+
+    def _update_pcie_busy_link(self, snapshot: DeviceSnapshot, counters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Newest busy link of this epoch from this snapshot, this process and the state file"""
+        epoch = self.pcie_epoch()
+        candidates = [self._pcie_busy_link.get(snapshot.uuid), counters.get("pcie_busy_link")]
+        if snapshot.util_gpu and snapshot.pcie_gen is not None:
+            candidates.append({"gen": snapshot.pcie_gen, "width": snapshot.pcie_width,
+                               "seen": time.time(), "epoch": epoch})
+        candidates = [link for link in candidates if link and link.get("epoch") == epoch]
+        latest = max(candidates, key=lambda link: link["seen"], default=None)
+        if latest is not None:
+            self._pcie_busy_link[snapshot.uuid] = latest
+        return latest
+
+    def start_event_watcher(self, max_events: int = 1024, window: Optional[float] = None):
+        """
+        Start blocking on NVML XID/ECC events; later reports include them,
+        and events of the last `window` seconds (default EVENT_WINDOW) are judged
+        """
+        import gpu_events
+        self.event_window = gpu_events.EVENT_WINDOW if window is None else window
+        source = gpu_events.NVMLEventSource(self)
+        self.event_watcher = gpu_events.EventWatcher(source, max_events).start()
+        return self.event_watcher
+
+    def build_report(self) -> Dict[str, Any]:
+        """Collect all GPUs and assemble the health report dict"""
         report = {
             "timestamp": datetime.utcnow().isoformat() + "Z",
             "driver_version": self.get_driver_version(),
@@ -209,12 +779,12 @@ class GPUHealthChecker:
             "health_checks": []
         }
 
-        # Collect GPU information
-        for i in range(self.device_count):
-            report["gpus"].append(self.check_gpu_info(i))
-
-        # Perform health checks
-        report["health_checks"] = self.perform_health_checks()
+        # Read every GPU once; info and verdicts both derive from the snapshot
+        snapshots = self.collect_snapshots()
+        report["gpus"] = [snapshot_to_info(snapshot) for snapshot in snapshots]
+        report["health_checks"] = self.perform_health_checks(snapshots)
+        if self.event_watcher is not None:
+            report["events"] = [event._asdict() for event in self.event_watcher.events()]
 
         # Determine overall status
         all_checks = []
@@ -222,19 +792,51 @@ class GPUHealthChecker:
             for check in gpu_check["checks"]:
                 all_checks.append(check.get("status", "unknown"))
 
-        if "fail" in all_checks:
+        if "fail" in all_checks or "timeout" in all_checks or "error" in all_checks:
             report["overall_status"] = "fail"
         elif "warn" in all_checks:
             report["overall_status"] = "warn"
         else:
             report["overall_status"] = "pass"
 
+        return report
+
+    def generate_report(self, output_format: str = "json") -> str:
+        """Generate health check report"""
+        report = self.build_report()
         if output_format == "json":
             return json.dumps(report, indent=2)
         else:
             return str(report)
 
 
+def watch(checker: GPUHealthChecker, args):
+    """Run the continuous telemetry loop until interrupted"""
+    import gpu_telemetry
+
+    if not (args.fields or args.checks):
+        # The time series need a handful of fields, not the NVLink walk or process owners
+        checker.select(list(gpu_telemetry.TELEMETRY_FIELDS))
+    windows = [float(w) for w in args.windows.split(",") if w]
+    store = gpu_telemetry.TelemetryStore(args.history)
+    sampler = gpu_telemetry.TelemetrySampler(checker.collect_snapshots, store, args.interval)
+    last_write = [time.monotonic()]
+
+    def on_tick(s):
+        if time.monotonic() - last_write[0] >= args.summary_interval:
+            gpu_telemetry.write_summary(args.output, s, windows)
+            last_write[0] = time.monotonic()
+            if args.verbose:
+                print(f"Telemetry: {json.dumps(s.cost())}")
+
+    print(f"Watching {checker.device_count} GPUs every {args.interval}s, summaries to {args.output}")
+    try:
+        sampler.run(on_tick=on_tick)
+    except KeyboardInterrupt:
+        gpu_telemetry.write_summary(args.output, sampler, windows)
+        print(f"\nStopped after {sampler.samples} samples: {json.dumps(sampler.cost())}")
+
+
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(
@@ -242,43 +844,156 @@ def main():
     )
     parser.add_argument(
         "-o", "--output",
-        default="/tmp/gpu_health.json",
-        help="Output file path (default: /tmp/gpu_health.json)"
+        help="Output file path, or - for stdout (default: /tmp/gpu_health.json, "
+             "/tmp/gpu_health_watch.json with --watch)"
     )
     parser.add_argument(
         "-f", "--format",
         default="json",
-        choices=["json"],
-        help="Output format (default: json)"
+        choices=["json", "ndjson", "binary"],
+        help="Output format: indented json, one record per line (ndjson) or "
+             "compact binary frames, see gpu_report_io.py (default: json)"
+    )
+    parser.add_argument(
+        "-d", "--deadline",
+        type=float,
+        default=10.0,
+        help="Per-GPU collection deadline in seconds; 0 reads GPUs serially (default: 10)"
     )
     parser.add_argument(
         "-v", "--verbose",
         action="store_true",
         help="Verbose output"
     )
+    parser.add_argument(
+        "--pcie-sample",
+        type=float,
+        default=0.0,
+        help="Seconds to sample PCIe TX/RX throughput per GPU (default: 0, off)"
+    )
+    parser.add_argument(
+        "--fields",
+        help=f"Comma-separated metric groups to collect (default: all but {', '.join(ON_REQUEST_FIELD_GROUPS)}): "
+             f"{', '.join(FIELD_GROUPS)}"
+    )
+    parser.add_argument(
+        "--checks",
+        help="Comma-separated health checks to run; collects only the metrics they need "
+             f"(default: all): {', '.join(CHECK_FIELDS)}"
+    )
+    parser.add_argument(
+        "-r", "--rules",
+        help="Threshold rules file (YAML or JSON, see gpu_rules.py)"
+    )
+    parser.add_argument(
+        "-j", "--job",
+        help="Flag GPU memory held outside this job (\"slurm:<id>\", \"container:<id>\", or \"auto\" "
+             "for SLURM_JOB_ID / this process's cgroup; skipped with a warning when neither identifies a job)"
+    )
+    parser.add_argument(
+        "-s", "--state",
+        help="Counter state file; ECC, retired page and PCIe replay checks then "
+             "use deltas and rates since the previous run (e.g. /var/lib/gpu-health/counters.json)"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Sample continuously into ring buffers and write window summaries to --output "
+             "(default: /tmp/gpu_health_watch.json)"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="Watch mode sampling interval in seconds (default: 1.0)"
+    )
+    parser.add_argument(
+        "--history",
+        type=int,
+        default=3600,
+        help="Watch mode samples kept per GPU and metric (default: 3600)"
+    )
+    parser.add_argument(
+        "--windows",
+        default="60,300,3600",
+        help="Watch mode summary windows in seconds, comma separated (default: 60,300,3600)"
+    )
+    parser.add_argument(
+        "--summary-interval",
+        type=float,
+        default=60.0,
+        help="Watch mode seconds between summary writes (default: 60)"
+    )
 
     args = parser.parse_args()
+    if args.output is None:
+        # Window summaries must not overwrite the one-shot report
+        args.output = "/tmp/gpu_health_watch.json" if args.watch else "/tmp/gpu_health.json"
 
     # Create health checker
-    checker = GPUHealthChecker()
-
-    # Generate report
-    report_str = checker.generate_report(args.format)
-
-    # Save to file
-    with open(args.output, 'w') as f:
-        f.write(report_str)
+    job = args.job
+    if job == "auto":
+        job = gpu_processes.current_job() if gpu_processes is not None else None
+        if job is None:
+            # Matching against "auto" would report every process as foreign
+            print("Warning: could not determine the current job, foreign process check skipped; "
+                  "pass --job explicitly", file=sys.stderr)
+    checker = GPUHealthChecker(deadline=args.deadline or None, pcie_sample_window=args.pcie_sample, job=job)
+    if args.rules:
+        import gpu_rules
+        try:
+            checker.rules = gpu_rules.load_rules(args.rules)
+        except (OSError, ValueError) as e:
+            print(f"Error loading rules: {e}", file=sys.stderr)
+            sys.exit(2)
+    if args.fields or args.checks:
+        try:
+            checker.select(args.fields.split(",") if args.fields else None,
+                           args.checks.split(",") if args.checks else None)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(2)
+    if args.state:
+        import gpu_counter_state
+        checker.counter_state = gpu_counter_state.CounterState(args.state)
+
+    if args.watch:
+        watch(checker, args)
+        return
+
+    # Generate report; the exit status comes from the dict, not the serialized text
+    report = checker.build_report()
+
+    # Save to file; with "-o -" the report goes to stdout and messages to stderr
+    to_stdout = args.output == "-"
+    if args.format == "binary":
+        f = sys.stdout.buffer if to_stdout else open(args.output, 'wb')
+    else:
+        f = sys.stdout if to_stdout else open(args.output, 'w')
+    try:
+        if args.format == "json":
+            json.dump(report, f, indent=2)
+            if to_stdout:
+                f.write("\n")
+        else:
+            import gpu_report_io
+            writer = gpu_report_io.write_ndjson if args.format == "ndjson" else gpu_report_io.write_binary
+            writer(report, f, socket.gethostname())
+    finally:
+        if to_stdout:
+            f.flush()
+        else:
+            f.close()
 
     # Print to stdout if verbose
-    if args.verbose:
-        print(report_str)
-
-    # Parse for exit code
-    report = json.loads(report_str)
-    print(f"\nGPU Health Check Complete")
-    print(f"Status: {report['overall_status']}")
-    print(f"GPUs: {report['gpu_count']}")
-    print(f"Report saved to: {args.output}")
+    messages = sys.stderr if to_stdout else sys.stdout
+    if args.verbose and not to_stdout:
+        print(json.dumps(report, indent=2))
+
+    print(f"\nGPU Health Check Complete", file=messages)
+    print(f"Status: {report['overall_status']}", file=messages)
+    print(f"GPUs: {report['gpu_count']}", file=messages)
+    print(f"Report saved to: {args.output}", file=messages)
 
     if report["overall_status"] == "fail":
         sys.exit(1)
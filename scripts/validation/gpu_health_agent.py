@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+GPU Health Agent
+Long-lived process that keeps NVML initialized and device handles cached,
+answering health/info queries over a Unix domain socket. The query client
+only needs the standard library and falls back to in-process collection
+through gpu_health.py when no agent is listening.
+
+Protocol: one JSON object per line in each direction, e.g.
+    -> {"query": "health"}
+    <- {"timestamp": "...", "gpu_count": 8, "health_checks": [...], ...}
+"""
+
+import argparse
+import errno
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_SOCKET = os.environ.get("GPU_HEALTH_SOCKET", "/run/gpu-health.sock")
+
+# Report keys returned for each query type (None: the whole report)
+QUERY_KEYS = {
+    "report": None,
+    "health": ("timestamp", "gpu_count", "health_checks", "events", "overall_status"),
+    "info": ("timestamp", "driver_version", "cuda_version", "gpu_count", "gpus"),
+}
+
+
+class HealthAgent:
+    """Answers queries from one GPUHealthChecker, sharing fresh reports"""
+
+    def __init__(self, checker, max_age: float = 1.0):
+        self.checker = checker
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._report = None
+        self._collected_at = 0.0
+
+    def report(self) -> Dict[str, Any]:
+        """Report no older than max_age; concurrent callers share one collection"""
+        with self._lock:
+            if self._report is None or time.monotonic() - self._collected_at > self.max_age:
+                self._report = self.checker.build_report()
+                self._collected_at = time.monotonic()
+            return self._report
+
+    def invalidate(self):
+        """Drop the shared report so the next query collects fresh data"""
+        with self._lock:
+            self._report = None
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one decoded request"""
+        query = request.get("query", "report")
+        if query == "ping":
+            return {"status": "ok", "gpu_count": self.checker.device_count, "pid": os.getpid()}
+        if query not in QUERY_KEYS:
+            return {"error": f"unknown query '{query}'"}
+
+        report = self.report()
+        keys = QUERY_KEYS[query]
+        if keys is None:
+            return report
+        return {key: report[key] for key in keys if key in report}
+
+
+class AgentRequestHandler(socketserver.StreamRequestHandler):
+    """Reads JSON requests line by line until the client disconnects"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.agent.handle(json.loads(line))
+            except ValueError as e:
+                response = {"error": f"invalid request: {e}"}
+            except Exception as e:
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class AgentServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, agent: HealthAgent):
+        # A stale socket from a previous run would make bind() fail, but one
+        # that still answers belongs to a live agent and must be left alone
+        if os.path.exists(socket_path):
+            if socket_in_use(socket_path):
+                raise OSError(errno.EADDRINUSE, f"a GPU health agent is already listening on {socket_path}")
+            os.unlink(socket_path)
+        super().__init__(socket_path, AgentRequestHandler)
+        self.agent = agent
+
+
+def socket_in_use(socket_path: str) -> bool:
+    """Whether something accepts connections on socket_path"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(1.0)
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def query_agent(query: str = "report", socket_path: str = DEFAULT_SOCKET,
+                timeout: float = 30.0) -> Optional[Dict[str, Any]]:
+    """Send one query to a running agent; None if no agent is reachable"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            sock.sendall(json.dumps({"query": query}).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as f:
+                line = f.readline()
+    except (FileNotFoundError, ConnectionRefusedError, socket.timeout, OSError):
+        return None
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def collect_in_process(query: str = "report", deadline: Optional[float] = 10.0) -> Dict[str, Any]:
+    """Answer a query without an agent, paying NVML init in this process"""
+    import gpu_health
+
+    checker = gpu_health.GPUHealthChecker(deadline=deadline)
+    return HealthAgent(checker, max_age=0).handle({"query": query})
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="GPU Health Agent - resident NVML health service"
+    )
+    parser.add_argument(
+        "command",
+        choices=["serve", "query"],
+        help="serve: run the agent; query: ask the agent (or collect in-process)"
+    )
+    parser.add_argument(
+        "-s", "--socket",
+        default=DEFAULT_SOCKET,
+        help=f"Unix socket path (default: {DEFAULT_SOCKET})"
+    )
+    parser.add_argument(
+        "-q", "--query",
+        default="report",
+        choices=["report", "health", "info", "ping"],
+        help="Query to send (default: report)"
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Also write the response JSON to this file"
+    )
+    parser.add_argument(
+        "-d", "--deadline",
+        type=float,
+        default=10.0,
+        help="Per-GPU collection deadline in seconds (default: 10)"
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=1.0,
+        help="Serve: reuse a report for this many seconds across queries (default: 1.0)"
+    )
+    parser.add_argument(
+        "--state",
+        help="Counter state file for delta/rate based ECC, page retirement and PCIe replay checks"
+    )
+    parser.add_argument(
+        "--events",
+        action="store_true",
+        help="Serve: watch NVML XID/ECC events and include them in reports"
+    )
+    parser.add_argument(
+        "--event-window",
+        type=float,
+        default=3600.0,
+        help="Serve: seconds an XID/ECC event counts towards the health verdict; 0 keeps every event (default: 3600)"
+    )
+    parser.add_argument(
+        "--no-fallback",
+        action="store_true",
+        help="Query: fail instead of collecting in-process when no agent is running"
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        import gpu_health
+
+        checker = gpu_health.GPUHealthChecker(deadline=args.deadline or None)
+        agent = HealthAgent(checker, args.max_age)
+        if args.state:
+            import gpu_counter_state
+            checker.counter_state = gpu_counter_state.CounterState(args.state)
+        if args.events:
+            # A new XID/ECC event must not wait out max_age to be reported
+            checker.start_event_watcher(window=args.event_window).on_event = lambda event: agent.invalidate()
+        try:
+            server = AgentServer(args.socket, agent)
+        except OSError as e:
+            print(f"Error: {e.strerror or e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"GPU health agent serving {checker.device_count} GPUs on {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.unlink(args.socket)
+        return
+
+    response = query_agent(args.query, args.socket)
+    if response is None:
+        if args.no_fallback:
+            print(f"Error: no GPU health agent listening on {args.socket}", file=sys.stderr)
+            sys.exit(2)
+        if args.query == "ping":
+            print(f"No GPU health agent listening on {args.socket}", file=sys.stderr)
+            sys.exit(1)
+        response = collect_in_process(args.query, args.deadline or None)
+
+    output = json.dumps(response, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+    if "error" in response or response.get("overall_status") == "fail":
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
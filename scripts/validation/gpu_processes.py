@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+GPU Process Accounting
+Resolves the compute processes NVML reports on a GPU to command names and
+the Slurm job or container they belong to, so memory left behind by an
+earlier job can be told apart from the current job's own processes.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+PROC_ROOT = "/proc"
+
+# Owners recognized in /proc/<pid>/cgroup paths, most specific first
+CGROUP_OWNERS = (
+    ("slurm", re.compile(r"/job_(\d+)(?:/|$)")),
+    ("kubernetes", re.compile(r"kubepods[^/]*/(?:[^/]+/)?pod([0-9a-f_-]{36})")),
+    ("container", re.compile(r"(?:docker|cri-containerd|crio|libpod)[-/]([0-9a-f]{12,64})")),
+)
+
+
+class GPUProcess(NamedTuple):
+    """One compute process on a GPU"""
+    pid: int
+    used_memory: Optional[int]     # bytes; None when the driver hides it
+    command: Optional[str] = None  # /proc/<pid>/comm; None outside our PID namespace
+    cgroup: Optional[str] = None
+    owner: Optional[str] = None    # e.g. "slurm:1234" or "container:<id>"
+    sm_util: Optional[int] = None  # percent over the last sample window
+    mem_util: Optional[int] = None
+
+
+def owner_of_cgroup(cgroup: str) -> Optional[str]:
+    """Slurm job, Kubernetes pod or container owning a cgroup path"""
+    for kind, pattern in CGROUP_OWNERS:
+        match = pattern.search(cgroup)
+        if match:
+            return f"{kind}:{match.group(1)[:12] if kind == 'container' else match.group(1)}"
+    return None
+
+
+def read_proc(pid: int, proc_root: str = PROC_ROOT):
+    """(command, cgroup) of a pid, with None for what cannot be read"""
+    base = os.path.join(proc_root, str(pid))
+    try:
+        with open(os.path.join(base, "comm")) as f:
+            command = f.read().strip()
+    except OSError:
+        return None, None
+    try:
+        with open(os.path.join(base, "cgroup")) as f:
+            # cgroup v2 has a single "0::<path>" line; on hybrid hosts it is
+            # often just "/" and the v1 controllers carry the job path
+            lines = [line.rstrip("\n").split(":", 2) for line in f if line.strip()]
+        paths = [path for hierarchy, _, path in sorted(lines, key=lambda l: l[0] != "0")]
+        cgroup = next((path for path in paths if path != "/"), paths[0] if paths else None)
+    except (OSError, ValueError):
+        cgroup = None
+    return command, cgroup
+
+
+def resolve_process(pid: int, used_memory: Optional[int], proc_root: str = PROC_ROOT) -> GPUProcess:
+    command, cgroup = read_proc(pid, proc_root)
+    owner = owner_of_cgroup(cgroup) if cgroup else None
+    return GPUProcess(pid, used_memory, command, cgroup, owner)
+
+
+def current_job(proc_root: str = PROC_ROOT) -> Optional[str]:
+    """Owner of this process: SLURM_JOB_ID if set, else our own cgroup"""
+    if os.environ.get("SLURM_JOB_ID"):
+        return f"slurm:{os.environ['SLURM_JOB_ID']}"
+    _, cgroup = read_proc(os.getpid(), proc_root)
+    return owner_of_cgroup(cgroup) if cgroup else None
+
+
+def evaluate_processes(processes: Optional[List[GPUProcess]], job: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    Flag GPU memory held by processes outside `job`
+
+    A process we cannot resolve lives in another PID namespace, which from
+    a job step on the host means another container, so it counts as
+    outside the job too.
+    """
+    if processes is None:
+        return [{"check": "foreign_processes", "status": "unknown"}]
+
+    foreign = [p for p in processes if p.owner != job]
+    held = sum(p.used_memory or 0 for p in foreign)
+    value = {
+        "job": job,
+        "memory_bytes": held,
+        "processes": [{"pid": p.pid, "command": p.command, "owner": p.owner, "used_memory": p.used_memory}
+                      for p in foreign]
+    }
+    return [{"check": "foreign_processes", "status": "warn" if foreign else "pass", "value": value}]
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+GPU Health Report Formats
+Streaming encodings of gpu_health.py reports for fleet aggregation, and a
+reader that walks any number of report files record by record.
+
+ndjson: one "node" line with the report header, then one "gpu" line per
+        GPU (info and checks) and one "event" line per XID/ECC event.
+binary: "GHR\\x01" followed by length-prefixed frames: a compact JSON node
+        header, then one fixed struct per GPU holding its metrics and
+        check statuses (check values are not kept; they follow from the
+        metrics). Over 20x smaller than the indented JSON report.
+
+Files of either format can be concatenated, and .gz files are read
+transparently.
+"""
+
+import argparse
+import gzip
+import json
+import struct
+import sys
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, TextIO
+
+import gpu_snapshot
+
+BINARY_MAGIC = b"GHR\x01"
+
+FRAME_HEADER = struct.Struct("<BI")   # frame type, payload length
+FRAME_NODE = 1
+FRAME_GPU = 2
+
+# Fixed part of a GPU frame: (DeviceSnapshot field, struct code); the
+# largest value of each code stands for "not available"
+GPU_RECORD_FIELDS = (
+    ("index", "H"),
+    ("temperature", "H"),
+    ("util_gpu", "B"),
+    ("util_memory", "B"),
+    ("power_draw_mw", "I"),
+    ("power_limit_mw", "I"),
+    ("memory_total", "Q"),
+    ("memory_free", "Q"),
+    ("memory_used", "Q"),
+    ("pcie_gen", "B"),
+    ("pcie_width", "B"),
+    ("pcie_max_gen", "B"),
+    ("pcie_max_width", "B"),
+    ("ecc_corrected", "Q"),
+    ("ecc_uncorrected", "Q"),
+    ("process_count", "H"),
+    ("retired_pages_sbe", "H"),
+    ("retired_pages_dbe", "H"),
+    ("remapped_rows_correctable", "I"),
+    ("remapped_rows_uncorrectable", "I"),
+    ("remap_pending", "B"),
+    ("remap_failure", "B"),
+    ("pcie_replays", "I"),
+    ("throttle_reasons", "Q"),
+    ("sm_clock", "H"),
+    ("sm_clock_max", "H"),
+    ("mem_clock", "H"),
+    ("mem_clock_max", "H"),
+    ("nvlink_replay_errors", "Q"),
+    ("nvlink_recovery_errors", "Q"),
+    ("nvlink_crc_errors", "Q"),
+)
+GPU_RECORD = struct.Struct("<" + "".join(code for _, code in GPU_RECORD_FIELDS) + "BB")
+_MISSING = tuple((1 << (8 * struct.calcsize(code))) - 1 for _, code in GPU_RECORD_FIELDS)
+
+STATUSES = ("pass", "warn", "fail", "unknown", "n/a", "timeout", "error")
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+SNAPSHOT_STATUSES = ("ok", "timeout", "error")
+
+
+def _node_header(report: Dict[str, Any], host: Optional[str]) -> Dict[str, Any]:
+    header = {"type": "node", "host": host}
+    for key in ("timestamp", "driver_version", "cuda_version", "gpu_count", "overall_status"):
+        header[key] = report.get(key)
+    return header
+
+
+def write_ndjson(report: Dict[str, Any], f: TextIO, host: Optional[str] = None):
+    """Write a report as NDJSON records, one line at a time"""
+    dumps = json.JSONEncoder(separators=(",", ":")).encode
+    f.write(dumps(_node_header(report, host)) + "\n")
+    checks_by_gpu = {c["gpu_index"]: c["checks"] for c in report.get("health_checks", [])}
+    for info in report.get("gpus", []):
+        f.write(dumps({"type": "gpu", "host": host, "index": info["index"], "info": info,
+                       "checks": checks_by_gpu.get(info["index"], [])}) + "\n")
+    for event in report.get("events", []):
+        f.write(dumps(dict(event, type="event", host=host)) + "\n")
+
+
+def write_binary(report: Dict[str, Any], f: BinaryIO, host: Optional[str] = None):
+    """Write a report as binary frames (see module docstring)"""
+    header = _node_header(report, host)
+    check_names = sorted({c["check"] for g in report.get("health_checks", []) for c in g["checks"]})
+    header["checks"] = check_names
+    if report.get("events"):
+        header["events"] = report["events"]
+    check_ids = {name: i for i, name in enumerate(check_names)}
+
+    payload = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    f.write(BINARY_MAGIC)
+    f.write(FRAME_HEADER.pack(FRAME_NODE, len(payload)) + payload)
+
+    checks_by_gpu = {c["gpu_index"]: c["checks"] for c in report.get("health_checks", [])}
+    for info in report.get("gpus", []):
+        snapshot = gpu_snapshot.info_to_snapshot(info)
+        values = []
+        for (field, _), missing in zip(GPU_RECORD_FIELDS, _MISSING):
+            value = getattr(snapshot, field)
+            values.append(missing if value is None or not 0 <= value < missing else int(value))
+        nvlink = info.get("nvlink")
+        active_links = nvlink["active_links"] if isinstance(nvlink, dict) else 0xFF
+        values.append(active_links)
+        values.append(SNAPSHOT_STATUSES.index(snapshot.status))
+
+        name = snapshot.name.encode("utf-8")[:255]
+        uuid = snapshot.uuid.encode("utf-8")[:255]
+        checks = checks_by_gpu.get(info["index"], [])
+        payload = b"".join((
+            GPU_RECORD.pack(*values),
+            bytes((len(name),)), name,
+            bytes((len(uuid),)), uuid,
+            bytes((len(checks),)),
+            bytes(b for c in checks for b in (check_ids[c["check"]], STATUS_CODES.get(c["status"], 3))),
+        ))
+        f.write(FRAME_HEADER.pack(FRAME_GPU, len(payload)) + payload)
+
+
+def _decode_gpu(payload: bytes, header: Dict[str, Any]) -> Dict[str, Any]:
+    values = GPU_RECORD.unpack_from(payload)
+    offset = GPU_RECORD.size
+    fields = {field: (None if value == missing else value)
+              for (field, _), value, missing in zip(GPU_RECORD_FIELDS, values, _MISSING)}
+    for flag in ("remap_pending", "remap_failure"):
+        if fields[flag] is not None:
+            fields[flag] = bool(fields[flag])
+    active_links, status = values[-2:]
+
+    strings = []
+    for _ in range(2):
+        length = payload[offset]
+        strings.append(payload[offset + 1:offset + 1 + length].decode("utf-8"))
+        offset += 1 + length
+    count = payload[offset]
+    pairs = payload[offset + 1:offset + 1 + 2 * count]
+    checks = [{"check": header["checks"][pairs[i]], "status": STATUSES[pairs[i + 1]]}
+              for i in range(0, len(pairs), 2)]
+
+    snapshot = gpu_snapshot.DeviceSnapshot(name=strings[0], uuid=strings[1],
+                                         status=SNAPSHOT_STATUSES[status], **fields)
+    info = gpu_snapshot.snapshot_to_info(snapshot)
+    if active_links != 0xFF and snapshot.status == "ok":
+        info["nvlink"] = {"active_links": active_links}
+    return {"type": "gpu", "host": header.get("host"), "index": snapshot.index, "info": info, "checks": checks}
+
+
+def _iter_binary(f: BinaryIO) -> Iterator[Dict[str, Any]]:
+    header = None
+    while True:
+        head = f.read(FRAME_HEADER.size)
+        if head[:len(BINARY_MAGIC)] == BINARY_MAGIC:
+            # Start of a concatenated file
+            head = head[len(BINARY_MAGIC):] + f.read(len(BINARY_MAGIC))
+        if len(head) < FRAME_HEADER.size:
+            return
+        frame_type, length = FRAME_HEADER.unpack(head)
+        payload = f.read(length)
+        if len(payload) < length:
+            raise ValueError("truncated binary report")
+        if frame_type == FRAME_NODE:
+            header = json.loads(payload)
+            events = header.pop("events", [])
+            yield {k: v for k, v in header.items() if k != "checks"}
+            for event in events:
+                yield dict(event, type="event", host=header.get("host"))
+        elif frame_type == FRAME_GPU:
+            if header is None:
+                raise ValueError("GPU frame before node header")
+            yield _decode_gpu(payload, header)
+
+
+def _iter_json_report(report: Dict[str, Any], host: Optional[str]) -> Iterator[Dict[str, Any]]:
+    yield _node_header(report, host)
+    checks_by_gpu = {c["gpu_index"]: c["checks"] for c in report.get("health_checks", [])}
+    for info in report.get("gpus", []):
+        yield {"type": "gpu", "host": host, "index": info["index"], "info": info,
+               "checks": checks_by_gpu.get(info["index"], [])}
+    for event in report.get("events", []):
+        yield dict(event, type="event", host=host)
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Records of one report file of any format
+
+    NDJSON and binary files are streamed; an indented JSON report has to
+    be loaded whole, and its records are tagged with the file name as host.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        if f.read(len(BINARY_MAGIC)) == BINARY_MAGIC:
+            yield from _iter_binary(f)
+            return
+    with opener(path, "rt", encoding="utf-8") as f:
+        first = f.readline()
+        if first.startswith('{"type"'):
+            yield json.loads(first)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        f.seek(0)
+        yield from _iter_json_report(json.load(f), path)
+
+
+def iter_fleet(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Records of many report files in turn, each tagged with its source file"""
+    for path in paths:
+        for record in iter_records(path):
+            record["source"] = path
+            yield record
+
+
+class FleetSummary:
+    """Fleet totals built one record at a time; only failing GPUs are kept"""
+
+    def __init__(self):
+        self.nodes = 0
+        self.gpus = 0
+        self.node_status = {}
+        self.check_status = {}
+        self.failing_gpus = []
+
+    def add(self, record: Dict[str, Any]):
+        if record["type"] == "node":
+            self.nodes += 1
+            status = record.get("overall_status")
+            self.node_status[status] = self.node_status.get(status, 0) + 1
+        elif record["type"] == "gpu":
+            self.gpus += 1
+            failed = []
+            for check in record["checks"]:
+                key = f"{check['check']}:{check['status']}"
+                self.check_status[key] = self.check_status.get(key, 0) + 1
+                if check["status"] in ("fail", "timeout", "error"):
+                    failed.append(check["check"])
+            if failed:
+                self.failing_gpus.append({"host": record.get("host") or record.get("source"),
+                                          "index": record["index"], "checks": failed})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"nodes": self.nodes, "gpus": self.gpus, "node_status": self.node_status,
+                "check_status": self.check_status, "failing_gpus": self.failing_gpus}
+
+
+def summarize(records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fleet totals in one pass over records"""
+    summary = FleetSummary()
+    for record in records:
+        summary.add(record)
+    return summary.as_dict()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="GPU Health Report Reader - stream and summarize fleet report files"
+    )
+    parser.add_argument(
+        "command",
+        choices=["summary", "cat"],
+        help="summary: fleet totals and failing GPUs; cat: print every record as NDJSON"
+    )
+    parser.add_argument(
+        "reports",
+        nargs="+",
+        help="Report files (json, ndjson or binary, optionally .gz)"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "cat":
+            for record in iter_fleet(args.reports):
+                sys.stdout.write(json.dumps(record, separators=(",", ":")) + "\n")
+            return
+        summary = summarize(iter_fleet(args.reports))
+    except (OSError, ValueError) as e:
+        print(f"Error reading reports: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    print(json.dumps(summary, indent=2))
+    sys.exit(1 if summary["failing_gpus"] else 0)
+
+
+if __name__ == "__main__":
+    main()
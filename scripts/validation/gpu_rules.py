@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+GPU Health Threshold Rules
+Threshold checks (temperature, ECC, power, clock throttling, ...) declared
+as data instead of if-chains, with per-architecture and per-model overrides
+keyed like GPU_BASELINES. Rules are compiled once per GPU model and
+evaluated column-wise over a batch of snapshots, so the same code judges
+one node's GPUs or the reports of a whole fleet on the control host.
+
+Rules file (YAML or JSON), merged over DEFAULT_RULES:
+    defaults:
+      temperature: {warn: 85, fail: 95}
+      memory_used: {metric: memory_used_percent, warn: 98}
+    models:
+      Hopper:                        # architecture, as in GPU_BASELINES
+        temperature: {warn: 83, fail: 90}
+      H100-PCIE-80GB:                # GPU_BASELINES model key
+        power: {warn: 90}
+      V100-PCIE-16GB:
+        clock_throttle: {enabled: false}
+
+A check is "fail" when its metric is >= fail, "warn" when >= warn (or when
+its escalate predicate holds), "pass" otherwise, and `missing` when the
+metric is unavailable.
+"""
+
+import argparse
+import copy
+import json
+import operator
+import sys
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import gpu_snapshot
+
+# Derived metrics; any other metric name is read from the DeviceSnapshot field
+METRICS = {
+    "power_percent": lambda s: (s.power_draw_mw / s.power_limit_mw) * 100
+    if s.power_draw_mw is not None and s.power_limit_mw else None,
+    "power_watts": lambda s: round(s.power_draw_mw / 1000.0, 2) if s.power_draw_mw is not None else None,
+    "memory_used_percent": lambda s: round((s.memory_used / s.memory_total) * 100, 2)
+    if s.memory_used is not None and s.memory_total else None,
+    "throttle_perf_loss": gpu_snapshot.estimate_perf_loss,
+    "throttle": lambda s: {
+        "perf_loss_percent": gpu_snapshot.estimate_perf_loss(s),
+        "reasons": gpu_snapshot.throttle_reason_names(s.throttle_reasons & ~gpu_snapshot.BENIGN_THROTTLE_REASONS)
+    },
+}
+
+# Snapshot fields behind each derived metric, for selective collection
+METRIC_FIELDS = {
+    "power_percent": ("power_draw_mw", "power_limit_mw"),
+    "power_watts": ("power_draw_mw",),
+    "memory_used_percent": ("memory_used", "memory_total"),
+    "throttle_perf_loss": ("throttle_reasons", "sm_clock", "sm_clock_max"),
+    "throttle": ("throttle_reasons", "sm_clock", "sm_clock_max"),
+}
+
+# Conditions that raise a passing check to "warn" regardless of thresholds
+PREDICATES = {
+    # Any clock loss caused by hardware slowdown (thermal, power brake)
+    "hw_throttle": lambda s: bool(s.throttle_reasons and s.throttle_reasons & gpu_snapshot.HW_THROTTLE_REASONS)
+    and (gpu_snapshot.estimate_perf_loss(s) or 0) > 0,
+}
+
+RULE_KEYS = ("metric", "warn", "fail", "report", "missing", "escalate", "enabled")
+
+DEFAULT_RULES = {
+    "defaults": {
+        "temperature": {"metric": "temperature", "warn": 85, "fail": 95},
+        "ecc_errors": {"metric": "ecc_uncorrected", "fail": 1, "missing": "n/a"},
+        "power": {"metric": "power_percent", "warn": 95, "report": "power_watts"},
+        "clock_throttle": {
+            "metric": "throttle_perf_loss",
+            "warn": gpu_snapshot.DEFAULT_THROTTLE_THRESHOLDS[0],
+            "fail": gpu_snapshot.DEFAULT_THROTTLE_THRESHOLDS[1],
+            "report": "throttle",
+            "escalate": "hw_throttle",
+        },
+    },
+    # Per-model throttle thresholds come from GPU_BASELINES
+    "models": {
+        model: {"clock_throttle": {"warn": baseline["throttle_loss_warn_pct"],
+                                   "fail": baseline["throttle_loss_fail_pct"]}}
+        for model, baseline in gpu_snapshot.GPU_BASELINES.items()
+        if "throttle_loss_warn_pct" in baseline
+    },
+}
+
+
+class CompiledRule(NamedTuple):
+    check: str
+    metric: Callable
+    report: Optional[Callable]
+    warn: Optional[float]
+    fail: Optional[float]
+    missing: str
+    escalate: Optional[Callable]
+
+
+def _metric(name: str) -> Callable:
+    if name in METRICS:
+        return METRICS[name]
+    if name in gpu_snapshot.DeviceSnapshot._fields:
+        return operator.attrgetter(name)
+    raise ValueError(f"unknown metric '{name}'")
+
+
+def _merge(base: Dict[str, Dict], overrides: Dict[str, Dict]) -> Dict[str, Dict]:
+    merged = copy.deepcopy(base)
+    for check, fields in (overrides or {}).items():
+        unknown = set(fields) - set(RULE_KEYS)
+        if unknown:
+            raise ValueError(f"unknown key(s) {sorted(unknown)} in rule '{check}'")
+        merged.setdefault(check, {}).update(fields)
+    return merged
+
+
+class RuleSet:
+    """Threshold rules with per-model compiled forms cached by device name"""
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None):
+        rules = rules or {}
+        self.defaults = _merge(DEFAULT_RULES["defaults"], rules.get("defaults"))
+        self.models = copy.deepcopy(DEFAULT_RULES["models"])
+        families = set(gpu_snapshot.GPU_BASELINES) | {
+            b["architecture"] for b in gpu_snapshot.GPU_BASELINES.values() if "architecture" in b
+        }
+        for family, checks in (rules.get("models") or {}).items():
+            if family not in families:
+                raise ValueError(f"unknown model family '{family}'")
+            self.models[family] = _merge(self.models.get(family, {}), checks)
+        self._compiled = {}
+        # Fail at load time, not on the first GPU of that model
+        for family in [None] + list(self.models):
+            self._compile_family(family)
+
+    def _compile_family(self, model: Optional[str]) -> tuple:
+        architecture = gpu_snapshot.GPU_BASELINES.get(model, {}).get("architecture")
+        checks = self.defaults
+        for family in (architecture, model):
+            if family in self.models:
+                checks = _merge(checks, self.models[family])
+
+        compiled = []
+        for check, rule in checks.items():
+            if not rule.get("enabled", True):
+                continue
+            if "metric" not in rule:
+                raise ValueError(f"rule '{check}' has no metric")
+            escalate = rule.get("escalate")
+            if escalate is not None and escalate not in PREDICATES:
+                raise ValueError(f"unknown escalate predicate '{escalate}' in rule '{check}'")
+            compiled.append(CompiledRule(
+                check,
+                _metric(rule["metric"]),
+                _metric(rule["report"]) if rule.get("report") else None,
+                rule.get("warn"),
+                rule.get("fail"),
+                rule.get("missing", "unknown"),
+                PREDICATES[escalate] if escalate else None,
+            ))
+        return tuple(compiled)
+
+    def snapshot_fields(self, check: str) -> Optional[tuple]:
+        """DeviceSnapshot fields a rule reads, or None if no rule has that name"""
+        rule = self.defaults.get(check)
+        if rule is None:
+            rule = next((checks[check] for checks in self.models.values()
+                         if check in checks and "metric" in checks[check]), None)
+        if rule is None or "metric" not in rule:
+            return None
+        return METRIC_FIELDS.get(rule["metric"], (rule["metric"],))
+
+    def compiled(self, name: str) -> tuple:
+        """Compiled rules for an NVML device name"""
+        rules = self._compiled.get(name)
+        if rules is None:
+            rules = self._compiled[name] = self._compile_family(gpu_snapshot.gpu_model_key(name))
+        return rules
+
+    def evaluate(self, snapshot) -> List[Dict[str, Any]]:
+        return self.evaluate_batch([snapshot])[0]
+
+    def evaluate_batch(self, snapshots: List) -> List[List[Dict[str, Any]]]:
+        """
+        Threshold checks for every snapshot, in input order
+
+        Snapshots are grouped by model and each rule runs over its group's
+        metric column at once, with thresholds bound outside the loop.
+        Snapshots that were not collected get no threshold checks.
+        """
+        results = [[] for _ in snapshots]
+        groups = {}
+        for position, snapshot in enumerate(snapshots):
+            if snapshot.status == "ok":
+                groups.setdefault(snapshot.name, []).append(position)
+
+        for name, positions in groups.items():
+            group = [snapshots[p] for p in positions]
+            for rule in self.compiled(name):
+                check, warn, fail, missing, escalate = rule.check, rule.warn, rule.fail, rule.missing, rule.escalate
+                values = list(map(rule.metric, group))
+                if rule.report is not None:
+                    reports = [rule.report(s) if v is not None else None for s, v in zip(group, values)]
+                else:
+                    reports = values
+                for position, snapshot, value, reported in zip(positions, group, values, reports):
+                    if value is None:
+                        results[position].append({"check": check, "status": missing})
+                        continue
+                    if fail is not None and value >= fail:
+                        status = "fail"
+                    elif (warn is not None and value >= warn) or (escalate is not None and escalate(snapshot)):
+                        status = "warn"
+                    else:
+                        status = "pass"
+                    results[position].append({"check": check, "status": status, "value": reported})
+        return results
+
+
+def load_rules(path: str) -> RuleSet:
+    """RuleSet from a YAML (needs PyYAML) or JSON rules file"""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("PyYAML is required for YAML rules files (pip install pyyaml)")
+            rules = yaml.safe_load(f)
+        else:
+            rules = json.load(f)
+    return RuleSet(rules or {})
+
+
+_default_rules = None
+
+
+def default_rules() -> RuleSet:
+    """Shared RuleSet built from DEFAULT_RULES"""
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = RuleSet()
+    return _default_rules
+
+
+def evaluate_reports(reports: Iterable[Dict[str, Any]], rules: RuleSet) -> List[List[List[Dict[str, Any]]]]:
+    """Threshold checks for the GPUs of many node reports in one batch"""
+    reports = list(reports)
+    snapshots, owners = [], []
+    for node, report in enumerate(reports):
+        for info in report.get("gpus", []):
+            snapshots.append(gpu_snapshot.info_to_snapshot(info))
+            owners.append(node)
+    checks = rules.evaluate_batch(snapshots)
+
+    results = [[] for _ in reports]
+    for node, snapshot, gpu_checks in zip(owners, snapshots, checks):
+        results[node].append({"gpu_index": snapshot.index, "checks": gpu_checks})
+    return results
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="GPU Health Rules - re-judge saved gpu_health.py reports against threshold rules"
+    )
+    parser.add_argument(
+        "reports",
+        nargs="+",
+        help="gpu_health.py JSON reports, one per node"
+    )
+    parser.add_argument(
+        "-r", "--rules",
+        help="Rules file (YAML or JSON); default: built-in rules"
+    )
+    parser.add_argument(
+        "-a", "--all",
+        action="store_true",
+        help="List passing GPUs too"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        rules = load_rules(args.rules) if args.rules else default_rules()
+    except (OSError, ValueError) as e:
+        print(f"Error loading rules: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    reports = []
+    for path in args.reports:
+        try:
+            with open(path) as f:
+                reports.append(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Error reading {path}: {e}", file=sys.stderr)
+            reports.append({})
+
+    failed = False
+    for path, node_checks in zip(args.reports, evaluate_reports(reports, rules)):
+        for gpu in node_checks:
+            bad = [c for c in gpu["checks"] if c["status"] in ("warn", "fail")]
+            failed = failed or any(c["status"] == "fail" for c in bad)
+            if bad or args.all:
+                summary = ", ".join(f"{c['check']}={c['status']}" for c in bad) or "pass"
+                print(f"{path} GPU {gpu['gpu_index']}: {summary}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+GPU Device Snapshots
+The DeviceSnapshot record gpu_health.py reads from NVML, its conversion
+to and from the check_gpu_info report schema, and the throttle and
+baseline helpers judging it. Kept free of NVML and of gpu_health so
+gpu_rules.py and gpu_report_io.py can use it whether gpu_health.py runs
+as a script or is imported.
+"""
+
+import os
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils"))
+try:
+    from performance_baselines import GPU_BASELINES, resolve_gpu_model
+except ImportError:
+    # The validation scripts copied to a node on their own
+    GPU_BASELINES = {}
+
+    def resolve_gpu_model(name: str) -> Optional[str]:
+        return None
+
+
+# Throttle reasons that say nothing about lost performance
+BENIGN_THROTTLE_REASONS = 0x0001 | 0x0002 | 0x0100   # GpuIdle, ApplicationsClocksSetting, DisplayClockSetting
+
+THROTTLE_REASON_NAMES = {
+    0x0001: "gpu_idle",
+    0x0002: "applications_clocks_setting",
+    0x0004: "sw_power_cap",
+    0x0008: "hw_slowdown",
+    0x0010: "sync_boost",
+    0x0020: "sw_thermal_slowdown",
+    0x0040: "hw_thermal_slowdown",
+    0x0080: "hw_power_brake_slowdown",
+    0x0100: "display_clock_setting",
+}
+
+# Reasons pointing at hardware or cooling rather than workload or policy
+HW_THROTTLE_REASONS = 0x0008 | 0x0040 | 0x0080
+
+# Used when the GPU model has no entry in GPU_BASELINES
+DEFAULT_THROTTLE_THRESHOLDS = (10, 25)
+
+
+# Selectable collection groups (--fields) and the snapshot fields each fills;
+# group names double as the section keys of check_gpu_info
+FIELD_GROUPS = {
+    "memory": ("memory_total", "memory_free", "memory_used"),
+    "temperature": ("temperature",),
+    "utilization": ("util_gpu", "util_memory"),
+    "power": ("power_draw_mw", "power_limit_mw"),
+    "pcie": ("pcie_gen", "pcie_width", "pcie_max_gen", "pcie_max_width", "pcie_tx_kbs", "pcie_rx_kbs"),
+    "ecc_errors": ("ecc_corrected", "ecc_uncorrected"),
+    "processes": ("process_count", "processes"),
+    "retired_pages": ("retired_pages_sbe", "retired_pages_dbe"),
+    "remapped_rows": ("remapped_rows_correctable", "remapped_rows_uncorrectable", "remap_pending", "remap_failure"),
+    "pcie_replays": ("pcie_replays",),
+    "clocks": ("sm_clock", "sm_clock_max", "mem_clock", "mem_clock_max"),
+    "throttle": ("throttle_reasons",),
+    "nvlink": ("nvlinks", "nvlink_replay_errors", "nvlink_recovery_errors", "nvlink_crc_errors"),
+}
+
+# Groups read only when --fields or --checks ask for them: the NVLink walk
+# costs four calls per link, ~73 per GPU on 18 links, several times the
+# rest of a probe
+ON_REQUEST_FIELD_GROUPS = frozenset({"nvlink"})
+DEFAULT_FIELD_GROUPS = frozenset(FIELD_GROUPS) - ON_REQUEST_FIELD_GROUPS
+
+
+def groups_of_fields(snapshot_fields) -> frozenset:
+    """Collection groups that fill the given DeviceSnapshot fields"""
+    return frozenset(group for group, members in FIELD_GROUPS.items()
+                     if any(field in members for field in snapshot_fields))
+
+
+class NVLinkStatus(NamedTuple):
+    """State and counters of one NVLink"""
+    link: int
+    active: bool
+    replay_errors: Optional[int] = None
+    recovery_errors: Optional[int] = None
+    crc_flit_errors: Optional[int] = None
+    crc_data_errors: Optional[int] = None
+    # Utilization counter 0; None when the driver does not expose it (Hopper)
+    rx_counter: Optional[int] = None
+    tx_counter: Optional[int] = None
+
+
+class DeviceSnapshot(NamedTuple):
+    """One NVML read of a GPU; None marks a value NVML could not report"""
+    index: int
+    name: str
+    uuid: str
+    memory_total: Optional[int] = None
+    memory_free: Optional[int] = None
+    memory_used: Optional[int] = None
+    temperature: Optional[int] = None
+    util_gpu: Optional[int] = None
+    util_memory: Optional[int] = None
+    power_draw_mw: Optional[int] = None
+    power_limit_mw: Optional[int] = None
+    pcie_gen: Optional[int] = None
+    pcie_width: Optional[int] = None
+    pcie_max_gen: Optional[int] = None
+    pcie_max_width: Optional[int] = None
+    ecc_corrected: Optional[int] = None
+    ecc_uncorrected: Optional[int] = None
+    process_count: Optional[int] = None
+    # GPUProcess records; None when NVML or gpu_processes is unavailable
+    processes: Optional[tuple] = None
+    retired_pages_sbe: Optional[int] = None
+    retired_pages_dbe: Optional[int] = None
+    remapped_rows_correctable: Optional[int] = None
+    remapped_rows_uncorrectable: Optional[int] = None
+    remap_pending: Optional[bool] = None
+    remap_failure: Optional[bool] = None
+    pcie_replays: Optional[int] = None
+    throttle_reasons: Optional[int] = None
+    sm_clock: Optional[int] = None
+    sm_clock_max: Optional[int] = None
+    mem_clock: Optional[int] = None
+    mem_clock_max: Optional[int] = None
+    pcie_tx_kbs: Optional[int] = None
+    pcie_rx_kbs: Optional[int] = None
+    # Every link NVML enumerates; None on GPUs without NVLink
+    nvlinks: Optional[tuple] = None
+    # Error counters summed over all links, tracked between runs
+    nvlink_replay_errors: Optional[int] = None
+    nvlink_recovery_errors: Optional[int] = None
+    nvlink_crc_errors: Optional[int] = None
+    # FIELD_GROUPS that were read; None means all of them
+    collected: Optional[frozenset] = None
+    # "ok", "timeout" when the device missed its collection deadline, or
+    # "error" when NVML failed for it (e.g. NVML_ERROR_GPU_IS_LOST)
+    status: str = "ok"
+
+
+def gpu_model_key(name: str) -> Optional[str]:
+    """GPU_BASELINES key for an NVML device name such as 'NVIDIA A100-SXM4-80GB'"""
+    if isinstance(name, bytes):
+        name = name.decode()
+    return resolve_gpu_model(name)
+
+
+def gpu_baseline_for(name: str) -> Dict[str, Any]:
+    """GPU_BASELINES entry for an NVML device name, or {} if unknown"""
+    return GPU_BASELINES.get(gpu_model_key(name), {})
+
+
+def throttle_reason_names(mask: int) -> List[str]:
+    return [name for bit, name in sorted(THROTTLE_REASON_NAMES.items()) if mask & bit]
+
+
+def estimate_perf_loss(snapshot: DeviceSnapshot) -> Optional[float]:
+    """
+    Percent of SM clock lost to throttling, or None if unknown
+
+    Idle GPUs and policy clocks are not counted as loss; otherwise the
+    loss is how far the SM clock sits below its maximum.
+    """
+    if snapshot.throttle_reasons is None or not snapshot.sm_clock_max or snapshot.sm_clock is None:
+        return None
+    if not snapshot.throttle_reasons & ~BENIGN_THROTTLE_REASONS:
+        return 0.0
+    return round(max(0.0, 1 - snapshot.sm_clock / snapshot.sm_clock_max) * 100, 1)
+
+
+def nvlink_error_totals(nvlinks) -> Dict[str, int]:
+    """Snapshot error totals summed over the active links, when all are known"""
+    totals = {}
+    for field, counters in (("nvlink_replay_errors", ("replay_errors",)),
+                            ("nvlink_recovery_errors", ("recovery_errors",)),
+                            ("nvlink_crc_errors", ("crc_flit_errors", "crc_data_errors"))):
+        values = [getattr(link, c) for link in nvlinks if link.active for c in counters]
+        if values and None not in values:
+            totals[field] = sum(values)
+    return totals
+
+
+def snapshot_to_info(snapshot: DeviceSnapshot) -> Dict[str, Any]:
+    """Render a snapshot in the check_gpu_info report schema"""
+    info = {
+        "index": snapshot.index,
+        "name": snapshot.name,
+        "uuid": snapshot.uuid,
+    }
+
+    if snapshot.status != "ok":
+        info["status"] = snapshot.status
+        return info
+
+    if snapshot.memory_total is not None:
+        info["memory"] = {
+            "total": snapshot.memory_total,
+            "free": snapshot.memory_free,
+            "used": snapshot.memory_used,
+            "utilization_percent": round((snapshot.memory_used / snapshot.memory_total) * 100, 2)
+        }
+    else:
+        info["memory"] = "N/A"
+
+    if snapshot.temperature is not None:
+        info["temperature"] = {"gpu": snapshot.temperature, "unit": "C"}
+    else:
+        info["temperature"] = "N/A"
+
+    if snapshot.util_gpu is not None:
+        info["utilization"] = {"gpu": snapshot.util_gpu, "memory": snapshot.util_memory}
+    else:
+        info["utilization"] = "N/A"
+
+    if snapshot.power_draw_mw is not None and snapshot.power_limit_mw is not None:
+        info["power"] = {
+            "draw": round(snapshot.power_draw_mw / 1000.0, 2),
+            "limit": round(snapshot.power_limit_mw / 1000.0, 2),
+            "unit": "W"
+        }
+    else:
+        info["power"] = "N/A"
+
+    if snapshot.pcie_max_width is not None:
+        info["pcie"] = {
+            "current_gen": snapshot.pcie_gen,
+            "current_width": snapshot.pcie_width,
+            "max_gen": snapshot.pcie_max_gen,
+            "max_width": snapshot.pcie_max_width
+        }
+        if snapshot.pcie_tx_kbs is not None:
+            info["pcie"]["tx_kbs"] = snapshot.pcie_tx_kbs
+            info["pcie"]["rx_kbs"] = snapshot.pcie_rx_kbs
+    else:
+        info["pcie"] = "N/A"
+
+    if snapshot.ecc_corrected is not None and snapshot.ecc_uncorrected is not None:
+        info["ecc_errors"] = {
+            "corrected": snapshot.ecc_corrected,
+            "uncorrected": snapshot.ecc_uncorrected
+        }
+    else:
+        info["ecc_errors"] = "N/A"
+
+    info["processes"] = snapshot.process_count
+    if snapshot.processes is not None:
+        info["process_details"] = [p._asdict() for p in snapshot.processes]
+
+    if snapshot.retired_pages_sbe is not None:
+        info["retired_pages"] = {
+            "single_bit": snapshot.retired_pages_sbe,
+            "double_bit": snapshot.retired_pages_dbe
+        }
+    else:
+        info["retired_pages"] = "N/A"
+
+    if snapshot.remapped_rows_correctable is not None:
+        info["remapped_rows"] = {
+            "correctable": snapshot.remapped_rows_correctable,
+            "uncorrectable": snapshot.remapped_rows_uncorrectable,
+            "pending": snapshot.remap_pending,
+            "failure": snapshot.remap_failure
+        }
+    else:
+        info["remapped_rows"] = "N/A"
+
+    info["pcie_replays"] = snapshot.pcie_replays if snapshot.pcie_replays is not None else "N/A"
+
+    if snapshot.sm_clock is not None:
+        info["clocks"] = {
+            "sm": snapshot.sm_clock,
+            "sm_max": snapshot.sm_clock_max,
+            "memory": snapshot.mem_clock,
+            "memory_max": snapshot.mem_clock_max,
+            "unit": "MHz"
+        }
+    else:
+        info["clocks"] = "N/A"
+
+    if snapshot.throttle_reasons is not None:
+        info["throttle"] = {
+            "reasons": throttle_reason_names(snapshot.throttle_reasons),
+            "perf_loss_percent": estimate_perf_loss(snapshot)
+        }
+    else:
+        info["throttle"] = "N/A"
+
+    if snapshot.nvlinks is not None:
+        info["nvlink"] = {
+            "active_links": sum(1 for link in snapshot.nvlinks if link.active),
+            "links": [link._asdict() for link in snapshot.nvlinks]
+        }
+    else:
+        info["nvlink"] = "N/A"
+
+    # Sections that were not requested are left out rather than "N/A"
+    if snapshot.collected is not None:
+        for group in FIELD_GROUPS:
+            if group not in snapshot.collected:
+                info.pop(group, None)
+        if "processes" not in snapshot.collected:
+            info.pop("process_details", None)
+
+    return info
+
+
+def info_to_snapshot(info: Dict[str, Any]) -> DeviceSnapshot:
+    """Rebuild a DeviceSnapshot from a check_gpu_info entry of a saved report"""
+    def section(key):
+        value = info.get(key)
+        return value if isinstance(value, dict) else {}
+
+    memory, power, pcie = section("memory"), section("power"), section("pcie")
+    ecc, clocks, throttle = section("ecc_errors"), section("clocks"), section("throttle")
+    pages, rows = section("retired_pages"), section("remapped_rows")
+    fields = {
+        "index": info["index"],
+        "name": info["name"],
+        "uuid": info["uuid"],
+        "status": info.get("status", "ok"),
+        "memory_total": memory.get("total"),
+        "memory_free": memory.get("free"),
+        "memory_used": memory.get("used"),
+        "temperature": section("temperature").get("gpu"),
+        "util_gpu": section("utilization").get("gpu"),
+        "util_memory": section("utilization").get("memory"),
+        "power_draw_mw": round(power["draw"] * 1000) if "draw" in power else None,
+        "power_limit_mw": round(power["limit"] * 1000) if "limit" in power else None,
+        "pcie_gen": pcie.get("current_gen"),
+        "pcie_width": pcie.get("current_width"),
+        "pcie_max_gen": pcie.get("max_gen"),
+        "pcie_max_width": pcie.get("max_width"),
+        "ecc_corrected": ecc.get("corrected"),
+        "ecc_uncorrected": ecc.get("uncorrected"),
+        "process_count": info.get("processes"),
+        "retired_pages_sbe": pages.get("single_bit"),
+        "retired_pages_dbe": pages.get("double_bit"),
+        "remapped_rows_correctable": rows.get("correctable"),
+        "remapped_rows_uncorrectable": rows.get("uncorrectable"),
+        "remap_pending": rows.get("pending"),
+        "remap_failure": rows.get("failure"),
+        "sm_clock": clocks.get("sm"),
+        "sm_clock_max": clocks.get("sm_max"),
+        "mem_clock": clocks.get("memory"),
+        "mem_clock_max": clocks.get("memory_max"),
+    }
+    if isinstance(info.get("pcie_replays"), int):
+        fields["pcie_replays"] = info["pcie_replays"]
+    if "reasons" in throttle:
+        bits = {name: bit for bit, name in THROTTLE_REASON_NAMES.items()}
+        fields["throttle_reasons"] = sum(bits.get(name, 0) for name in throttle["reasons"])
+    if "links" in section("nvlink"):
+        fields["nvlinks"] = tuple(NVLinkStatus(**link) for link in info["nvlink"]["links"])
+        fields.update(nvlink_error_totals(fields["nvlinks"]))
+    return DeviceSnapshot(**fields)
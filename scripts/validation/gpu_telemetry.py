@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+GPU Telemetry Ring Buffers
+Fixed-size, array-backed time series for continuous GPU sampling.
+Used by gpu_health.py --watch so memory stays flat however long it runs.
+"""
+
+import array
+import json
+import math
+import os
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Metrics sampled per GPU: name -> function of a gpu_health.DeviceSnapshot
+TELEMETRY_METRICS = {
+    "temperature": lambda s: s.temperature,
+    "util_gpu": lambda s: s.util_gpu,
+    "util_memory": lambda s: s.util_memory,
+    "power_draw": lambda s: s.power_draw_mw / 1000.0 if s.power_draw_mw is not None else None,
+    "memory_used": lambda s: s.memory_used,
+}
+
+# gpu_health.FIELD_GROUPS the metrics need; --watch collects only these
+# unless --fields or --checks ask for more
+TELEMETRY_FIELDS = ("memory", "temperature", "utilization", "power")
+
+DEFAULT_WINDOWS = (60, 300, 3600)
+
+
+class RingBuffer:
+    """Fixed-capacity circular buffer of numbers backed by array.array"""
+
+    def __init__(self, capacity: int, typecode: str = "d"):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._data = array.array(typecode, [math.nan]) * capacity
+        self._head = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value: Optional[float]):
+        """Store a value, overwriting the oldest once full; None becomes NaN"""
+        self._data[self._head] = math.nan if value is None else value
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def values(self, last: Optional[int] = None) -> List[float]:
+        """Return the newest `last` values (default: all) oldest first"""
+        n = self._count if last is None else min(last, self._count)
+        start = (self._head - n) % self.capacity
+        if start + n <= self.capacity:
+            return self._data[start:start + n].tolist()
+        return self._data[start:].tolist() + self._data[:self._head].tolist()
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.itemsize * self.capacity
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile (0-100) of an ascending sequence"""
+    if not sorted_values:
+        return math.nan
+    pos = (len(sorted_values) - 1) * q / 100.0
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    """min/max/mean/p50/p95/p99 of the non-NaN values"""
+    clean = sorted(v for v in values if not math.isnan(v))
+    if not clean:
+        return {"count": 0}
+    return {
+        "count": len(clean),
+        "min": round(clean[0], 2),
+        "max": round(clean[-1], 2),
+        "mean": round(sum(clean) / len(clean), 2),
+        "p50": round(percentile(clean, 50), 2),
+        "p95": round(percentile(clean, 95), 2),
+        "p99": round(percentile(clean, 99), 2),
+    }
+
+
+class TelemetryStore:
+    """Per-GPU, per-metric ring buffers sharing one timestamp ring per GPU"""
+
+    def __init__(self, capacity: int, metrics: Sequence[str] = tuple(TELEMETRY_METRICS)):
+        self.capacity = capacity
+        self.metrics = tuple(metrics)
+        self._timestamps = {}  # gpu index -> RingBuffer of time.monotonic() seconds
+        self._series = {}      # (gpu index, metric) -> RingBuffer (float32)
+
+    def record(self, snapshots, timestamp: Optional[float] = None):
+        """Append one sample of every GPU in `snapshots` (timestamp: time.monotonic())"""
+        now = time.monotonic() if timestamp is None else timestamp
+        for snapshot in snapshots:
+            ts = self._timestamps.get(snapshot.index)
+            if ts is None:
+                ts = self._timestamps[snapshot.index] = RingBuffer(self.capacity)
+                for metric in self.metrics:
+                    self._series[(snapshot.index, metric)] = RingBuffer(self.capacity, "f")
+            ts.append(now)
+            ok = snapshot.status == "ok"
+            for metric in self.metrics:
+                value = TELEMETRY_METRICS[metric](snapshot) if ok else None
+                self._series[(snapshot.index, metric)].append(value)
+
+    def gpus(self) -> List[int]:
+        return sorted(self._timestamps)
+
+    def window(self, gpu: int, metric: str, seconds: Optional[float] = None,
+               now: Optional[float] = None) -> List[float]:
+        """Values of one series recorded within the last `seconds` (default: all)"""
+        series = self._series[(gpu, metric)]
+        if seconds is None:
+            return series.values()
+        # Monotonic, so a wall clock step (NTP, manual set) cannot empty or stretch a window
+        cutoff = (time.monotonic() if now is None else now) - seconds
+        stamps = self._timestamps[gpu].values()
+        # Timestamps are monotonic within a ring, so count from the newest end
+        n = 0
+        for stamp in reversed(stamps):
+            if stamp < cutoff:
+                break
+            n += 1
+        return series.values(n)
+
+    def window_stats(self, gpu: int, metric: str, seconds: Optional[float] = None,
+                     now: Optional[float] = None) -> Dict[str, float]:
+        return summarize(self.window(gpu, metric, seconds, now))
+
+    def summary(self, windows: Sequence[float] = DEFAULT_WINDOWS) -> Dict[str, Dict]:
+        """Window statistics of every series, keyed by GPU, window and metric"""
+        now = time.monotonic()
+        result = {}
+        for gpu in self.gpus():
+            result[str(gpu)] = {
+                f"{int(seconds)}s": {
+                    metric: self.window_stats(gpu, metric, seconds, now) for metric in self.metrics
+                }
+                for seconds in windows
+            }
+        return result
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by all ring buffers (constant once every GPU is seen)"""
+        return sum(rb.nbytes for rb in self._timestamps.values()) + \
+            sum(rb.nbytes for rb in self._series.values())
+
+
+class TelemetrySampler:
+    """Fixed-rate sampling loop that records snapshots and its own CPU cost"""
+
+    def __init__(self, sample_fn: Callable, store: TelemetryStore, interval: float = 1.0):
+        self.sample_fn = sample_fn
+        self.store = store
+        self.interval = interval
+        self.samples = 0
+        self.cpu_seconds = 0.0
+
+    def sample_once(self):
+        """Take one sample and account the CPU time it cost this process"""
+        cpu_start = time.process_time()
+        self.store.record(self.sample_fn())
+        self.cpu_seconds += time.process_time() - cpu_start
+        self.samples += 1
+
+    def cost(self) -> Dict[str, float]:
+        """Measured per-sample CPU cost and the share of a core at this rate"""
+        per_sample = self.cpu_seconds / self.samples if self.samples else 0.0
+        return {
+            "samples": self.samples,
+            "cpu_ms_per_sample": round(per_sample * 1000, 3),
+            "core_percent_at_rate": round(per_sample / self.interval * 100, 4),
+            "buffer_bytes": self.store.nbytes,
+        }
+
+    def run(self, duration: Optional[float] = None, on_tick: Optional[Callable] = None):
+        """Sample on a fixed schedule until `duration` elapses (None: forever)"""
+        start = time.monotonic()
+        next_tick = start
+        while duration is None or time.monotonic() - start < duration:
+            self.sample_once()
+            if on_tick is not None:
+                on_tick(self)
+            # Schedule against the start time so sampling does not drift
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()
+
+
+def write_summary(path: str, sampler: TelemetrySampler, windows: Sequence[float] = DEFAULT_WINDOWS):
+    """Atomically write the window summary and sampler cost as JSON"""
+    summary = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "interval_s": sampler.interval,
+        "sampler": sampler.cost(),
+        "gpus": sampler.store.summary(windows),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp_path, path)
@@ -118,6 +118,43 @@ else
     fi
 fi
 
+# Check 9: NVML health checks (gpu_health_agent.py)
+echo ""
+echo "Check 9: NVML health checks"
+# script: runs a temporary copy of this file, so look in the deployed tools dir first
+GPU_TOOLS_DIR="${GPU_TOOLS_DIR:-/opt/gpu-benchmarks}"
+HEALTH_AGENT="$GPU_TOOLS_DIR/gpu_health_agent.py"
+[ -f "$HEALTH_AGENT" ] || HEALTH_AGENT="$(dirname "$0")/gpu_health_agent.py"
+if [ -f "$HEALTH_AGENT" ]; then
+    # Answered by a running agent; collects in-process when none is listening
+    HEALTH_STATUS=$(python3 "$HEALTH_AGENT" query -q health 2>/dev/null | python3 -c "
+import sys, json
+try:
+    print(json.load(sys.stdin).get('overall_status', 'unknown'))
+except ValueError:
+    print('unknown')
+") || true
+    case "$HEALTH_STATUS" in
+        pass)
+            add_check "nvml_health" "pass" "gpu_health overall status: pass"
+            ;;
+        warn)
+            add_check "nvml_health" "warn" "gpu_health overall status: warn"
+            if [ "$OVERALL_STATUS" == "pass" ]; then
+                OVERALL_STATUS="warn"
+            fi
+            ;;
+        fail)
+            add_check "nvml_health" "fail" "gpu_health overall status: fail"
+            ;;
+        *)
+            add_check "nvml_health" "warn" "gpu_health could not collect a report (pynvml missing?)"
+            ;;
+    esac
+else
+    add_check "nvml_health" "warn" "gpu_health_agent.py not found; skipped"
+fi
+
 # Generate JSON output
 cat > "$OUTPUT_FILE" << EOF
 {